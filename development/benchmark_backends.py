@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark the watchdog and inotify event backends against each other
+
+Creates, modifies and deletes a burst of files in a temporary directory and
+measures how long each backend takes to deliver all of the events.
+
+Usage:
+    python development/benchmark_backends.py [--files N] [--dirs N]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from filepulse.config import Config
+from filepulse.monitor import FileSystemMonitor
+from filepulse import inotify_backend
+
+
+def run_backend(backend, files, dirs):
+    """Run one storm against a backend and return (events, seconds)"""
+    with tempfile.TemporaryDirectory() as tmp:
+        config = Config()
+        config.set('monitoring.paths', [tmp])
+        config.set('monitoring.backend', backend)
+        config.set('monitoring.filters.exclude_patterns', [])
+        config.set('output.console', False)
+        config.set('output.log_level', 'WARNING')
+        config.set('performance.batch_events', True)
+        config.set('performance.max_events_per_batch', 1000)
+        config.set('performance.max_events_per_second', None)
+
+        counts = {'deleted': 0, 'total': 0}
+        done = threading.Event()
+        expected_deletes = files * dirs
+
+        def counter(events):
+            for event in events:
+                counts['total'] += 1
+                if event.event_type == 'deleted' and not event.is_directory:
+                    counts['deleted'] += 1
+            if counts['deleted'] >= expected_deletes:
+                done.set()
+
+        monitor = FileSystemMonitor(config)
+        monitor.event_handler.add_output_handler(counter)
+
+        directories = []
+        for d in range(dirs):
+            directory = os.path.join(tmp, f'dir{d}')
+            os.mkdir(directory)
+            directories.append(directory)
+
+        monitor.start()
+        time.sleep(0.2)
+
+        start = time.perf_counter()
+        for directory in directories:
+            for i in range(files):
+                path = os.path.join(directory, f'file{i}.dat')
+                with open(path, 'wb') as f:
+                    f.write(b'x' * 64)
+                os.remove(path)
+
+        done.wait(60)
+        elapsed = time.perf_counter() - start
+
+        monitor.stop()
+        return counts['total'], elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare FilePulse event backends')
+    parser.add_argument('--files', type=int, default=2000, help='Files per directory')
+    parser.add_argument('--dirs', type=int, default=5, help='Number of directories')
+    args = parser.parse_args()
+
+    backends = ['watchdog']
+    if inotify_backend.is_available():
+        backends.append('inotify')
+    else:
+        print("inotify backend not available on this platform, benchmarking watchdog only")
+
+    print(f"{'backend':<10} {'events':>10} {'seconds':>10} {'events/s':>12}")
+    for backend in backends:
+        total, elapsed = run_backend(backend, args.files, args.dirs)
+        print(f"{backend:<10} {total:>10} {elapsed:>10.3f} {total / elapsed:>12.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for per-event batching cost as the batch grows
+
+Feeds events into an EventHandler with a very large batch limit and reports
+the average cost of handling one event at increasing batch sizes. With
+incremental memory accounting the per-event cost should stay flat.
+
+Usage:
+    python development/benchmark_batch_memory.py [--max-batch N]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from filepulse.config import Config
+from filepulse.events import EventHandler, FileSystemEvent
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure per-event batching cost')
+    parser.add_argument('--max-batch', type=int, default=40000, help='Largest batch size to test')
+    parser.add_argument('--step', type=int, default=5000, help='Events per measurement window')
+    args = parser.parse_args()
+
+    config = Config()
+    config.set('monitoring.filters.exclude_patterns', [])
+    config.set('performance.batch_timeout', 3600)
+    config.set('performance.max_events_per_batch', args.max_batch + 1)
+    config.set('performance.memory_limit_mb', 10000)
+
+    handler = EventHandler(config, [lambda events: None])
+    events = [
+        FileSystemEvent('modified', f'/data/project/dir{i % 100}/file{i}.txt', timestamp=1.0e9 + i)
+        for i in range(args.max_batch)
+    ]
+
+    print(f"{'batch size':>12} {'us/event':>10}")
+    for start in range(0, args.max_batch, args.step):
+        window = events[start:start + args.step]
+        began = time.perf_counter()
+        for event in window:
+            handler.handle_event(event)
+        elapsed = time.perf_counter() - began
+        print(f"{start + len(window):>12} {elapsed / len(window) * 1e6:>10.2f}")
+
+    handler.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark the binary event log against JSONL
+
+Writes the same event batches through JsonFileOutputHandler and
+BinaryOutputHandler, then reads both files back, and reports the time per
+event (best of three runs) and the file sizes. ``read`` decodes records
+(json.loads, or the columns and paths of each block); ``events`` builds
+FileSystemEvent objects.
+
+Usage:
+    python development/benchmark_binlog.py [--events N] [--batch N]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from filepulse.config import Config
+from filepulse.events import EventBatch, FileSystemEvent
+from filepulse.logreader import LogReader
+from filepulse.output import BinaryOutputHandler, JsonFileOutputHandler
+
+
+def build_batches(count, batch_size):
+    batches = []
+    for start in range(0, count, batch_size):
+        # Events read together by a backend share their timestamp
+        events = [
+            FileSystemEvent(('created', 'modified', 'deleted')[i % 3],
+                            f'/srv/project/src/module{i % 200}/file{i}.py',
+                            timestamp=1.7e9 + (i // 64) * 0.0137)
+            for i in range(start, min(start + batch_size, count))
+        ]
+        for event in events:
+            event.src_path = event.raw_src_path  # exclude path resolution from the timing
+        batches.append(EventBatch(events))
+    return batches
+
+
+def timed(function, repeat=1):
+    best = None
+    for _ in range(repeat):
+        began = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - began
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare binary event log and JSONL cost')
+    parser.add_argument('--events', type=int, default=200000, help='Number of events')
+    parser.add_argument('--batch', type=int, default=1000, help='Events per batch')
+    args = parser.parse_args()
+
+    batches = build_batches(args.events, args.batch)
+    config = Config()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, 'events.jsonl')
+        binary_path = os.path.join(tmp, 'events.fplog')
+
+        def write(sink_class, path):
+            # Each run writes a fresh file
+            if os.path.exists(path):
+                os.remove(path)
+            sink = sink_class(config, path)
+            for batch in batches:
+                sink(batch)
+            sink.close()
+
+        def write_json():
+            write(JsonFileOutputHandler, json_path)
+
+        def write_binary():
+            write(BinaryOutputHandler, binary_path)
+
+        def read_json():
+            with open(json_path, encoding='utf-8') as f:
+                for line in f:
+                    json.loads(line)
+
+        def read_binary():
+            with LogReader(binary_path) as reader:
+                for _, block in reader.blocks():
+                    block.paths()
+
+        def read_json_events():
+            with open(json_path, encoding='utf-8') as f:
+                for line in f:
+                    FileSystemEvent.from_dict(json.loads(line))
+
+        def read_binary_events():
+            with LogReader(binary_path) as reader:
+                for _ in reader:
+                    pass
+
+        results = {
+            'write': (timed(write_json, 3), timed(write_binary, 3)),
+            'read': (timed(read_json, 3), timed(read_binary, 3)),
+            'events': (timed(read_json_events, 3), timed(read_binary_events, 3)),
+        }
+        sizes = (os.path.getsize(json_path), os.path.getsize(binary_path))
+
+    per_event = 1e6 / args.events
+    print(f"events: {args.events}, batch size: {args.batch}")
+    for name, (jsonl, binary) in results.items():
+        print(f"{name:6} JSONL {jsonl * per_event:6.2f} us/event   binary {binary * per_event:6.2f} us/event"
+              f"   {jsonl / binary:5.1f}x")
+    print(f"size   JSONL {sizes[0] / args.events:6.1f} B/event    binary {sizes[1] / args.events:6.1f} B/event"
+          f"    {sizes[0] / sizes[1]:5.1f}x")
+
+
+if __name__ == '__main__':
+    main()
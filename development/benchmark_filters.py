@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-event EventFilter cost with a large pattern set
+
+Compares the compiled filter engine against the original loop of
+fnmatch.fnmatch calls over every include/exclude/ignore pattern, and the
+per-event filter against EventFilter.filter_batch().
+
+Usage:
+    python development/benchmark_filters.py [--patterns N] [--events N]
+"""
+
+import argparse
+import fnmatch
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from filepulse.config import Config
+from filepulse.events import EventFilter, FileSystemEvent
+
+
+def legacy_should_process(event_filter, path):
+    """The pre-compilation pattern checks, for comparison"""
+    path_obj = Path(path)
+    for part in path_obj.parts:
+        if part in event_filter.ignore_directories:
+            return False
+    for pattern in event_filter.ignore_directories:
+        if fnmatch.fnmatch(path_obj.name, pattern):
+            return False
+    filename = Path(path).name
+    if event_filter.include_patterns:
+        if not any(fnmatch.fnmatch(filename, p) for p in event_filter.include_patterns):
+            return False
+    if any(fnmatch.fnmatch(filename, p) for p in event_filter.exclude_patterns):
+        return False
+    return True
+
+
+def build_config(pattern_count):
+    extensions = [f'*.ext{i}' for i in range(pattern_count // 2)]
+    literals = [f'generated_{i}.dat' for i in range(pattern_count // 4)]
+    globs = [f'cache-{i}-*.bin' for i in range(pattern_count - len(extensions) - len(literals))]
+
+    config = Config()
+    config.set('monitoring.filters.exclude_patterns', extensions + literals + globs)
+    config.set('monitoring.ignore_directories',
+               ['.git', 'node_modules', '__pycache__', '.venv', 'dist', 'build', '*.egg-info'])
+    return config
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure EventFilter cost per event')
+    parser.add_argument('--patterns', type=int, default=240, help='Number of exclude patterns')
+    parser.add_argument('--events', type=int, default=20000, help='Number of events to filter')
+    args = parser.parse_args()
+
+    event_filter = EventFilter(build_config(args.patterns))
+    paths = [f'/srv/project/src/module{i % 40}/file{i}.{("py", "txt", "ext3", "md")[i % 4]}'
+             for i in range(args.events)]
+    events = [FileSystemEvent('modified', path) for path in paths]
+    for event in events:
+        event.src_path = event.raw_src_path  # exclude path resolution from the timing
+
+    began = time.perf_counter()
+    for path in paths:
+        legacy_should_process(event_filter, path)
+    legacy = time.perf_counter() - began
+
+    began = time.perf_counter()
+    for event in events:
+        event_filter.should_process_event(event)
+    compiled = time.perf_counter() - began
+
+    began = time.perf_counter()
+    event_filter.filter_batch(events)
+    batched = time.perf_counter() - began
+
+    print(f"patterns: {args.patterns}, events: {args.events}")
+    print(f"fnmatch loop: {legacy / args.events * 1e6:8.2f} us/event")
+    print(f"compiled:     {compiled / args.events * 1e6:8.2f} us/event")
+    print(f"filter_batch: {batched / args.events * 1e6:8.2f} us/event")
+    print(f"speedup:      {legacy / compiled:8.1f}x (per event), {legacy / batched:.1f}x (batched)")
+
+
+if __name__ == '__main__':
+    main()
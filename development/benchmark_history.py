@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark the indexed event history store
+
+Writes synthetic events spread over many directories and hourly partitions
+through HistoryOutputHandler, then times `filepulse query`-style lookups
+against a full scan of the same store.
+
+Usage:
+    python development/benchmark_history.py [--events N] [--hours N] [--dir PATH]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from filepulse.config import Config
+from filepulse.events import EventBatch, FileSystemEvent
+from filepulse.history import HistoryStore
+from filepulse.output import HistoryOutputHandler
+
+START = 1700000000 - 1700000000 % 3600
+TYPES = ('created', 'modified', 'modified', 'modified', 'deleted')
+
+
+def write_history(directory, count, hours, batch_size=1000):
+    """Write the events; returns the seconds spent in the sink"""
+    config = Config()
+    config.set('output.history_partition', 3600)
+    handler = HistoryOutputHandler(config, directory)
+    step = hours * 3600.0 / count
+    elapsed = 0.0
+    for start in range(0, count, batch_size):
+        events = []
+        for i in range(start, min(start + batch_size, count)):
+            # Changes come in bursts of 20 events per directory
+            burst = i // 20
+            event = FileSystemEvent(TYPES[i % 5],
+                                    f'/srv/project{burst % 7}/src/module{burst % 500}/file{i % 13}.py',
+                                    timestamp=START + i * step)
+            event.src_path = event.raw_src_path  # exclude path resolution from the timing
+            events.append(event)
+        batch = EventBatch(events)
+        began = time.perf_counter()
+        handler(batch)
+        elapsed += time.perf_counter() - began
+    began = time.perf_counter()
+    handler.close()
+    return elapsed + time.perf_counter() - began
+
+
+def timed_query(store, label, **query):
+    began = time.perf_counter()
+    matched = sum(len(events) for events in store.query_blocks(**query))
+    elapsed = time.perf_counter() - began
+    print(f"{label:38} {elapsed * 1000:9.1f} ms  {matched:9} events  "
+          f"{store.blocks_read:6} blocks read, {store.blocks_skipped:6} skipped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark history store queries')
+    parser.add_argument('--events', type=int, default=2000000, help='Number of events to write')
+    parser.add_argument('--hours', type=int, default=48, help='Hours the events are spread over')
+    parser.add_argument('--dir', help='Use (and keep) this history directory')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = args.dir or os.path.join(tmp, 'history')
+        elapsed = write_history(directory, args.events, args.hours)
+        size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+        print(f"wrote {args.events} events in {elapsed:.1f}s "
+              f"({elapsed * 1e6 / args.events:.2f} us/event, {size / args.events:.1f} B/event)")
+
+        store = HistoryStore(directory)
+        middle = START + args.hours * 1800
+        timed_query(store, 'one minute', since=middle, until=middle + 60)
+        timed_query(store, 'one hour, one directory', since=middle, until=middle + 3600,
+                    path_prefix='/srv/project3/src/module243')
+        timed_query(store, 'all time, one directory', path_prefix='/srv/project3/src/module243')
+        timed_query(store, 'all time, one directory, deleted', path_prefix='/srv/project3/src/module243',
+                    types=['deleted'])
+        timed_query(store, 'all time, one project', path_prefix='/srv/project3')
+        timed_query(store, 'full scan')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark the JSONL timestamp index
+
+Writes a synthetic JSONL event log, builds its timestamp index with one
+and with several worker processes, and compares reading a short time
+window through the index with scanning the whole log.
+
+Usage:
+    python development/benchmark_jsonl_index.py [--events N] [--workers N]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from filepulse.events import FileSystemEvent
+from filepulse.jsonlindex import build_index, read_window
+from filepulse.serialization import EventSerializer
+
+START = 1700000000.0
+
+
+def write_log(path, count, batch_size=1000):
+    serializer = EventSerializer()
+    with open(path, 'w', encoding='utf-8') as f:
+        for start in range(0, count, batch_size):
+            events = []
+            for i in range(start, min(start + batch_size, count)):
+                event = FileSystemEvent('modified', f'/srv/project/src/module{i % 200}/file{i}.py',
+                                        timestamp=START + i * 0.01)
+                event.src_path = event.raw_src_path
+                events.append(event)
+            f.write(serializer.serialize_batch(events))
+
+
+def timed(function):
+    began = time.perf_counter()
+    result = function()
+    return time.perf_counter() - began, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the JSONL timestamp index')
+    parser.add_argument('--events', type=int, default=2000000, help='Events in the log')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Worker processes')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'events.jsonl')
+        write_log(path, args.events)
+        size = os.path.getsize(path)
+        print(f"log: {args.events} events, {size / 1e6:.0f} MB, {os.cpu_count()} CPUs")
+
+        for workers in sorted({1, args.workers}):
+            elapsed, index = timed(lambda: build_index(path, workers=workers, chunk_size=16 * 1024 * 1024))
+            print(f"index-log, {workers} worker(s): {elapsed:6.2f}s "
+                  f"({size / elapsed / 1e6:.0f} MB/s, {len(index)} entries)")
+
+        since = START + args.events * 0.005
+        elapsed, matched = timed(lambda: sum(1 for _ in read_window(path, since, since + 60)))
+        print(f"one minute via index:    {elapsed * 1000:8.1f} ms ({matched} events)")
+
+        def scan():
+            matched = 0
+            with open(path, 'rb') as f:
+                for line in f:
+                    if since <= json.loads(line)['timestamp'] <= since + 60:
+                        matched += 1
+            return matched
+        elapsed, matched = timed(scan)
+        print(f"one minute by full scan: {elapsed * 1000:8.1f} ms ({matched} events)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark directory snapshots and snapshot diffs
+
+Builds a synthetic tree, snapshots it with one and with several worker
+threads, changes a fraction of the files and times the diff. The diff is
+also run with a small sort buffer to show the cost of spilling to disk,
+and peak memory is reported for both.
+
+Usage:
+    python development/benchmark_snapshot.py [--files N] [--workers N]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import psutil
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from filepulse.replay import MemorySampler
+from filepulse.snapshot import diff_snapshots, take_snapshot
+
+
+def make_tree(root, files):
+    for i in range(files):
+        directory = os.path.join(root, f'top{i % 16}', f'dir{i % 997}')
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f'file{i}.dat'), 'w') as f:
+            f.write('x' * (i % 64))
+
+
+def change_tree(root, files):
+    changed = 0
+    for i in range(0, files, 50):
+        path = os.path.join(root, f'top{i % 16}', f'dir{i % 997}', f'file{i}.dat')
+        if i % 150 == 0:
+            os.remove(path)
+        elif i % 150 == 50:
+            os.rename(path, path + '.moved')
+        else:
+            with open(path, 'a') as f:
+                f.write('changed')
+        changed += 1
+    return changed
+
+
+def timed(function):
+    sampler = MemorySampler(interval=0.01)
+    sampler.start()
+    began = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - began
+    sampler.stop()
+    return elapsed, sampler.peak - sampler.baseline, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark directory snapshots and diffs')
+    parser.add_argument('--files', type=int, default=200000, help='Files in the tree')
+    parser.add_argument('--workers', type=int, default=16, help='Walker threads')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, 'tree')
+        make_tree(root, args.files)
+        old = os.path.join(tmp, 'old.fpsnap')
+        new = os.path.join(tmp, 'new.fpsnap')
+        print(f"tree: {args.files} files, {os.cpu_count()} CPUs, "
+              f"{psutil.Process().memory_info().rss / 1048576:.0f} MB RSS")
+
+        for workers in sorted({1, args.workers}):
+            elapsed, grown, header = timed(lambda: take_snapshot(root, old, workers=workers))
+            print(f"snapshot, {workers:2} thread(s): {elapsed:6.2f}s "
+                  f"({header['entries'] / elapsed:,.0f} entries/s, "
+                  f"{os.path.getsize(old) / header['entries']:.1f} bytes/entry, +{grown / 1048576:.1f} MB)")
+
+        changed = change_tree(root, args.files)
+        take_snapshot(root, new, workers=args.workers)
+        for max_items in (500000, 1000):
+            elapsed, grown, events = timed(lambda: sum(1 for _ in diff_snapshots(old, new, max_items)))
+            print(f"diff, sort buffer {max_items:6}: {elapsed:6.2f}s "
+                  f"({events} events for {changed} changes, +{grown / 1048576:.1f} MB)")
+
+
+if __name__ == '__main__':
+    main()
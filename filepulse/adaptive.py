@@ -0,0 +1,72 @@
+"""
+Adaptive batch tuning for FilePulse
+"""
+
+import logging
+from typing import Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveBatchTuner:
+    """Chooses batch timeout and size from the observed event rate and flush cost
+
+    Tracks an EWMA of the event arrival rate and of the time output handlers
+    spend per flush. The timeout is the shortest interval that keeps the
+    sinks busy for at most ``target_utilization`` of the time, so an idle
+    monitor delivers at ``min_timeout`` while a storm grows batches up to the
+    configured maximum to amortize per-flush overhead.
+    """
+
+    def __init__(self, timeout_range: Sequence[float] = (0.02, 2.0),
+                 size_range: Sequence[int] = (10, 10000),
+                 target_utilization: float = 0.25, smoothing: float = 0.3):
+        self.min_timeout, self.max_timeout = float(timeout_range[0]), float(timeout_range[1])
+        self.min_size, self.max_size = int(size_range[0]), int(size_range[1])
+        self.target_utilization = target_utilization
+        self.smoothing = smoothing
+
+        self.arrival_rate = 0.0  # events per second
+        self.flush_cost = 0.0  # seconds per flush
+        self.batch_timeout = self.min_timeout
+        self.max_events_per_batch = self.max_size
+
+        self._last_flush = None
+
+    @classmethod
+    def from_config(cls, config) -> Optional['AdaptiveBatchTuner']:
+        """Create a tuner from configuration, or None if adaptive batching is off"""
+        if not config.get('performance.adaptive_batching', False):
+            return None
+        return cls(
+            timeout_range=config.get('performance.batch_timeout_range', [0.02, 2.0]),
+            size_range=config.get('performance.batch_size_range', [10, 10000]),
+        )
+
+    def _ewma(self, current: float, sample: float) -> float:
+        return current + self.smoothing * (sample - current)
+
+    def observe_flush(self, events: int, cost: float, now: float):
+        """Record a delivered batch and retune the batch bounds"""
+        if self._last_flush is not None:
+            elapsed = max(now - self._last_flush, 1e-6)
+            self.arrival_rate = self._ewma(self.arrival_rate, events / elapsed)
+        self._last_flush = now
+        self.flush_cost = self._ewma(self.flush_cost, cost)
+
+        # Flush no more often than keeps sink utilization under the target
+        timeout = self.flush_cost / self.target_utilization
+        self.batch_timeout = min(max(timeout, self.min_timeout), self.max_timeout)
+
+        # Size bound leaves headroom over what arrives within one timeout
+        size = int(self.arrival_rate * self.batch_timeout * 2)
+        self.max_events_per_batch = min(max(size, self.min_size), self.max_size)
+
+    def get_status(self) -> dict:
+        """Get the currently chosen batch bounds and their inputs"""
+        return {
+            'batch_timeout': round(self.batch_timeout, 4),
+            'max_events_per_batch': self.max_events_per_batch,
+            'arrival_rate': round(self.arrival_rate, 1),
+            'flush_cost_ms': round(self.flush_cost * 1000, 3),
+        }
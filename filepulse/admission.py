@@ -0,0 +1,113 @@
+"""
+Rate-based admission control for FilePulse events
+"""
+
+import os
+import logging
+from typing import Dict, List, Optional
+
+from .events import FileSystemEvent
+from .utils import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionController:
+    """Limits event throughput with global and per-root token buckets
+
+    Events over budget are not dropped silently: they are counted per
+    monitored root and reported every ``summary_interval`` seconds as a
+    ``suppressed`` summary event carrying the count.
+    """
+
+    def __init__(self, roots: List[str], max_events_per_second: Optional[float] = None,
+                 max_events_per_second_per_root: Optional[float] = None,
+                 summary_interval: float = 1.0):
+        self.summary_interval = summary_interval
+        self.global_bucket = TokenBucket(max_events_per_second) if max_events_per_second else None
+
+        # Longest roots first so nested roots win
+        self.roots = sorted({os.path.abspath(root) for root in roots}, key=len, reverse=True)
+        self.root_buckets: Dict[str, TokenBucket] = {}
+        if max_events_per_second_per_root:
+            for root in self.roots:
+                self.root_buckets[root] = TokenBucket(max_events_per_second_per_root)
+
+        self._suppressed: Dict[str, int] = {}
+        self._next_summary = None
+
+        # Statistics
+        self.admitted = 0
+        self.suppressed = 0
+
+    @classmethod
+    def from_config(cls, config) -> Optional['AdmissionController']:
+        """Create a controller from configuration, or None if no limits are set"""
+        global_limit = config.get('performance.max_events_per_second')
+        root_limit = config.get('performance.max_events_per_second_per_root')
+        if not global_limit and not root_limit:
+            return None
+
+        roots = [str(os.path.realpath(path)) for path in config.monitoring_paths]
+        return cls(roots, global_limit, root_limit,
+                   config.get('performance.suppression_summary_interval', 1.0))
+
+    def root_of(self, path: str) -> str:
+        """Find the monitored root containing a path (its directory if none does)"""
+        for root in self.roots:
+            if path.startswith(root) and (len(path) == len(root) or path[len(root)] == os.sep
+                                          or root.endswith(os.sep)):
+                return root
+        return os.path.dirname(path)
+
+    def admit(self, event: FileSystemEvent, now: float) -> bool:
+        """Check an event against its budgets, counting it if suppressed"""
+        root = None
+        bucket = None
+        if self.root_buckets:
+            root = self.root_of(event.src_path)
+            bucket = self.root_buckets.get(root)
+            if bucket is not None and not bucket.consume(1.0, now):
+                self._suppress(root, now)
+                return False
+
+        if self.global_bucket is not None and not self.global_bucket.consume(1.0, now):
+            if bucket is not None:
+                bucket.refund()
+            self._suppress(root if root is not None else self.root_of(event.src_path), now)
+            return False
+
+        self.admitted += 1
+        return True
+
+    def _suppress(self, root: str, now: float):
+        self._suppressed[root] = self._suppressed.get(root, 0) + 1
+        self.suppressed += 1
+        if self._next_summary is None:
+            self._next_summary = now + self.summary_interval
+
+    def next_deadline(self) -> Optional[float]:
+        """Time the next summary is due, or None if nothing was suppressed"""
+        return self._next_summary
+
+    def take_summaries(self, now: float, force: bool = False) -> List[FileSystemEvent]:
+        """Turn suppressed counts into summary events once they are due"""
+        if not self._suppressed or (not force and now < self._next_summary):
+            return []
+
+        summaries = [
+            FileSystemEvent('suppressed', root, is_directory=True, timestamp=now, count=count)
+            for root, count in self._suppressed.items()
+        ]
+        self._suppressed.clear()
+        self._next_summary = None
+        return summaries
+
+    def get_status(self) -> dict:
+        """Get admission statistics"""
+        return {
+            'max_events_per_second': self.global_bucket.rate if self.global_bucket else None,
+            'admitted': self.admitted,
+            'suppressed': self.suppressed,
+            'pending_summaries': sum(self._suppressed.values()),
+        }
@@ -0,0 +1,364 @@
+"""
+Compact binary event log format for FilePulse
+
+A segment starts with ``MAGIC`` and holds length-prefixed records::
+
+    record  := varint(len(body)) body
+    body    := kind:u8 payload
+
+``STRINGS`` records append to the segment's string table, which holds the
+directory prefixes events refer to by ID. ``EVENTS`` records hold a block
+of events column by column::
+
+    varint count, varint first timestamp (microseconds)
+    strings   event type names used in the block
+    ints      type (index into the names above)
+    ints      flags (bit 0: directory, bit 1: reconciled)
+    ints      timestamp deltas from the previous event (microseconds)
+    ints      directory (string table ID)
+    strings   file names
+    varint moves    [ints row, ints directory, strings name]
+    varint counts   [ints row, ints count]
+    varint stats    [ints row, ints size, ints mtime (microseconds), ints inode]
+
+Integer columns are stored with the narrowest little-endian width that
+fits every value in the block, and string columns as NUL-separated UTF-8,
+so blocks are packed and unpacked without a per-value Python loop.
+``RESET`` clears the string table, e.g. where a writer resumed appending
+to an existing segment.
+"""
+
+import os
+import sys
+from array import array
+from itertools import accumulate
+from operator import add
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+from .events import EVENT_TYPES, EventBatch, FileSystemEvent, resolve_directory
+
+MAGIC = b'FPLOG\x00\x01\n'
+
+RECORD_STRINGS = 1
+RECORD_EVENTS = 2
+RECORD_RESET = 3
+
+FLAG_DIRECTORY = 0x01
+FLAG_RECONCILED = 0x02
+
+# Narrowest array type codes, tried in order
+_SIGNED_CODES = ('b', 'h', 'i', 'q')
+_UNSIGNED_CODES = ('B', 'H', 'I', 'Q')
+_LIMITS = {'b': (-2 ** 7, 2 ** 7), 'h': (-2 ** 15, 2 ** 15), 'i': (-2 ** 31, 2 ** 31),
+           'q': (-2 ** 63, 2 ** 63), 'B': (0, 2 ** 8), 'H': (0, 2 ** 16), 'I': (0, 2 ** 32),
+           'Q': (0, 2 ** 64)}
+_SWAP = sys.byteorder == 'big'
+
+# Single-byte varints, the common case for lengths and counts
+_SMALL_VARINTS = [bytes((value,)) for value in range(128)]
+
+
+def encode_varint(value: int) -> bytes:
+    """Encode a non-negative integer as a LEB128 varint"""
+    if value < 128:
+        return _SMALL_VARINTS[value]
+    out = bytearray()
+    while value >= 128:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def decode_varint(buffer, pos: int) -> Tuple[int, int]:
+    """Decode a varint at pos; returns (value, position after it)"""
+    byte = buffer[pos]
+    if byte < 128:
+        return byte, pos + 1
+    value = 0
+    shift = 0
+    while True:
+        byte = buffer[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 128:
+            return value, pos
+        shift += 7
+
+
+def zigzag(value: int) -> int:
+    """Map a signed integer to a non-negative one for varint encoding"""
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def unzigzag(value: int) -> int:
+    """Inverse of zigzag()"""
+    return value >> 1 if not value & 1 else -(value >> 1) - 1
+
+
+def pack_ints(values, signed: bool = False) -> bytes:
+    """Pack integers with the narrowest width that fits them all"""
+    if not values:
+        return b'B'
+    low, high = min(values), max(values)
+    for code in (_SIGNED_CODES if signed else _UNSIGNED_CODES):
+        lower, upper = _LIMITS[code]
+        if lower <= low and high < upper:
+            break
+    packed = values if isinstance(values, array) and values.typecode == code else array(code, values)
+    if _SWAP:
+        packed = array(code, packed)
+        packed.byteswap()
+    return code.encode('ascii') + packed.tobytes()
+
+
+def unpack_ints(buffer, pos: int, count: int) -> Tuple[array, int]:
+    """Unpack count integers written by pack_ints()"""
+    code = chr(buffer[pos])
+    values = array(code)
+    end = pos + 1 + count * values.itemsize
+    values.frombytes(buffer[pos + 1:end])
+    if _SWAP:
+        values.byteswap()
+    return values, end
+
+
+def pack_strings(strings: List[str]) -> bytes:
+    """Pack strings as one NUL-separated UTF-8 blob"""
+    blob = '\0'.join(strings).encode('utf-8', 'surrogateescape')
+    return encode_varint(len(blob)) + blob
+
+
+def unpack_strings(buffer, pos: int, count: int) -> Tuple[List[str], int]:
+    """Unpack count strings written by pack_strings()"""
+    size, pos = decode_varint(buffer, pos)
+    end = pos + size
+    if not count:
+        return [], end
+    return str(buffer[pos:end], 'utf-8', 'surrogateescape').split('\0'), end
+
+
+def encode_record(kind: int, payload: bytes) -> bytes:
+    """Frame a payload as a record of the given kind"""
+    return encode_varint(len(payload) + 1) + bytes((kind,)) + payload
+
+
+def reset_record() -> bytes:
+    """A record clearing the string table"""
+    return encode_record(RECORD_RESET, b'')
+
+
+_MICROS = 1e6
+
+
+def _to_micros(timestamp: float) -> int:
+    return round(timestamp * _MICROS)
+
+
+class EncodedBlock(NamedTuple):
+    """The records of one encoded batch and a summary of its contents"""
+    strings: bytes  # STRINGS record, empty when no new strings were needed
+    events: bytes  # EVENTS record
+    new_strings: List[str]  # strings the STRINGS record appends
+    count: int
+    first: int  # earliest timestamp (microseconds)
+    last: int  # latest timestamp (microseconds)
+    types: List[str]  # event types in the block
+    dir_ids: List[int]  # string IDs of all source and destination directories
+
+
+class SegmentEncoder:
+    """Encodes event batches into records, maintaining the segment's string table"""
+
+    def __init__(self):
+        self._strings: Dict[str, int] = {}
+
+    def reset(self):
+        """Start a new string table (a new segment or after a RESET record)"""
+        self._strings = {}
+
+    def _string_ids(self, strings: Iterable[str], new: List[str]) -> List[int]:
+        table = self._strings
+        ids = []
+        for string in strings:
+            string_id = table.get(string)
+            if string_id is None:
+                string_id = table[string] = len(table)
+                new.append(string)
+            ids.append(string_id)
+        return ids
+
+    def encode(self, events) -> bytes:
+        """Encode a batch (an EventBatch or any iterable of events) as records"""
+        block = self.encode_block(events)
+        return block.strings + block.events if block is not None else b''
+
+    def encode_block(self, events) -> 'EncodedBlock':
+        """Like encode(), keeping the records apart; None for an empty batch"""
+        if not isinstance(events, EventBatch):
+            events = EventBatch(list(events))
+        columns = events.columns()
+        count = len(columns.names)
+        if not count:
+            return None
+
+        new_strings: List[str] = []
+
+        # Directories: batch-local IDs -> segment string IDs. Those of paths the
+        # filter already resolved are canonical; the rest are resolved once each
+        used_dirs = sorted(set(columns.dir_ids))
+        unresolved = bytes(columns.flags).translate(_UNRESOLVED)
+        pending = set()
+        if 1 in unresolved:
+            pending = {dir_id for dir_id, flag in zip(columns.dir_ids, unresolved) if flag}
+        dirs = columns.dirs
+        segment_ids = self._string_ids([resolve_directory(dirs[i]) if i in pending else dirs[i]
+                                        for i in used_dirs], new_strings)
+        dir_map = dict(zip(used_dirs, segment_ids))
+        dir_ids = [dir_map[i] for i in columns.dir_ids]
+
+        # Event types: names used in this block and an index per event
+        used_types = sorted(set(columns.types))
+        type_index = bytearray(256)
+        for position, code in enumerate(used_types):
+            type_index[code] = position
+        types = bytes(columns.types).translate(type_index)
+
+        micros = list(map(round, map(_MICROS.__mul__, columns.timestamps)))
+        deltas = [later - earlier for earlier, later in zip(micros, micros[1:])]
+        flags = bytes(columns.flags).translate(_BLOCK_FLAGS)
+
+        parts = [
+            encode_varint(count), encode_varint(zigzag(micros[0])),
+            encode_varint(len(used_types)), pack_strings([EVENT_TYPES[code] for code in used_types]),
+            pack_ints(types), pack_ints(flags), pack_ints([0] + deltas, signed=True),
+            pack_ints(dir_ids), pack_strings(columns.names),
+        ]
+
+        moves = columns.moves
+        move_dirs = []
+        parts.append(encode_varint(len(moves)))
+        if moves:
+            rows = sorted(moves)
+            splits = [os.path.split(moves[row]) for row in rows]
+            move_dirs = self._string_ids([resolve_directory(directory) for directory, _ in splits],
+                                         new_strings)
+            parts += (pack_ints(rows), pack_ints(move_dirs), pack_strings([name for _, name in splits]))
+
+        counts = columns.counts
+        parts.append(encode_varint(len(counts)))
+        if counts:
+            rows = sorted(counts)
+            parts += (pack_ints(rows), pack_ints([counts[row] for row in rows], signed=True))
+
+        stats = columns.stats
+        parts.append(encode_varint(len(stats)))
+        if stats:
+            rows = sorted(stats)
+            parts += (pack_ints(rows), pack_ints([stats[row][0] for row in rows], signed=True),
+                      pack_ints([_to_micros(stats[row][1]) for row in rows], signed=True),
+                      pack_ints([stats[row][2] or 0 for row in rows]))
+
+        strings = b''
+        if new_strings:
+            strings = encode_record(RECORD_STRINGS,
+                                    encode_varint(len(new_strings)) + pack_strings(new_strings))
+        return EncodedBlock(strings, encode_record(RECORD_EVENTS, b''.join(parts)), new_strings, count,
+                            min(micros), max(micros), [EVENT_TYPES[code] for code in used_types],
+                            sorted(set(segment_ids).union(move_dirs)))
+
+
+# Maps EventBatch flag bytes to FLAG_DIRECTORY / FLAG_RECONCILED
+_BLOCK_FLAGS = bytes((FLAG_DIRECTORY if value & EventBatch._IS_DIRECTORY else 0)
+                     | (FLAG_RECONCILED if value & EventBatch._RECONCILED else 0)
+                     for value in range(256))
+
+# Maps EventBatch flag bytes to 1 for paths that were not resolved yet
+_UNRESOLVED = bytes(0 if value & EventBatch._RESOLVED else 1 for value in range(256))
+
+
+class EventBlock:
+    """The decoded columns of one EVENTS record"""
+
+    __slots__ = ('count', 'types', 'flags', 'timestamps', 'dirs', 'names',
+                 'moves', 'counts', 'stats')
+
+    def __init__(self, body, strings: List[str]):
+        pos = 1  # past the record kind
+        count, pos = decode_varint(body, pos)
+        first, pos = decode_varint(body, pos)
+        type_count, pos = decode_varint(body, pos)
+        type_names, pos = unpack_strings(body, pos, type_count)
+        types, pos = unpack_ints(body, pos, count)
+        self.flags, pos = unpack_ints(body, pos, count)
+        deltas, pos = unpack_ints(body, pos, count)
+        dir_ids, pos = unpack_ints(body, pos, count)
+        self.names, pos = unpack_strings(body, pos, count)
+
+        self.count = count
+        self.types = [type_names[code] for code in types]
+        deltas = deltas.tolist()
+        deltas[0] = unzigzag(first)
+        self.timestamps = [micros / 1e6 for micros in accumulate(deltas)]
+        self.dirs = [strings[dir_id] for dir_id in dir_ids]
+
+        self.moves: Dict[int, str] = {}
+        moved, pos = decode_varint(body, pos)
+        if moved:
+            rows, pos = unpack_ints(body, pos, moved)
+            move_dirs, pos = unpack_ints(body, pos, moved)
+            move_names, pos = unpack_strings(body, pos, moved)
+            for row, dir_id, name in zip(rows, move_dirs, move_names):
+                self.moves[row] = os.path.join(strings[dir_id], name)
+
+        self.counts: Dict[int, int] = {}
+        counted, pos = decode_varint(body, pos)
+        if counted:
+            rows, pos = unpack_ints(body, pos, counted)
+            values, pos = unpack_ints(body, pos, counted)
+            self.counts = dict(zip(rows, values))
+
+        self.stats: Dict[int, tuple] = {}
+        stat_count, pos = decode_varint(body, pos)
+        if stat_count:
+            rows, pos = unpack_ints(body, pos, stat_count)
+            sizes, pos = unpack_ints(body, pos, stat_count)
+            mtimes, pos = unpack_ints(body, pos, stat_count)
+            inodes, pos = unpack_ints(body, pos, stat_count)
+            for row, size, mtime, inode in zip(rows, sizes, mtimes, inodes):
+                self.stats[row] = (size, mtime / 1e6, inode or None)
+
+    def paths(self) -> List[str]:
+        """Source path of every event in the block"""
+        # Directories are absolute and names have no separator, so joining
+        # is a concatenation with one prefix per distinct directory
+        prefixes = {directory: os.path.join(directory, '') for directory in set(self.dirs)}
+        return list(map(add, map(prefixes.__getitem__, self.dirs), self.names))
+
+    def events(self, rows: Iterable[int] = None) -> List[FileSystemEvent]:
+        """Materialize the block (or only the given rows) as FileSystemEvent objects"""
+        types, flags, timestamps = self.types, self.flags, self.timestamps
+        if rows is None:
+            columns = zip(range(self.count), types, flags, timestamps, self.paths())
+        else:
+            join, dirs, names = os.path.join, self.dirs, self.names
+            columns = [(row, types[row], flags[row], timestamps[row], join(dirs[row], names[row]))
+                       for row in rows]
+        moves, counts, stats = self.moves, self.counts, self.stats
+        events = []
+        append = events.append
+        for row, event_type, flag, timestamp, path in columns:
+            dest_path = moves.get(row) if moves else None
+            event = FileSystemEvent(event_type, path, dest_path, flag & FLAG_DIRECTORY != 0,
+                                    timestamp, counts.get(row) if counts else None)
+            # Paths were resolved before they were written
+            event._src_path = path
+            event._dest_path = dest_path
+            if flag & FLAG_RECONCILED:
+                event.reconciled = True
+            if stats:
+                stat = stats.get(row)
+                if stat is not None:
+                    event.size, event.mtime, event.inode = stat
+            append(event)
+        return events
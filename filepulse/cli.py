@@ -100,6 +100,184 @@ def cmd_gui(args):
         sys.exit(1)
 
 
+def cmd_query(args):
+    """Handle query command"""
+    import time
+    from .history import HistoryStore, parse_time
+    from .serialization import default_serializer
+    
+    config = Config(args.config) if args.config else Config()
+    directory = args.dir or config.get('output.history_dir', 'filepulse_history')
+    
+    try:
+        since = parse_time(args.since) if args.since else None
+        until = parse_time(args.until) if args.until else None
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(2)
+    types = [name for value in args.type or [] for name in value.split(',') if name]
+    
+    started = time.perf_counter()
+    if args.log:
+        matched = _query_log(args, since, until, types)
+        if args.stats:
+            print(f"{matched} events in {time.perf_counter() - started:.3f}s", file=sys.stderr)
+        return
+    
+    store = HistoryStore(directory)
+    matched = 0
+    try:
+        for events in store.query_blocks(since, until, args.path_prefix, types):
+            if args.limit is not None:
+                events = events[:args.limit - matched]
+            if args.format == 'text':
+                sys.stdout.write(''.join(
+                    _text_line(default_serializer.isoformat(event.timestamp), event.event_type,
+                               event.src_path, event.dest_path)
+                    for event in events))
+            else:
+                sys.stdout.write(default_serializer.serialize_batch(events))
+            matched += len(events)
+            if args.limit is not None and matched >= args.limit:
+                break
+    except BrokenPipeError:
+        pass
+    
+    if args.stats:
+        print(f"{matched} events in {time.perf_counter() - started:.3f}s "
+              f"({store.segments_read} segments, {store.blocks_read} blocks read, "
+              f"{store.blocks_skipped} skipped)", file=sys.stderr)
+
+
+def _text_line(when, event_type, src_path, dest_path):
+    return f"{when} {event_type:9} {src_path}" + (f" -> {dest_path}" if dest_path else '') + '\n'
+
+
+def _query_log(args, since, until, types):
+    """Answer a query from a JSONL log, using its timestamp index if there is one"""
+    import json
+    from .history import PrefixMatcher
+    from .jsonlindex import read_window
+    
+    matcher = PrefixMatcher(args.path_prefix) if args.path_prefix else None
+    matched = 0
+    try:
+        for line in read_window(args.log, since, until):
+            if types or matcher is not None or args.format == 'text':
+                record = json.loads(line)
+                if types and record.get('event_type') not in types:
+                    continue
+                if matcher is not None and not any(
+                        path and matcher.path(path)
+                        for path in (record.get('src_path'), record.get('dest_path'))):
+                    continue
+                if args.format == 'text':
+                    line = _text_line(record.get('datetime'), record.get('event_type'),
+                                      record.get('src_path'), record.get('dest_path')).encode('utf-8')
+            sys.stdout.buffer.write(line)
+            matched += 1
+            if args.limit is not None and matched >= args.limit:
+                break
+        sys.stdout.flush()
+    except BrokenPipeError:
+        pass
+    return matched
+
+
+def cmd_index_log(args):
+    """Handle index-log command"""
+    import time
+    from .jsonlindex import build_index, index_path
+    
+    if not os.path.isfile(args.log_file):
+        print(f"Error: no such file: {args.log_file}", file=sys.stderr)
+        sys.exit(1)
+    
+    started = time.perf_counter()
+    index = build_index(args.log_file, args.interval, args.workers)
+    print(f"Indexed {index.records} events ({len(index)} entries) in "
+          f"{time.perf_counter() - started:.2f}s: {index_path(args.log_file)}")
+
+
+def cmd_replay(args):
+    """Handle replay command"""
+    import tempfile
+    from .replay import Replayer, configure_sinks, format_report, read_recorded_events
+    
+    if not os.path.exists(args.log):
+        print(f"Error: no such file or directory: {args.log}", file=sys.stderr)
+        sys.exit(1)
+    
+    config = Config(args.config) if args.config else Config()
+    with tempfile.TemporaryDirectory(prefix='filepulse-replay-') as scratch:
+        if args.sink:
+            output_dir = args.output_dir or scratch
+            configure_sinks(config, args.sink, output_dir)
+        else:
+            # The configured sinks, without flooding the terminal
+            config.set('output.console', False)
+        
+        try:
+            replayer = Replayer(config, speed=args.speed)
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(2)
+        report = replayer.run(read_recorded_events(args.log), limit=args.limit)
+    
+    print(format_report(report), file=sys.stderr if 'console' in (args.sink or []) else sys.stdout)
+
+
+def cmd_snapshot(args):
+    """Handle snapshot command"""
+    import time
+    from .snapshot import take_snapshot
+    
+    if not os.path.isdir(args.path):
+        print(f"Error: not a directory: {args.path}", file=sys.stderr)
+        sys.exit(1)
+    
+    started = time.perf_counter()
+    header = take_snapshot(args.path, args.output, hashing=args.hash, workers=args.workers)
+    print(f"Snapshot of {header['root']}: {header['entries']} entries in "
+          f"{time.perf_counter() - started:.2f}s: {args.output}")
+    if header['errors']:
+        print(f"Warning: {header['errors']} entries could not be read", file=sys.stderr)
+
+
+def cmd_diff(args):
+    """Handle diff command"""
+    import tempfile
+    from .snapshot import diff_snapshots, take_snapshot
+    from .serialization import default_serializer
+    
+    for path in (args.old, args.new):
+        if not os.path.exists(path):
+            print(f"Error: no such file or directory: {path}", file=sys.stderr)
+            sys.exit(1)
+    
+    with tempfile.TemporaryDirectory(prefix='filepulse-diff-') as scratch:
+        new = args.new
+        if os.path.isdir(new):
+            # Compare against the tree as it is now
+            new = os.path.join(scratch, 'current.fpsnap')
+            take_snapshot(args.new, new, hashing=args.hash, workers=args.workers)
+        
+        try:
+            events = diff_snapshots(args.old, new)
+            for event in events:
+                if args.format == 'text':
+                    sys.stdout.write(_text_line(event.datetime.isoformat(), event.event_type,
+                                                event.src_path, event.dest_path))
+                else:
+                    sys.stdout.write(default_serializer.serialize(event) + '\n')
+            sys.stdout.flush()
+        except BrokenPipeError:
+            pass
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(2)
+
+
 def main():
     """Main CLI entry point"""
     parser = argparse.ArgumentParser(
@@ -143,6 +321,154 @@ def main():
     # GUI command
     gui_parser = subparsers.add_parser('gui', help='Launch GUI interface')
     
+    # Query command
+    query_parser = subparsers.add_parser('query', help='Search the indexed event history')
+    query_parser.add_argument(
+        '--since',
+        help='Earliest event time: epoch seconds, ISO 8601 or an age like 15m, 2h, 7d'
+    )
+    query_parser.add_argument(
+        '--until',
+        help='Latest event time (same formats as --since)'
+    )
+    query_parser.add_argument(
+        '--path-prefix',
+        help='Only events for this path or paths below it'
+    )
+    query_parser.add_argument(
+        '--type',
+        action='append',
+        help='Event types to include, comma-separated or repeated'
+    )
+    query_parser.add_argument(
+        '--format',
+        choices=['jsonl', 'text'],
+        default='jsonl',
+        help='Output format (default: jsonl)'
+    )
+    query_parser.add_argument(
+        '--limit',
+        type=int,
+        help='Stop after this many events'
+    )
+    query_parser.add_argument(
+        '--dir',
+        help='History directory (default: output.history_dir)'
+    )
+    query_parser.add_argument(
+        '--config',
+        help='Configuration file to read output.history_dir from'
+    )
+    query_parser.add_argument(
+        '--log',
+        help='Search this JSONL event log instead of the history (uses its timestamp index)'
+    )
+    query_parser.add_argument(
+        '--stats',
+        action='store_true',
+        help='Print match count, time and blocks read to stderr'
+    )
+    
+    # Index log command
+    index_parser = subparsers.add_parser('index-log', help='Build the timestamp index of a JSONL event log')
+    index_parser.add_argument(
+        'log_file',
+        help='JSONL event log to index'
+    )
+    index_parser.add_argument(
+        '--interval',
+        type=int,
+        default=1000,
+        help='Events per index entry (default: 1000)'
+    )
+    index_parser.add_argument(
+        '--workers',
+        type=int,
+        help='Worker processes (default: one per CPU)'
+    )
+    
+    # Replay command
+    replay_parser = subparsers.add_parser('replay', help='Replay recorded events through the sinks')
+    replay_parser.add_argument(
+        'log',
+        help='JSONL or binary event log, or history directory'
+    )
+    replay_parser.add_argument(
+        '--speed',
+        type=float,
+        help='Pacing relative to the recording: 1 = original, 10 = ten times faster '
+             '(default: as fast as possible)'
+    )
+    replay_parser.add_argument(
+        '--sink',
+        action='append',
+        choices=['console', 'log', 'json', 'binary', 'history'],
+        help='Sink to replay into, repeatable (default: the sinks enabled in the config, '
+             'without console output)'
+    )
+    replay_parser.add_argument(
+        '--output-dir',
+        help='Directory for the files of --sink sinks (default: a temporary directory)'
+    )
+    replay_parser.add_argument(
+        '--config',
+        help='Configuration file (filters, batching and sinks)'
+    )
+    replay_parser.add_argument(
+        '--limit',
+        type=int,
+        help='Stop after this many events'
+    )
+    
+    # Snapshot command
+    snapshot_parser = subparsers.add_parser('snapshot', help='Record the state of a directory tree')
+    snapshot_parser.add_argument(
+        'path',
+        help='Root directory of the tree'
+    )
+    snapshot_parser.add_argument(
+        '-o', '--output',
+        required=True,
+        help='Snapshot file to write'
+    )
+    snapshot_parser.add_argument(
+        '--hash',
+        action='store_true',
+        help='Also record a hash of every file\'s contents (reads every file)'
+    )
+    snapshot_parser.add_argument(
+        '--workers',
+        type=int,
+        help='Threads walking top-level subdirectories (default: four per CPU, at most 32)'
+    )
+    
+    # Diff command
+    diff_parser = subparsers.add_parser('diff', help='List the changes between two snapshots')
+    diff_parser.add_argument(
+        'old',
+        help='Earlier snapshot file'
+    )
+    diff_parser.add_argument(
+        'new',
+        help='Later snapshot file, or a directory to compare as it is now'
+    )
+    diff_parser.add_argument(
+        '--format',
+        choices=['jsonl', 'text'],
+        default='jsonl',
+        help='Output format (default: jsonl)'
+    )
+    diff_parser.add_argument(
+        '--hash',
+        action='store_true',
+        help='Hash file contents when snapshotting a directory given as NEW'
+    )
+    diff_parser.add_argument(
+        '--workers',
+        type=int,
+        help='Threads for snapshotting a directory given as NEW'
+    )
+    
     # Parse arguments
     args = parser.parse_args()
     
@@ -156,6 +482,16 @@ def main():
         cmd_init_config(args)
     elif args.command == 'gui':
         cmd_gui(args)
+    elif args.command == 'query':
+        cmd_query(args)
+    elif args.command == 'index-log':
+        cmd_index_log(args)
+    elif args.command == 'replay':
+        cmd_replay(args)
+    elif args.command == 'snapshot':
+        cmd_snapshot(args)
+    elif args.command == 'diff':
+        cmd_diff(args)
     else:
         parser.print_help()
         sys.exit(1)
@@ -0,0 +1,130 @@
+"""
+Per-path event coalescing for FilePulse
+"""
+
+import logging
+from typing import Dict, Iterable, List, Optional
+
+from .events import FileSystemEvent
+
+logger = logging.getLogger(__name__)
+
+# (pending type, new type) -> coalesced type; None means the two cancel out
+_TRANSITIONS = {
+    ('created', 'created'): 'created',
+    ('created', 'modified'): 'created',
+    ('created', 'deleted'): None,
+    ('modified', 'created'): 'modified',
+    ('modified', 'modified'): 'modified',
+    ('modified', 'deleted'): 'deleted',
+    ('deleted', 'created'): 'modified',
+    ('deleted', 'modified'): 'modified',
+    ('deleted', 'deleted'): 'deleted',
+}
+
+COALESCED_TYPES = frozenset(('created', 'modified', 'deleted'))
+
+
+class EventCoalescer:
+    """Collapses bursts of events for the same path within a time window
+
+    The first event for a path opens a window; later events for the path are
+    folded into it (created+modified -> created, created+deleted -> nothing,
+    modified+modified -> modified, ...). When the window closes the single
+    coalesced event is released. Pending paths live in a dict and their
+    deadlines in a timer wheel of ``resolution`` slots per window, so adding
+    and expiring events is O(1) per event.
+    """
+
+    def __init__(self, window: float, resolution: int = 8):
+        self.window = window
+        self.tick = max(window / resolution, 0.001)
+        self._pending: Dict[str, list] = {}  # path -> [event, wheel slot]
+        self._wheel: Dict[int, List[str]] = {}  # slot -> paths expiring in it
+
+        # Statistics
+        self.coalesced = 0
+
+    def add(self, event: FileSystemEvent, now: float) -> List[FileSystemEvent]:
+        """Add an event; returns any events that must be released right away"""
+        if event.event_type not in COALESCED_TYPES:
+            # Moves and summaries end pending state for the paths they touch
+            ready = self._pop(event.src_path)
+            if event.dest_path:
+                ready.extend(self._pop(event.dest_path))
+            ready.append(event)
+            return ready
+
+        key = event.src_path
+        entry = self._pending.get(key)
+        if entry is None:
+            slot = int((now + self.window) / self.tick)
+            self._pending[key] = [event, slot]
+            bucket = self._wheel.get(slot)
+            if bucket is None:
+                self._wheel[slot] = [key]
+            else:
+                bucket.append(key)
+            return []
+
+        self.coalesced += 1
+        previous = entry[0]
+        result = _TRANSITIONS[(previous.event_type, event.event_type)]
+        if result is None:
+            # The wheel entry goes stale and is skipped on expiry
+            del self._pending[key]
+        elif result == event.event_type:
+            entry[0] = event
+        elif result != previous.event_type:
+            merged = FileSystemEvent(result, event.src_path, is_directory=event.is_directory,
+                                     timestamp=event.timestamp)
+            merged.size, merged.mtime, merged.inode = event.size, event.mtime, event.inode
+            merged.reconciled = event.reconciled
+            entry[0] = merged
+        return []
+
+    def add_all(self, events: Iterable[FileSystemEvent], now: float) -> List[FileSystemEvent]:
+        """Add several events; returns the events released right away"""
+        ready = []
+        for event in events:
+            released = self.add(event, now)
+            if released:
+                ready.extend(released)
+        return ready
+
+    def _pop(self, key: str) -> List[FileSystemEvent]:
+        entry = self._pending.pop(key, None)
+        return [entry[0]] if entry is not None else []
+
+    def expire(self, now: float) -> List[FileSystemEvent]:
+        """Release every pending event whose window has closed"""
+        limit = int(now / self.tick)
+        due = [slot for slot in self._wheel if slot < limit]
+        if not due:
+            return []
+
+        ready = []
+        for slot in sorted(due):
+            for key in self._wheel.pop(slot):
+                entry = self._pending.get(key)
+                if entry is not None and entry[1] == slot:
+                    del self._pending[key]
+                    ready.append(entry[0])
+        return ready
+
+    def drain(self) -> List[FileSystemEvent]:
+        """Release all pending events regardless of their windows"""
+        ready = [entry[0] for entry in self._pending.values()]
+        self._pending.clear()
+        self._wheel.clear()
+        return ready
+
+    def next_deadline(self) -> Optional[float]:
+        """Time at which the earliest wheel slot closes, or None if idle"""
+        if not self._wheel:
+            return None
+        # Nudge past the slot boundary so expire() never sees it as still open
+        return (min(self._wheel) + 1) * self.tick + 1e-6
+
+    def __len__(self) -> int:
+        return len(self._pending)
@@ -40,12 +40,21 @@ class Config:
                 'paths': ['.'],
                 'events': ['created', 'modified', 'deleted', 'moved'],
                 'recursive': True,
+                'backend': 'watchdog',  # watchdog, inotify (Linux only)
                 'ignore_directories': ['.git', '__pycache__', 'node_modules', '.vscode'],
+                'reconcile': {
+                    'enabled': False,  # report changes made while the monitor was not running
+                    'state_dir': 'filepulse_state',  # per-root snapshots
+                    'snapshot_interval': 3600,  # seconds between snapshots while running, 0 = only on stop
+                    'max_entries_per_second': 20000,  # rescan throttle, None = unlimited
+                    'workers': 4  # threads scanning top-level subdirectories
+                },
                 'filters': {
                     'include_patterns': [],
                     'exclude_patterns': ['*.tmp', '*.swp', '*.log~', '.DS_Store'],
                     'min_file_size': 0,
-                    'max_file_size': None
+                    'max_file_size': None,
+                    'ignore_files': []  # e.g. ['.gitignore', '.filepulseignore']
                 }
             },
             'output': {
@@ -54,12 +63,41 @@ class Config:
                 'log_file': None,
                 'log_level': 'INFO',
                 'json_output': False,
+                'json_index': False,  # keep a timestamp index next to the JSON file
+                'json_index_interval': 1000,  # records per index entry
+                'binary_output': False,
+                'binary_file': 'filepulse_events.fplog',
+                'history_output': False,
+                'history_dir': 'filepulse_history',
+                'history_partition': 3600,  # seconds of events per history segment
+                'file_stats': False,  # attach size/mtime to events even without size filters
+                'durability': 'flush',  # none, flush, fsync
+                'fsync_interval_ms': 1000,  # group commit interval for durability: fsync
+                'write_buffer_size': 1048576,  # bytes buffered per log file
+                'rotation': {
+                    'max_bytes': None,  # rotate once a file reaches this size
+                    'interval': None,  # seconds; rotate on multiples, e.g. 86400 = daily
+                    'compression': 'gzip',  # gzip, zstd, none
+                    'max_files': 10,  # rotated segments to keep
+                    'max_age_days': 30
+                },
                 'timestamp_format': '%Y-%m-%d %H:%M:%S'
             },
             'performance': {
                 'batch_events': True,
                 'batch_timeout': 0.5,  # seconds
                 'max_events_per_batch': 100,
+                'adaptive_batching': False,
+                'batch_timeout_range': [0.02, 2.0],  # seconds, used when adaptive
+                'batch_size_range': [10, 10000],  # events, used when adaptive
+                'coalesce_window': 0,  # seconds, 0 = disabled
+                'max_events_per_second': None,  # None = unlimited
+                'max_events_per_second_per_root': None,
+                'suppression_summary_interval': 1.0,  # seconds
+                'dispatch_queue_size': 10000,
+                'filter_cache_size': 4096,  # directories with cached filter verdicts
+                'filter_chunk_size': 256,  # events filtered together when batching
+                'overflow_policy': 'block',  # block, drop_oldest, summarize
                 'memory_limit_mb': 50,
                 'cpu_throttle': False
             }
@@ -0,0 +1,155 @@
+"""
+Bounded event hand-off between filesystem observers and event processing
+"""
+
+import os
+import threading
+import time
+import logging
+from collections import deque
+from typing import Dict, Iterable, List
+
+from .events import FileSystemEvent, EventHandler
+
+logger = logging.getLogger(__name__)
+
+
+class EventDispatcher:
+    """Queues observer events and processes them on a dedicated thread
+
+    Observer callbacks only append to a bounded queue, so filtering, batching
+    and output I/O never run on the observer's emitter thread. When the queue
+    is full the overflow policy decides what happens:
+
+    - ``block``: the observer waits for room (nothing is lost)
+    - ``drop_oldest``: the oldest queued event is discarded
+    - ``summarize``: new events are counted per directory and reported later
+      as ``suppressed`` summary events
+    """
+
+    POLICIES = ('block', 'drop_oldest', 'summarize')
+
+    def __init__(self, event_handler: EventHandler, capacity: int = 10000,
+                 overflow_policy: str = 'block', chunk_size: int = 512):
+        if overflow_policy not in self.POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow_policy}")
+
+        self.event_handler = event_handler
+        self.capacity = max(1, capacity)
+        self.overflow_policy = overflow_policy
+        self.chunk_size = chunk_size
+
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._suppressed: Dict[str, int] = {}
+        self._running = False
+        self._thread = None
+
+        # Statistics
+        self.dropped = 0
+        self.suppressed = 0
+        self.high_water = 0
+
+    def handle_event(self, event: FileSystemEvent):
+        """Queue a single event (called on the observer thread)"""
+        self.handle_events((event,))
+
+    def handle_events(self, events: Iterable[FileSystemEvent]):
+        """Queue a batch of events (called on the observer thread)"""
+        if not self._running:
+            # Not started (or already stopped): process synchronously
+            self.event_handler.handle_events(list(events))
+            return
+
+        queue = self._queue
+        with self._lock:
+            for event in events:
+                if len(queue) >= self.capacity:
+                    if self.overflow_policy == 'block':
+                        while self._running and len(queue) >= self.capacity:
+                            self._not_full.wait(0.1)
+                    elif self.overflow_policy == 'drop_oldest':
+                        queue.popleft()
+                        self.dropped += 1
+                    else:
+                        directory = os.path.dirname(event.raw_src_path)
+                        self._suppressed[directory] = self._suppressed.get(directory, 0) + 1
+                        self.suppressed += 1
+                        continue
+                queue.append(event)
+
+            if len(queue) > self.high_water:
+                self.high_water = len(queue)
+            self._not_empty.notify()
+
+    def start(self):
+        """Start the dispatcher thread"""
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='FilePulseDispatcher', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the dispatcher thread after draining queued events"""
+        with self._lock:
+            self._running = False
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        queue = self._queue
+        while True:
+            with self._lock:
+                while self._running and not queue and not self._suppressed:
+                    self._not_empty.wait()
+                if not self._running and not queue and not self._suppressed:
+                    break
+
+                count = min(len(queue), self.chunk_size)
+                chunk = [queue.popleft() for _ in range(count)]
+                self._not_full.notify_all()
+
+                # Report suppressed events once the backlog has eased
+                summaries = []
+                if self._suppressed and len(queue) <= self.capacity // 2:
+                    summaries = self._take_summaries()
+
+            try:
+                if chunk:
+                    self.event_handler.handle_events(chunk)
+                if summaries:
+                    self.event_handler.handle_events(summaries)
+            except Exception as e:
+                logger.error(f"Error dispatching events: {e}")
+
+    def _take_summaries(self) -> List[FileSystemEvent]:
+        """Turn suppressed counts into summary events (lock must be held)"""
+        now = time.time()
+        summaries = [
+            FileSystemEvent('suppressed', directory, is_directory=True, timestamp=now, count=count)
+            for directory, count in self._suppressed.items()
+        ]
+        self._suppressed.clear()
+        return summaries
+
+    @property
+    def depth(self) -> int:
+        """Number of events waiting in the queue"""
+        return len(self._queue)
+
+    def get_status(self) -> dict:
+        """Get queue statistics"""
+        return {
+            'depth': len(self._queue),
+            'capacity': self.capacity,
+            'overflow_policy': self.overflow_policy,
+            'high_water': self.high_water,
+            'dropped': self.dropped,
+            'suppressed': self.suppressed,
+        }
@@ -3,36 +3,169 @@ Event handling and filtering for FilePulse
 """
 
 import os
+import re
+import sys
 import fnmatch
 import time
-from typing import Dict, List, Any, Optional, Callable
+import threading
+from array import array
+from typing import Dict, List, Any, Optional, Callable, Iterable, Iterator, Sequence, NamedTuple
 from pathlib import Path
 from datetime import datetime
 import logging
 
+from .utils import LRUCache
+
 logger = logging.getLogger(__name__)
 
 
+# Resolved directory prefixes, so events in the same directory share one lookup
+_resolved_dirs = LRUCache(max_size=4096)
+
+# Event types after which a path may name a different directory or symlink target
+_REPLACING_TYPES = frozenset(('deleted', 'moved'))
+
+
+def resolve_path(path: str) -> str:
+    """Resolve a path to an absolute, symlink-free form using the directory cache
+
+    Only the parent directory is resolved (and cached); the final component
+    is appended as-is so the event keeps naming the entry that changed.
+    """
+    directory, name = os.path.split(path)
+    if name in ('', '.', '..') or not os.path.isabs(directory):
+        return str(Path(path).resolve())
+    
+    return os.path.join(resolve_directory(directory), name)
+
+
+def resolve_directory(directory: str) -> str:
+    """Resolve a directory to an absolute, symlink-free form (cached if absolute)"""
+    if not os.path.isabs(directory):
+        return str(Path(directory).resolve())
+    
+    resolved_dir = _resolved_dirs.get(directory)
+    if resolved_dir is None:
+        resolved_dir = str(Path(directory).resolve())
+        _resolved_dirs.put(directory, resolved_dir)
+    return resolved_dir
+
+
+def clear_path_cache():
+    """Forget all cached directory resolutions"""
+    _resolved_dirs.clear()
+
+
+def forget_paths(paths: Iterable[str]):
+    """Forget cached resolutions of directories at or below the given paths
+
+    Called for deleted and moved entries, so that a directory or symlink
+    replaced or repointed in their place is resolved afresh.
+    """
+    doomed = set(paths)
+    if not doomed or not len(_resolved_dirs):
+        return
+    dirname = os.path.dirname
+    for directory in _resolved_dirs.keys():
+        parent = directory
+        while parent not in doomed:
+            above = dirname(parent)
+            if above == parent:
+                break
+            parent = above
+        if parent in doomed:
+            _resolved_dirs.pop(directory)
+
+
+def _forget_changed_paths(events: Iterable['FileSystemEvent']):
+    """forget_paths() for the directories among the deleted and moved entries of events
+
+    Symlinks are reported as files, so other entries count when they were
+    themselves cached as a directory.
+    """
+    paths = []
+    for event in events:
+        if event.event_type in _REPLACING_TYPES:
+            for path in (event.raw_src_path, event.raw_dest_path):
+                if path and (event.is_directory or path in _resolved_dirs):
+                    paths.append(path)
+    if paths:
+        forget_paths(paths)
+
+
 class FileSystemEvent:
-    """Represents a filesystem event"""
+    """Represents a filesystem event
+    
+    Paths are kept as delivered by the backend and resolved on first access;
+    the ``datetime`` is likewise only built when a consumer asks for it.
+    ``size``, ``mtime`` and ``inode`` are filled in from the single ``stat``
+    the filter makes, and stay None when the file was never stat'ed.
+    ``reconciled`` marks events synthesized at startup for changes made
+    while the monitor was not running.
+    """
+    
+    __slots__ = ('event_type', 'raw_src_path', 'raw_dest_path', 'is_directory',
+                 'timestamp', 'count', 'size', 'mtime', 'inode', 'reconciled',
+                 '_src_path', '_dest_path', '_datetime')
     
     def __init__(self, event_type: str, src_path: str, dest_path: str = None, 
-                 is_directory: bool = False, timestamp: float = None):
-        self.event_type = event_type  # created, modified, deleted, moved
-        self.src_path = str(Path(src_path).resolve())
-        self.dest_path = str(Path(dest_path).resolve()) if dest_path else None
+                 is_directory: bool = False, timestamp: float = None, count: int = None):
+        self.event_type = event_type  # created, modified, deleted, moved, suppressed
+        self.raw_src_path = os.fspath(src_path)
+        self.raw_dest_path = os.fspath(dest_path) if dest_path else None
         self.is_directory = is_directory
         self.timestamp = timestamp or time.time()
-        self.datetime = datetime.fromtimestamp(self.timestamp)
+        self.count = count  # number of events summarized (suppressed events only)
+        self.size = None
+        self.mtime = None
+        self.inode = None
+        self.reconciled = False
+        self._src_path = None
+        self._dest_path = None
+        self._datetime = None
+    
+    @property
+    def src_path(self) -> str:
+        if self._src_path is None:
+            self._src_path = resolve_path(self.raw_src_path)
+        return self._src_path
+    
+    @src_path.setter
+    def src_path(self, value: str):
+        self.raw_src_path = self._src_path = value
+    
+    @property
+    def dest_path(self) -> Optional[str]:
+        if self._dest_path is None and self.raw_dest_path:
+            self._dest_path = resolve_path(self.raw_dest_path)
+        return self._dest_path
+    
+    @dest_path.setter
+    def dest_path(self, value: Optional[str]):
+        self.raw_dest_path = self._dest_path = value
+    
+    @property
+    def datetime(self) -> datetime:
+        if self._datetime is None:
+            self._datetime = datetime.fromtimestamp(self.timestamp)
+        return self._datetime
+    
+    def set_stat(self, stat_result: os.stat_result):
+        """Attach size, modification time and inode from a stat result"""
+        self.size = stat_result.st_size
+        self.mtime = stat_result.st_mtime
+        self.inode = stat_result.st_ino
     
     def __str__(self):
         if self.event_type == 'moved' and self.dest_path:
             return f"{self.event_type.upper()}: {self.src_path} -> {self.dest_path}"
+        if self.count is not None:
+            return f"{self.event_type.upper()}: {self.count} events under {self.src_path}"
         return f"{self.event_type.upper()}: {self.src_path}"
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert event to dictionary"""
-        return {
+        data = {
             'event_type': self.event_type,
             'src_path': self.src_path,
             'dest_path': self.dest_path,
@@ -40,6 +173,270 @@ class FileSystemEvent:
             'timestamp': self.timestamp,
             'datetime': self.datetime.isoformat()
         }
+        if self.count is not None:
+            data['count'] = self.count
+        if self.size is not None:
+            data['size'] = self.size
+            data['mtime'] = self.mtime
+        if self.reconciled:
+            data['reconciled'] = True
+        return data
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'FileSystemEvent':
+        """Rebuild an event from ``to_dict()`` output; its paths are already resolved"""
+        event = cls(data['event_type'], data['src_path'], data.get('dest_path'),
+                    is_directory=bool(data.get('is_directory', False)),
+                    timestamp=data.get('timestamp'), count=data.get('count'))
+        event._src_path = event.raw_src_path
+        event._dest_path = event.raw_dest_path
+        if data.get('size') is not None:
+            event.size = data['size']
+            event.mtime = data.get('mtime')
+        event.reconciled = bool(data.get('reconciled', False))
+        return event
+
+
+# Small integer codes for event types stored in an EventBatch
+EVENT_TYPES = ['created', 'modified', 'deleted', 'moved']
+_EVENT_TYPE_IDS = {name: code for code, name in enumerate(EVENT_TYPES)}
+
+
+def event_type_id(event_type: str) -> int:
+    """Get the small integer code for an event type, registering new types"""
+    code = _EVENT_TYPE_IDS.get(event_type)
+    if code is None:
+        code = len(EVENT_TYPES)
+        EVENT_TYPES.append(event_type)
+        _EVENT_TYPE_IDS[event_type] = code
+    return code
+
+
+class BatchColumns(NamedTuple):
+    """Columns of an EventBatch; see EventBatch.columns()"""
+    types: array  # codes into EVENT_TYPES
+    timestamps: array
+    flags: bytearray  # EventBatch._IS_DIRECTORY / _RESOLVED / _RECONCILED bits
+    dir_ids: array  # indexes into dirs
+    names: List[str]
+    dirs: List[str]
+    moves: Dict[int, str]  # row -> destination path
+    counts: Dict[int, int]  # row -> summarized event count
+    stats: Dict[int, tuple]  # row -> (size, mtime, inode)
+
+
+class EventBatch:
+    """Columnar storage for a batch of filesystem events
+    
+    Event types are kept as small ints, timestamps in an ``array('d')`` and
+    paths as an interned directory ID plus a basename. Iterating yields
+    standalone ``FileSystemEvent`` objects in timestamp order, so output
+    handlers written for lists of events keep working.
+    """
+    
+    _IS_DIRECTORY = 0x01
+    _RESOLVED = 0x02
+    _RECONCILED = 0x04
+    
+    # Column bytes per event: type (B) + timestamp (d) + flags + dir ID (I),
+    # plus the list slot holding the basename
+    _ROW_BYTES = 1 + 8 + 1 + 4 + 8
+    
+    __slots__ = ('_types', '_timestamps', '_flags', '_dir_ids', '_names',
+                 '_moves', '_counts', '_stats', '_dirs', '_dir_index', '_sorted', '_sort_order',
+                 'nbytes')
+    
+    def __init__(self, events: List[FileSystemEvent] = None):
+        self._types = array('B')
+        self._timestamps = array('d')
+        self._flags = bytearray()
+        self._dir_ids = array('I')
+        self._names: List[str] = []
+        self._moves: Dict[int, str] = {}  # index -> destination path (moves only)
+        self._counts: Dict[int, int] = {}  # index -> count (summary events only)
+        self._stats: Dict[int, tuple] = {}  # index -> (size, mtime, inode) if stat'ed
+        self._dirs: List[str] = []
+        self._dir_index: Dict[str, int] = {}
+        self._sorted = True
+        self._sort_order = None  # timestamp order of an unsorted batch, once computed
+        self.nbytes = 0  # running memory estimate, updated on every append
+        
+        if events:
+            self.extend(events)
+    
+    def _intern_dir(self, directory: str) -> int:
+        dir_id = self._dir_index.get(directory)
+        if dir_id is None:
+            dir_id = len(self._dirs)
+            self._dirs.append(directory)
+            self._dir_index[directory] = dir_id
+            # string + list slot + index entry
+            self.nbytes += sys.getsizeof(directory) + 8 + 64
+        return dir_id
+    
+    def append(self, event: FileSystemEvent):
+        """Add an event to the batch"""
+        # Keep the resolved path if the filter already paid for it
+        path = event._src_path
+        flags = self._RESOLVED if path is not None else 0
+        if path is None:
+            path = event.raw_src_path
+        if event.is_directory:
+            flags |= self._IS_DIRECTORY
+        if event.reconciled:
+            flags |= self._RECONCILED
+        
+        directory, name = os.path.split(path)
+        timestamps = self._timestamps
+        if timestamps and event.timestamp < timestamps[-1]:
+            self._sorted = False
+        self._sort_order = None
+        
+        index = len(self._names)
+        self._types.append(event_type_id(event.event_type))
+        timestamps.append(event.timestamp)
+        self._flags.append(flags)
+        self._dir_ids.append(self._intern_dir(directory))
+        self._names.append(name)
+        self.nbytes += self._ROW_BYTES + sys.getsizeof(name)
+        
+        if event.raw_dest_path:
+            dest_path = event.dest_path
+            self._moves[index] = dest_path
+            self.nbytes += sys.getsizeof(dest_path) + 64
+        if event.count is not None:
+            self._counts[index] = event.count
+            self.nbytes += 64
+        if event.size is not None:
+            self._stats[index] = (event.size, event.mtime, event.inode)
+            self.nbytes += 160
+    
+    def extend(self, events):
+        """Add several events to the batch"""
+        for event in events:
+            self.append(event)
+    
+    def clear(self):
+        """Remove all events from the batch"""
+        self.__init__()
+    
+    def _event_at(self, index: int) -> FileSystemEvent:
+        flags = self._flags[index]
+        path = os.path.join(self._dirs[self._dir_ids[index]], self._names[index])
+        event = FileSystemEvent(
+            EVENT_TYPES[self._types[index]],
+            path,
+            dest_path=self._moves.get(index),
+            is_directory=bool(flags & self._IS_DIRECTORY),
+            timestamp=self._timestamps[index],
+            count=self._counts.get(index)
+        )
+        if flags & self._RESOLVED:
+            event._src_path = path
+            event._dest_path = event.raw_dest_path
+        if flags & self._RECONCILED:
+            event.reconciled = True
+        stat = self._stats.get(index)
+        if stat is not None:
+            event.size, event.mtime, event.inode = stat
+        return event
+    
+    def columns(self) -> 'BatchColumns':
+        """Column view of the batch in iteration (timestamp) order
+        
+        Lets writers encode a whole batch without materializing events.
+        Directories may still be unresolved; pass them through
+        ``resolve_directory`` before treating them as canonical.
+        """
+        if self._sorted:
+            return BatchColumns(self._types, self._timestamps, self._flags, self._dir_ids,
+                                self._names, self._dirs, self._moves, self._counts, self._stats)
+        
+        order = self._order()
+        position = {index: rank for rank, index in enumerate(order)}
+        return BatchColumns(
+            array('B', [self._types[i] for i in order]),
+            array('d', [self._timestamps[i] for i in order]),
+            bytearray(self._flags[i] for i in order),
+            array('I', [self._dir_ids[i] for i in order]),
+            [self._names[i] for i in order],
+            self._dirs,
+            {position[i]: value for i, value in self._moves.items()},
+            {position[i]: value for i, value in self._counts.items()},
+            {position[i]: value for i, value in self._stats.items()},
+        )
+    
+    def _order(self):
+        if self._sorted:
+            return range(len(self._names))
+        if self._sort_order is None:
+            # Stable, like sorting the event list by timestamp
+            self._sort_order = sorted(range(len(self._names)), key=self._timestamps.__getitem__)
+        return self._sort_order
+    
+    def __iter__(self) -> Iterator[FileSystemEvent]:
+        event_at = self._event_at
+        for index in self._order():
+            yield event_at(index)
+    
+    def __getitem__(self, item):
+        order = self._order()
+        if isinstance(item, slice):
+            return [self._event_at(index) for index in order[item]]
+        return self._event_at(order[item])
+    
+    def __len__(self) -> int:
+        return len(self._names)
+    
+    def __bool__(self) -> bool:
+        return bool(self._names)
+
+
+class PatternMatcher:
+    """Glob patterns compiled once for fast filename matching
+    
+    Matches the same names as ``any(fnmatch.fnmatch(name, p) for p in patterns)``.
+    Exact-extension patterns (``*.ext``) and literal names are answered with
+    set lookups; everything else goes through one combined regular expression.
+    """
+    
+    __slots__ = ('patterns', 'extensions', 'names', '_regex')
+    
+    def __init__(self, patterns: List[str]):
+        self.patterns = list(patterns)
+        self.extensions = set()
+        self.names = set()
+        wildcard = []
+        
+        for pattern in self.patterns:
+            normalized = os.path.normcase(pattern)
+            if not _has_magic(normalized):
+                self.names.add(normalized)
+            elif (normalized.startswith('*.') and '.' not in normalized[2:]
+                  and not _has_magic(normalized[2:])):
+                self.extensions.add(normalized[2:])
+            else:
+                wildcard.append(fnmatch.translate(normalized))
+        
+        self._regex = re.compile('|'.join(wildcard)).match if wildcard else None
+    
+    def matches(self, name: str) -> bool:
+        """Check if a filename matches any of the patterns"""
+        name = os.path.normcase(name)
+        if name in self.names:
+            return True
+        if self.extensions:
+            dot = name.rfind('.')
+            if dot >= 0 and name[dot + 1:] in self.extensions:
+                return True
+        return self._regex is not None and self._regex(name) is not None
+    
+    def __bool__(self) -> bool:
+        return bool(self.patterns)
+
+
+def _has_magic(pattern: str) -> bool:
+    return '*' in pattern or '?' in pattern or '[' in pattern
 
 
 class EventFilter:
@@ -52,13 +449,44 @@ class EventFilter:
         self.ignore_directories = config.ignore_directories
         self.monitoring_events = set(config.monitoring_events)
         
+        # Patterns are compiled once; the per-event checks are set lookups
+        self._include = PatternMatcher(self.include_patterns)
+        self._exclude = PatternMatcher(self.exclude_patterns)
+        self._ignored_names = PatternMatcher(self.ignore_directories)
+        self._ignored_parts = frozenset(self.ignore_directories)
+        
+        # Verdicts per parent directory, so floods into one directory skip the walk
+        self._dir_cache = LRUCache(max_size=config.get('performance.filter_cache_size', 4096))
+        
+        # Patterns from .gitignore-style files (None when not configured)
+        from .ignorefile import IgnoreFileMatcher
+        self.ignore_files = IgnoreFileMatcher.from_config(config)
+        
         # File size filters
-        self.min_file_size = config.get('monitoring.filters.min_file_size', 0)
+        self.min_file_size = config.get('monitoring.filters.min_file_size', 0) or 0
         self.max_file_size = config.get('monitoring.filters.max_file_size')
+        self.size_filter = self.min_file_size > 0 or self.max_file_size is not None
+        
+        # Files are only stat'ed when a size filter or a sink needs the result
+        self.file_stats = config.get('output.file_stats', False)
+        self._needs_stat = self.size_filter or self.file_stats
+        self._needs_event_checks = self._needs_stat or self.ignore_files is not None
     
     def should_process_event(self, event: FileSystemEvent) -> bool:
         """Determine if an event should be processed"""
         
+        # Summaries of suppressed events are always reported
+        if event.event_type == 'suppressed':
+            return True
+        
+        # Changes to ignore files are picked up even if the event is filtered
+        if self.ignore_files is not None:
+            self._notice_ignore_files(event)
+        
+        # A deleted or moved directory may be replaced by another one
+        if event.event_type in _REPLACING_TYPES:
+            _forget_changed_paths((event,))
+        
         # Check event type
         if event.event_type not in self.monitoring_events:
             return False
@@ -67,82 +495,203 @@ class EventFilter:
         if self._is_ignored_path(event.src_path):
             return False
         
+        # Apply pattern filters
+        if not self._matches_patterns(event.src_path):
+            return False
+        
+        return self._passes_event_checks(event)
+    
+    def filter_batch(self, events: Sequence[FileSystemEvent]) -> Sequence[bool]:
+        """Evaluate the filter over a whole batch of events at once
+        
+        Returns one truth value per event, agreeing with should_process_event().
+        The event type is checked first, so events of unmonitored types never
+        have their paths resolved. Parent directories and filenames are
+        checked once per distinct value in the batch. Checks that depend on
+        the individual event (move destinations, ignore files, file size) run
+        afterwards, only for events that passed. Deleted and moved paths are
+        dropped from the directory cache before anything is resolved.
+        """
+        mask = [False] * len(events)
+        if not events:
+            return mask
+        _forget_changed_paths(events)
+        
+        monitoring_events = self.monitoring_events
+        notice = self.ignore_files is not None
+        dir_ok: Dict[str, bool] = {}
+        name_ok: Dict[str, bool] = {}
+        candidates = []
+        
+        sep = os.sep
+        for index, event in enumerate(events):
+            event_type = event.event_type
+            if event_type == 'suppressed':
+                mask[index] = True
+                continue
+            if notice:
+                self._notice_ignore_files(event)
+            if event_type not in monitoring_events:
+                continue
+            
+            directory, _, name = event.src_path.rpartition(sep)
+            ok = dir_ok.get(directory)
+            if ok is None:
+                ok = dir_ok[directory] = not self._is_ignored_directory(directory)
+            if not ok:
+                continue
+            ok = name_ok.get(name)
+            if ok is None:
+                ok = name_ok[name] = self._name_passes(name)
+            if ok:
+                candidates.append(index)
+        
+        # Per-event checks for the survivors
+        needs_event_checks = self._needs_event_checks
+        for index in candidates:
+            event = events[index]
+            if ((needs_event_checks or event.event_type == 'moved')
+                    and not self._passes_event_checks(event)):
+                continue
+            mask[index] = True
+        return mask
+    
+    def _passes_event_checks(self, event: FileSystemEvent) -> bool:
+        """Checks that depend on more than the event's type, directory and name"""
+        
         # For move events, also check destination path
         if event.event_type == 'moved' and event.dest_path:
             if self._is_ignored_path(event.dest_path):
                 return False
         
-        # Apply pattern filters
-        if not self._matches_patterns(event.src_path):
-            return False
+        # Apply ignore files
+        if self.ignore_files is not None:
+            if self.ignore_files.is_ignored(event.src_path, event.is_directory):
+                return False
+            if event.dest_path and self.ignore_files.is_ignored(event.dest_path, event.is_directory):
+                return False
         
         # Apply file size filters
-        if not event.is_directory and not self._matches_file_size(event.src_path):
+        if self._needs_stat and not event.is_directory and not self._matches_file_size(event):
             return False
         
         return True
     
+    def _notice_ignore_files(self, event: FileSystemEvent):
+        self.ignore_files.notice(event.src_path)
+        if event.dest_path:
+            self.ignore_files.notice(event.dest_path)
+    
+    def _name_passes(self, filename: str) -> bool:
+        """Check a filename against the ignore list and include/exclude patterns"""
+        if filename in self._ignored_parts:
+            return False
+        if self._ignored_names and self._ignored_names.matches(filename):
+            return False
+        if self._include and not self._include.matches(filename):
+            return False
+        if self._exclude and self._exclude.matches(filename):
+            return False
+        return True
+    
     def _is_ignored_path(self, path: str) -> bool:
         """Check if path should be ignored"""
-        path_obj = Path(path)
+        directory, filename = os.path.split(path)
         
         # Check if any parent directory is in ignore list
-        for part in path_obj.parts:
-            if part in self.ignore_directories:
-                return True
-        
-        # Check if filename matches ignore patterns
-        filename = path_obj.name
-        for pattern in self.ignore_directories:
-            if fnmatch.fnmatch(filename, pattern):
-                return True
+        if self._is_ignored_directory(directory):
+            return True
         
-        return False
+        # Check the filename itself against the ignore list and patterns
+        if filename in self._ignored_parts:
+            return True
+        return bool(self._ignored_names) and self._ignored_names.matches(filename)
+    
+    def _is_ignored_directory(self, directory: str) -> bool:
+        """Check if a directory lies inside an ignored directory (cached)"""
+        verdict = self._dir_cache.get(directory)
+        if verdict is None:
+            verdict = not self._ignored_parts.isdisjoint(directory.split(os.sep))
+            self._dir_cache.put(directory, verdict)
+        return verdict
+    
+    def invalidate_cache(self):
+        """Forget cached directory verdicts (e.g. after a configuration reload)"""
+        self._dir_cache.clear()
+        if self.ignore_files is not None:
+            self.ignore_files.invalidate()
+    
+    def get_status(self) -> Dict[str, Any]:
+        """Get filter cache statistics"""
+        status = {
+            'dir_cache_size': len(self._dir_cache),
+            'dir_cache_hits': self._dir_cache.hits,
+            'dir_cache_misses': self._dir_cache.misses,
+            'dir_cache_hit_rate': round(self._dir_cache.hit_rate, 4),
+        }
+        if self.ignore_files is not None:
+            status.update(self.ignore_files.get_status())
+        return status
     
     def _matches_patterns(self, path: str) -> bool:
         """Check if path matches include/exclude patterns"""
-        filename = Path(path).name
+        filename = os.path.basename(path)
         
         # If include patterns are specified, file must match at least one
-        if self.include_patterns:
-            if not any(fnmatch.fnmatch(filename, pattern) for pattern in self.include_patterns):
-                return False
+        if self._include and not self._include.matches(filename):
+            return False
         
         # File must not match any exclude patterns
-        if self.exclude_patterns:
-            if any(fnmatch.fnmatch(filename, pattern) for pattern in self.exclude_patterns):
-                return False
+        if self._exclude and self._exclude.matches(filename):
+            return False
         
         return True
     
-    def _matches_file_size(self, path: str) -> bool:
-        """Check if file size is within limits"""
+    def _matches_file_size(self, event: FileSystemEvent) -> bool:
+        """Check if file size is within limits, attaching the stat result to the event"""
+        if event.event_type == 'deleted':
+            return True  # Nothing left to stat, allow the event
+        
+        # A moved file now lives at its destination
+        path = event.dest_path if event.event_type == 'moved' else event.src_path
         try:
-            if not os.path.exists(path):
-                return True  # File might be deleted, allow the event
-            
-            file_size = os.path.getsize(path)
-            
-            if file_size < self.min_file_size:
-                return False
-            
-            if self.max_file_size is not None and file_size > self.max_file_size:
-                return False
-            
+            stat_result = os.stat(path)
+        except (OSError, ValueError):
+            # File might be gone already or unreadable, allow the event
             return True
-        except (OSError, IOError):
-            # If we can't get file size, allow the event
+        
+        event.set_stat(stat_result)
+        if not self.size_filter or event.event_type == 'moved':
             return True
+        
+        file_size = stat_result.st_size
+        if file_size < self.min_file_size:
+            return False
+        
+        if self.max_file_size is not None and file_size > self.max_file_size:
+            return False
+        
+        return True
 
 
 class EventHandler:
-    """Handles processed filesystem events"""
+    """Handles processed filesystem events
+    
+    With batching enabled, a background flush timer guarantees that no event
+    waits longer than ``batch_timeout`` before reaching the output handlers,
+    even when no further events arrive. Events may be handed in from any
+    thread.
+    """
     
     def __init__(self, config, output_handlers: List[Callable] = None):
         self.config = config
         self.output_handlers = output_handlers or []
         self.event_filter = EventFilter(config)
         
+        # Sinks writing JSONL share the text of each delivered batch
+        from .serialization import default_serializer
+        self._serializer = default_serializer
+        
         # Event batching
         self.batch_events = config.get('performance.batch_events', True)
         self.batch_timeout = config.get('performance.batch_timeout', 0.5)
@@ -152,90 +701,278 @@ class EventHandler:
         self.memory_limit_mb = config.get('performance.memory_limit_mb', 50)
         self.max_batch_memory_mb = min(self.memory_limit_mb * 0.2, 10)  # Use max 20% of limit or 10MB
         
-        self._event_batch = []
-        self._last_batch_time = time.time()
+        # Adaptive tuning of batch_timeout / max_events_per_batch
+        from .adaptive import AdaptiveBatchTuner
+        self.batch_tuner = AdaptiveBatchTuner.from_config(config)
+        if self.batch_tuner is not None:
+            self.batch_timeout = self.batch_tuner.batch_timeout
+            self.max_events_per_batch = self.batch_tuner.max_events_per_batch
+        
+        # Rate-based admission control
+        from .admission import AdmissionController
+        self.admission = AdmissionController.from_config(config)
+        
+        # Per-path coalescing of event bursts
+        self.coalesce_window = config.get('performance.coalesce_window', 0)
+        self.coalescer = None
+        if self.coalesce_window and self.coalesce_window > 0:
+            from .coalesce import EventCoalescer
+            self.coalescer = EventCoalescer(self.coalesce_window)
+        
+        # With batching, raw events are filtered a chunk at a time
+        self.filter_chunk_size = config.get('performance.filter_chunk_size', 256)
+        self._intake: List[FileSystemEvent] = []
+        
+        self._event_batch = EventBatch()
+        self._batch_deadline = None  # latest time the current batch may be delivered
+        
+        # _lock guards the batch; _output_lock keeps batches in delivery order;
+        # _intake_lock keeps intake chunks in arrival order up to the coalescer
+        self._lock = threading.Lock()
+        self._output_lock = threading.Lock()
+        self._intake_lock = threading.Lock()
+        self._timer_wakeup = threading.Condition(self._lock)
+        self._timer_thread = None
+        self._timer_running = False
     
     def handle_event(self, event: FileSystemEvent):
         """Handle a filesystem event"""
+        if self.batch_events:
+            self.handle_events((event,))
+            return
         
         # Apply filtering
         if not self.event_filter.should_process_event(event):
             return
         
-        if self.batch_events:
-            self._handle_batched_event(event)
-        else:
-            self._process_event(event)
+        self._accept((event,))
     
-    def _handle_batched_event(self, event: FileSystemEvent):
-        """Handle event with batching"""
-        self._event_batch.append(event)
-        current_time = time.time()
+    def handle_events(self, events: List[FileSystemEvent]):
+        """Handle a batch of filesystem events delivered together by a backend"""
+        if not self.batch_events:
+            accepted = [event for event in events if self.event_filter.should_process_event(event)]
+            if accepted:
+                self._accept(accepted)
+            return
         
-        # Check if we should process batch due to memory concerns
-        batch_memory_usage = self._estimate_batch_memory()
+        # Collect raw events and filter them a whole chunk at a time
+        with self._lock:
+            self._intake.extend(events)
+            if self._batch_deadline is None:
+                self._batch_deadline = time.time() + self.batch_timeout
+                self._ensure_timer()
+                self._timer_wakeup.notify()
+            if len(self._intake) < min(self.filter_chunk_size, self.max_events_per_batch):
+                return
+        self._drain_intake()
+    
+    def _drain_intake(self):
+        """Filter the collected raw events in one pass and accept the survivors
         
-        # Process batch if conditions are met
-        should_process = (
-            len(self._event_batch) >= self.max_events_per_batch or
-            current_time - self._last_batch_time >= self.batch_timeout or
-            batch_memory_usage > self.max_batch_memory_mb
-        )
+        The dispatcher and the flush timer both drain the intake. Taking the
+        chunk, filtering it and handing it to admission and the coalescer
+        happen under one lock, so chunks reach the coalescer (whose merge
+        rules depend on event order) in the order they arrived.
+        """
+        with self._intake_lock:
+            with self._lock:
+                events, self._intake = self._intake, []
+            if not events:
+                return
+            mask = self.event_filter.filter_batch(events)
+            accepted = self._admit([event for event, passed in zip(events, mask) if passed])
+        if accepted:
+            self._route(accepted)
+    
+    def _accept(self, events):
+        """Pass filtered events through admission and coalescing to the batch or the sinks"""
+        events = self._admit(events)
+        if events:
+            self._route(events)
+    
+    def _admit(self, events) -> List[FileSystemEvent]:
+        """Apply admission control and coalescing; returns the events to route now"""
+        if not events:
+            return []
+        if self.admission is not None:
+            with self._lock:
+                now = time.time()
+                had_summary = self.admission.next_deadline() is not None
+                events = [event for event in events
+                          if event.event_type == 'suppressed' or self.admission.admit(event, now)]
+                if not had_summary and self.admission.next_deadline() is not None:
+                    self._ensure_timer()
+                    self._timer_wakeup.notify()
+            if not events:
+                return []
+        
+        if self.coalescer is not None:
+            with self._lock:
+                was_idle = not self.coalescer
+                events = self.coalescer.add_all(events, time.time())
+                if was_idle and self.coalescer:
+                    self._ensure_timer()
+                    self._timer_wakeup.notify()
+        
+        return events
+    
+    def _route(self, events):
+        """Send accepted events to the batch, or straight to the sinks"""
+        if self.batch_events:
+            self._add_to_batch(events)
+        else:
+            with self._output_lock:
+                self._deliver(list(events))
+    
+    def _add_to_batch(self, events):
+        """Add accepted events to the current batch"""
+        with self._lock:
+            if self._batch_deadline is None:
+                self._batch_deadline = time.time() + self.batch_timeout
+                self._ensure_timer()
+                self._timer_wakeup.notify()
+            self._event_batch.extend(events)
+            should_process = self._batch_full()
         
         if should_process:
             self._process_batch()
     
+    def _batch_full(self) -> bool:
+        """Check the size and memory limits of the current batch (lock held)"""
+        return (
+            len(self._event_batch) >= self.max_events_per_batch or
+            self._estimate_batch_memory() > self.max_batch_memory_mb
+        )
+    
     def _estimate_batch_memory(self) -> float:
         """Estimate memory usage of current event batch in MB"""
-        if not self._event_batch:
-            return 0.0
-        
-        try:
-            import sys
-            total_size = 0
-            for event in self._event_batch:
-                # Rough estimate: event object + strings
-                total_size += sys.getsizeof(event)
-                total_size += sys.getsizeof(event.src_path) if event.src_path else 0
-                total_size += sys.getsizeof(event.dest_path) if event.dest_path else 0
-                total_size += 200  # Overhead per event
+        return self._event_batch.nbytes / (1024 * 1024)  # Convert to MB
+    
+    def _ensure_timer(self):
+        """Start the flush timer thread if needed (lock held)"""
+        if self._timer_thread is None:
+            self._timer_running = True
+            self._timer_thread = threading.Thread(target=self._run_timer,
+                                                  name='FilePulseBatchTimer', daemon=True)
+            self._timer_thread.start()
+    
+    def _next_deadline(self) -> Optional[float]:
+        """Earliest time the timer has work to do (lock held)"""
+        deadline = self._batch_deadline
+        if self.coalescer is not None:
+            pending = self.coalescer.next_deadline()
+            if pending is not None and (deadline is None or pending < deadline):
+                deadline = pending
+        if self.admission is not None:
+            summary = self.admission.next_deadline()
+            if summary is not None and (deadline is None or summary < deadline):
+                deadline = summary
+        return deadline
+    
+    def _run_timer(self):
+        """Release coalesced events and deliver each batch once its deadline passes"""
+        while True:
+            with self._lock:
+                while self._timer_running:
+                    deadline = self._next_deadline()
+                    now = time.time()
+                    if deadline is not None and now >= deadline:
+                        break
+                    self._timer_wakeup.wait(None if deadline is None else deadline - now)
+                if not self._timer_running:
+                    return
+                
+                expired = self.coalescer.expire(now) if self.coalescer is not None else []
+                if self.admission is not None:
+                    expired.extend(self.admission.take_summaries(now))
+                batch_due = self._batch_deadline is not None and now >= self._batch_deadline
             
-            return total_size / (1024 * 1024)  # Convert to MB
-        except:
-            # Fallback: assume ~500 bytes per event
-            return len(self._event_batch) * 500 / (1024 * 1024)
+            if batch_due:
+                self._drain_intake()
+            if expired:
+                self._route(expired)
+            if batch_due:
+                self._process_batch()
     
     def _process_batch(self):
         """Process accumulated events as a batch"""
-        if not self._event_batch:
-            return
-        
-        # Sort events by timestamp
-        self._event_batch.sort(key=lambda e: e.timestamp)
-        
-        # Send to output handlers
-        for handler in self.output_handlers:
-            try:
-                handler(self._event_batch)
-            except Exception as e:
-                logger.error(f"Error in output handler: {e}")
-        
-        # Clear batch
-        self._event_batch.clear()
-        self._last_batch_time = time.time()
+        with self._output_lock:
+            # Start a fresh batch; handlers may keep a reference to the old one
+            with self._lock:
+                # Events still waiting to be filtered keep a deadline of their own
+                self._batch_deadline = time.time() + self.batch_timeout if self._intake else None
+                if not self._event_batch:
+                    return
+                batch, self._event_batch = self._event_batch, EventBatch()
+            
+            # Send to output handlers (the batch iterates in timestamp order)
+            started = time.perf_counter()
+            self._deliver(batch)
+            
+            if self.batch_tuner is not None:
+                self.batch_tuner.observe_flush(len(batch), time.perf_counter() - started, time.time())
+                self.batch_timeout = self.batch_tuner.batch_timeout
+                self.max_events_per_batch = self.batch_tuner.max_events_per_batch
+    
+    def _deliver(self, events):
+        """Send events to every output handler"""
+        with self._serializer.delivery(events):
+            for handler in self.output_handlers:
+                try:
+                    handler(events)
+                except Exception as e:
+                    logger.error(f"Error in output handler: {e}")
     
     def _process_event(self, event: FileSystemEvent):
         """Process single event immediately"""
-        for handler in self.output_handlers:
-            try:
-                handler([event])
-            except Exception as e:
-                logger.error(f"Error in output handler: {e}")
+        self._deliver([event])
     
     def flush(self):
-        """Force processing of any pending batched events"""
-        if self._event_batch:
-            self._process_batch()
+        """Force processing of any pending coalesced and batched events"""
+        self._drain_intake()
+        
+        pending = []
+        with self._lock:
+            if self.coalescer is not None:
+                pending.extend(self.coalescer.drain())
+            if self.admission is not None:
+                pending.extend(self.admission.take_summaries(time.time(), force=True))
+        if pending:
+            self._route(pending)
+        self._process_batch()
+    
+    def close(self):
+        """Stop the flush timer, deliver any pending events and close the sinks"""
+        with self._lock:
+            self._timer_running = False
+            self._timer_wakeup.notify_all()
+            thread, self._timer_thread = self._timer_thread, None
+        if thread and thread is not threading.current_thread():
+            thread.join(timeout=1.0)
+        self.flush()
+        
+        # Let sinks holding files or other resources release them
+        for handler in self.output_handlers:
+            close = getattr(handler, 'close', None)
+            if close is not None:
+                try:
+                    close()
+                except Exception as e:
+                    logger.error(f"Error closing output handler: {e}")
+    
+    def get_batching_status(self) -> Dict[str, Any]:
+        """Get the batch bounds currently in effect"""
+        status = {
+            'enabled': self.batch_events,
+            'adaptive': self.batch_tuner is not None,
+            'batch_timeout': self.batch_timeout,
+            'max_events_per_batch': self.max_events_per_batch,
+            'pending_events': len(self._event_batch),
+            'unfiltered_events': len(self._intake),
+        }
+        if self.batch_tuner is not None:
+            status.update(self.batch_tuner.get_status())
+        return status
     
     def add_output_handler(self, handler: Callable):
         """Add an output handler"""
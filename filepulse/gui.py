@@ -515,9 +515,8 @@ Built with Python and Tkinter
             memory_limit = self.config.get('performance.memory_limit_mb', 50)
             print(f"[GUI] Starting monitor with memory limit: {memory_limit} MB")
             
-            # Optimize for GUI responsiveness
-            self.config.set('performance.batch_timeout', 0.3)  # Faster batching for GUI
-            self.config.set('performance.max_events_per_batch', 25)  # Reasonable batch size
+            # Optimize for GUI responsiveness: fast delivery when idle, larger batches in storms
+            self.config.set('performance.adaptive_batching', True)
             
             # Create GUI output handler
             def gui_output_handler(events):
@@ -559,13 +558,6 @@ Built with Python and Tkinter
             self.stop_button.config(state=tk.NORMAL)
             self.update_status("Monitoring started...")
             
-            # Set up periodic event handler flushing for responsive GUI
-            def flush_events():
-                if self.is_monitoring and self.monitor and self.monitor.event_handler:
-                    self.monitor.event_handler.flush()
-                if self.is_monitoring:
-                    self.root.after(500, flush_events)  # Flush every 500ms for better responsiveness
-            
             # Set up periodic stats refresh
             def refresh_stats_periodically():
                 if self.is_monitoring:
@@ -575,7 +567,6 @@ Built with Python and Tkinter
                         self.refresh_stats()
                     self.root.after(3000, refresh_stats_periodically)  # Refresh every 3 seconds
             
-            self.root.after(500, flush_events)
             self.root.after(3000, refresh_stats_periodically)
             
         except Exception as e:
@@ -0,0 +1,468 @@
+"""
+Indexed event history store for FilePulse
+
+Events are stored in binary log segments (see filepulse.binlog), one per
+time partition: each event goes to the segment of the partition its
+timestamp falls in, so a time range maps to a handful of files named
+after their partition (``events-20240101T120000Z-3600.fplog``).
+
+Every segment has an index file next to it (``.fplog.idx``) with one
+record per event block::
+
+    varint flags (bit 0: the segment's string table was reset first)
+    varint new strings   strings  (directories added to the string table)
+    varint offset, varint length  (the EVENTS record in the segment)
+    varint count, varint first timestamp, varint span (microseconds)
+    varint type count    strings  (event types in the block)
+    varint dir count     ints     (string IDs of every directory touched)
+
+The index is a sparse timestamp index (one entry per block rather than per
+event) and a path-prefix index at once: a query reads the indexes of the
+segments in its time range and decodes only the blocks whose time range,
+event types and directories can match.
+"""
+
+import os
+import re
+import time
+import calendar
+import logging
+from datetime import datetime
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from .binlog import (MAGIC, RECORD_EVENTS, RECORD_RESET, RECORD_STRINGS, EncodedBlock, EventBlock,
+                     SegmentEncoder, decode_varint, encode_record, encode_varint, pack_ints, pack_strings,
+                     reset_record, unpack_ints, unpack_strings, unzigzag, zigzag)
+from .events import EventBatch, FileSystemEvent, event_type_id
+from .logreader import LogReader
+
+logger = logging.getLogger(__name__)
+
+INDEX_MAGIC = b'FPIDX\x00\x01\n'
+INDEX_SUFFIX = '.idx'
+SEGMENT_SUFFIX = '.fplog'
+
+RECORD_BLOCK = 1
+BLOCK_RESET = 0x01
+
+_SEGMENT_NAME = re.compile(r'^events-(\d{8}T\d{6})Z-(\d+)\.fplog$')
+_DURATION = re.compile(r'^(\d+(?:\.\d+)?)([smhdw])$')
+_DURATION_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+
+def partition_start(timestamp: float, length: int) -> int:
+    """Start of the partition holding timestamp (partitions are aligned to the epoch)"""
+    return int(timestamp // length) * length
+
+
+def segment_name(start: int, length: int) -> str:
+    """File name of the segment for a partition"""
+    return f"events-{time.strftime('%Y%m%dT%H%M%S', time.gmtime(start))}Z-{length}{SEGMENT_SUFFIX}"
+
+
+def parse_segment_name(name: str) -> Optional[Tuple[int, int]]:
+    """(start, length) of a segment file name, or None for other files"""
+    match = _SEGMENT_NAME.match(name)
+    if not match:
+        return None
+    return calendar.timegm(time.strptime(match.group(1), '%Y%m%dT%H%M%S')), int(match.group(2))
+
+
+def parse_time(text: str, now: float = None) -> float:
+    """Parse a query time: epoch seconds, an ISO 8601 date/time or an age like '15m'
+
+    Ages (``s``, ``m``, ``h``, ``d``, ``w``) count back from now; ISO times
+    without a UTC offset are local time.
+    """
+    text = text.strip()
+    match = _DURATION.match(text)
+    if match:
+        now = time.time() if now is None else now
+        return now - float(match.group(1)) * _DURATION_UNITS[match.group(2)]
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    try:
+        if text.endswith('Z'):
+            text = text[:-1] + '+00:00'
+        return datetime.fromisoformat(text).timestamp()
+    except ValueError:
+        raise ValueError(f"Invalid time: {text!r} (use epoch seconds, ISO 8601 or an age like 15m)")
+
+
+def split_partitions(events, length: int) -> Iterator[Tuple[int, EventBatch]]:
+    """Split a batch into (partition start, events) pairs"""
+    if not isinstance(events, EventBatch):
+        events = EventBatch(list(events))
+    timestamps = events.columns().timestamps
+    first = partition_start(min(timestamps), length)
+    if first == partition_start(max(timestamps), length):
+        yield first, events
+        return
+
+    groups = {}
+    for event in events:
+        groups.setdefault(partition_start(event.timestamp, length), []).append(event)
+    for start in sorted(groups):
+        yield start, EventBatch(groups[start])
+
+
+def index_record(block: EncodedBlock, offset: int, length: int, reset: bool = False) -> bytes:
+    """Index record for a block whose EVENTS record is at offset in the segment"""
+    parts = [
+        encode_varint(BLOCK_RESET if reset else 0),
+        encode_varint(len(block.new_strings)), pack_strings(block.new_strings),
+        encode_varint(offset), encode_varint(length),
+        encode_varint(block.count), encode_varint(zigzag(block.first)),
+        encode_varint(block.last - block.first),
+        encode_varint(len(block.types)), pack_strings(block.types),
+        encode_varint(len(block.dir_ids)), pack_ints(block.dir_ids),
+    ]
+    return encode_record(RECORD_BLOCK, b''.join(parts))
+
+
+class IndexEntry:
+    """One block of a segment as described by its index record"""
+
+    __slots__ = ('body', 'pos', 'offset', 'length', 'count', 'first', 'last', 'strings')
+
+    def __init__(self, body, pos: int, offset: int, length: int, count: int, first: int, last: int,
+                 strings: List[str]):
+        self.body = body
+        self.pos = pos  # where the event types start in body
+        self.offset = offset
+        self.length = length
+        self.count = count
+        self.first = first
+        self.last = last
+        self.strings = strings  # string table the block refers to
+
+    def details(self) -> Tuple[List[str], List[int]]:
+        """Decode (event types, directory IDs); only done for blocks in range"""
+        type_count, pos = decode_varint(self.body, self.pos)
+        types, pos = unpack_strings(self.body, pos, type_count)
+        dir_count, pos = decode_varint(self.body, pos)
+        dir_ids, _ = unpack_ints(self.body, pos, dir_count)
+        return types, dir_ids
+
+
+def read_index(reader: LogReader) -> Iterator[IndexEntry]:
+    """Yield the entries of an open index file"""
+    strings: List[str] = []
+    for _, kind, body in reader.records():
+        if kind != RECORD_BLOCK:
+            continue
+        flags, pos = decode_varint(body, 1)
+        if flags & BLOCK_RESET:
+            strings = []
+        new_count, pos = decode_varint(body, pos)
+        if new_count:
+            new, pos = unpack_strings(body, pos, new_count)
+            strings.extend(new)
+        else:
+            _, pos = unpack_strings(body, pos, 0)
+        offset, pos = decode_varint(body, pos)
+        length, pos = decode_varint(body, pos)
+        count, pos = decode_varint(body, pos)
+        first, pos = decode_varint(body, pos)
+        span, pos = decode_varint(body, pos)
+        first = unzigzag(first)
+        yield IndexEntry(body, pos, offset, length, count, first, first + span, strings)
+
+
+def _open_index(segment_path: str) -> Optional[LogReader]:
+    try:
+        return LogReader(segment_path + INDEX_SUFFIX, magic=INDEX_MAGIC)
+    except (OSError, ValueError):
+        return None
+
+
+def index_end(segment_path: str) -> Optional[int]:
+    """Segment offset up to which the index describes it, or None without an index"""
+    reader = _open_index(segment_path)
+    if reader is None:
+        return None
+    with reader:
+        end = len(MAGIC)
+        for entry in read_index(reader):
+            end = entry.offset + entry.length
+        return end
+
+
+def build_index(segment_path: str) -> int:
+    """Rewrite the index of a segment from its contents; returns the blocks indexed"""
+    records = []
+    with LogReader(segment_path) as reader:
+        strings: List[str] = []
+        table = {}
+        new_strings: List[str] = []
+        reset = False
+        for offset, kind, body in reader.records():
+            if kind == RECORD_STRINGS:
+                count, pos = decode_varint(body, 1)
+                new, _ = unpack_strings(body, pos, count)
+                for string in new:
+                    table[string] = len(strings)
+                    strings.append(string)
+                new_strings.extend(new)
+            elif kind == RECORD_RESET:
+                strings, table, new_strings = [], {}, []
+                reset = True
+            elif kind == RECORD_EVENTS:
+                block = EventBlock(body, strings)
+                if not block.count:
+                    continue
+                dirs = set(block.dirs)
+                dirs.update(os.path.dirname(path) for path in block.moves.values())
+                micros = [int(round(timestamp * 1e6)) for timestamp in block.timestamps]
+                summary = EncodedBlock(b'', b'', new_strings, block.count, min(micros), max(micros),
+                                       sorted(set(block.types), key=event_type_id),
+                                       sorted(table[d] for d in dirs))
+                records.append(index_record(summary, offset, reader.record_length(offset), reset))
+                new_strings = []
+                reset = False
+
+    partial = segment_path + INDEX_SUFFIX + '.tmp'
+    with open(partial, 'wb') as f:
+        f.write(INDEX_MAGIC + b''.join(records))
+    os.replace(partial, segment_path + INDEX_SUFFIX)
+    return len(records)
+
+
+def repair_segment(segment_path: str) -> bool:
+    """Make a segment and its index consistent before appending to them
+
+    A segment cut short by a crash is truncated to its last complete record
+    and an index that lags behind its segment is rebuilt. Returns True if
+    anything was repaired.
+    """
+    index_path = segment_path + INDEX_SUFFIX
+    try:
+        size = os.path.getsize(segment_path)
+    except FileNotFoundError:
+        size = 0
+    if size <= len(MAGIC):
+        if size and size < len(MAGIC):
+            os.truncate(segment_path, 0)
+        if os.path.exists(index_path):
+            os.remove(index_path)
+        return bool(size and size < len(MAGIC))
+
+    if index_end(segment_path) == size:
+        return False
+
+    with LogReader(segment_path) as reader:
+        end = len(MAGIC)
+        for offset, _, _ in reader.records():
+            end = offset + reader.record_length(offset)
+    if end < size:
+        logger.warning(f"Truncating incomplete record at the end of {segment_path}")
+        os.truncate(segment_path, end)
+    logger.info(f"Rebuilding history index for {segment_path}")
+    build_index(segment_path)
+    return True
+
+
+class SegmentWriter:
+    """Appends event blocks to one segment and its index
+
+    ``open_file`` creates the append handles (see output.AppendFile), which
+    decide buffering and durability.
+    """
+
+    def __init__(self, path: str, open_file: Callable[[str], object]):
+        repair_segment(path)
+        self.path = path
+        self.data = open_file(path)
+        self.index = open_file(path + INDEX_SUFFIX)
+        self.encoder = SegmentEncoder()
+
+    def write(self, events):
+        """Append a batch of events that all belong to this segment's partition"""
+        entries = []
+
+        def render(fresh: bool) -> bytes:
+            prefix = b''
+            reset = False
+            if fresh:
+                self.encoder.reset()
+                if self.data.size == 0:
+                    prefix = MAGIC
+                else:
+                    prefix = reset_record()
+                    reset = True
+            block = self.encoder.encode_block(events)
+            if block is None:
+                return prefix
+            offset = self.data.size + len(prefix) + len(block.strings)
+            entries.append(index_record(block, offset, len(block.events), reset))
+            return prefix + block.strings + block.events
+
+        self.data.write_batch(render)
+        if entries:
+            self.index.write_batch(
+                lambda fresh: (INDEX_MAGIC if self.index.size == 0 else b'') + entries[0])
+
+    def close(self):
+        """Close the segment and its index"""
+        self.data.close()
+        self.index.close()
+
+
+class PrefixMatcher:
+    """Matches paths equal to or below a prefix, one directory at a time"""
+
+    def __init__(self, prefix: str):
+        self.prefix = os.path.realpath(os.path.expanduser(prefix))
+        self._below = self.prefix.rstrip(os.sep) + os.sep
+        self._parent, self._name = os.path.split(self.prefix)
+        self._verdicts = {}
+
+    def directory(self, directory: str):
+        """True if everything in directory matches, the one matching name, or False"""
+        verdict = self._verdicts.get(directory)
+        if verdict is None:
+            if directory == self.prefix or directory.startswith(self._below):
+                verdict = True
+            elif directory == self._parent and self._name:
+                verdict = self._name
+            else:
+                verdict = False
+            self._verdicts[directory] = verdict
+        return verdict
+
+    def directory_ids(self, directories: List[str], start: int = 0) -> List[int]:
+        """Indexes of the directories from start on that hold matching paths"""
+        prefix, below, parent = self.prefix, self._below, self._parent if self._name else None
+        return [index for index, directory in enumerate(directories[start:], start)
+                if directory == prefix or directory == parent or directory.startswith(below)]
+
+    def path(self, path: str) -> bool:
+        """Check a full path"""
+        return path == self.prefix or path.startswith(self._below)
+
+
+class HistoryStore:
+    """Answers time, path-prefix and event-type queries over a history directory"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+        # Statistics of the last query
+        self.segments_read = 0
+        self.blocks_read = 0
+        self.blocks_skipped = 0
+
+    def segments(self) -> List[Tuple[int, int, str]]:
+        """(start, length, path) of every segment, oldest first"""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        segments = []
+        for name in names:
+            partition = parse_segment_name(name)
+            if partition is not None:
+                segments.append((partition[0], partition[1], os.path.join(self.directory, name)))
+        segments.sort()
+        return segments
+
+    def query(self, since: float = None, until: float = None, path_prefix: str = None,
+              types: List[str] = None) -> Iterator[FileSystemEvent]:
+        """Yield the matching events (``since`` and ``until`` inclusive)"""
+        for events in self.query_blocks(since, until, path_prefix, types):
+            yield from events
+
+    def query_blocks(self, since: float = None, until: float = None, path_prefix: str = None,
+                     types: List[str] = None) -> Iterator[List[FileSystemEvent]]:
+        """Like query(), yielding the matches of one block at a time"""
+        self.segments_read = self.blocks_read = self.blocks_skipped = 0
+        since_us = None if since is None else int(round(since * 1e6))
+        until_us = None if until is None else int(round(until * 1e6))
+        matcher = PrefixMatcher(path_prefix) if path_prefix else None
+        type_set = set(types) if types else None
+
+        for start, length, path in self.segments():
+            if since is not None and start + length <= since:
+                continue
+            if until is not None and start > until:
+                continue
+            self.segments_read += 1
+            yield from self._query_segment(path, since_us, until_us, matcher, type_set)
+
+    def _query_segment(self, path, since_us, until_us, matcher, type_set):
+        try:
+            reader = LogReader(path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Skipping unreadable history segment {path}: {e}")
+            return
+
+        with reader:
+            end = len(MAGIC)
+            strings: List[str] = []
+            table = None  # string table the matching directory IDs were computed for
+            matching = set()
+            checked = 0
+
+            index = _open_index(path)
+            entries = read_index(index) if index is not None else ()
+            for entry in entries:
+                if entry.offset + entry.length > len(reader):
+                    break  # the index is ahead of the segment
+                end = entry.offset + entry.length
+                strings = entry.strings
+                if ((since_us is not None and entry.last < since_us)
+                        or (until_us is not None and entry.first > until_us)):
+                    self.blocks_skipped += 1
+                    continue
+
+                if type_set is not None or matcher is not None:
+                    block_types, dir_ids = entry.details()
+                    if type_set is not None and type_set.isdisjoint(block_types):
+                        self.blocks_skipped += 1
+                        continue
+                    if matcher is not None:
+                        if table is not strings:
+                            table, matching, checked = strings, set(), 0
+                        matching.update(matcher.directory_ids(strings, checked))
+                        checked = len(strings)
+                        if matching.isdisjoint(dir_ids):
+                            self.blocks_skipped += 1
+                            continue
+
+                _, body = reader.record_at(entry.offset)
+                events = self._matches(EventBlock(body, strings), since_us, until_us, matcher, type_set)
+                if events:
+                    yield events
+            if index is not None:
+                index.close()
+
+            # Blocks the index does not cover yet
+            for _, block in reader.blocks(end, list(strings)):
+                events = self._matches(block, since_us, until_us, matcher, type_set)
+                if events:
+                    yield events
+
+    def _matches(self, block: EventBlock, since_us, until_us, matcher, type_set) -> List[FileSystemEvent]:
+        self.blocks_read += 1
+        rows = range(block.count)
+        if since_us is not None or until_us is not None:
+            since = -float('inf') if since_us is None else since_us / 1e6
+            until = float('inf') if until_us is None else until_us / 1e6
+            timestamps = block.timestamps
+            rows = [row for row in rows if since <= timestamps[row] <= until]
+        if type_set is not None:
+            event_types = block.types
+            rows = [row for row in rows if event_types[row] in type_set]
+        if matcher is not None:
+            dirs, names, moves = block.dirs, block.names, block.moves
+            selected = []
+            for row in rows:
+                verdict = matcher.directory(dirs[row])
+                if verdict is True or (verdict and names[row] == verdict):
+                    selected.append(row)
+                elif row in moves and matcher.path(moves[row]):
+                    selected.append(row)
+            rows = selected
+        return block.events(rows) if rows else []
@@ -0,0 +1,341 @@
+"""
+gitignore-style ignore files for FilePulse
+
+Patterns from ``.gitignore``/``.filepulseignore`` files are compiled into a
+trie keyed by path components, so matching a path costs time proportional
+to its depth rather than to the number of patterns.
+"""
+
+import os
+import re
+import fnmatch
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from .utils import LRUCache
+
+logger = logging.getLogger(__name__)
+
+_GLOBSTAR = '**'
+
+
+class _Node:
+    """A trie node; children are keyed by one path component each"""
+
+    __slots__ = ('literals', 'extensions', 'wildcards', 'globstar', 'rules', 'is_globstar')
+
+    def __init__(self, is_globstar: bool = False):
+        self.is_globstar = is_globstar  # stays active while components are consumed
+        self.literals: Dict[str, '_Node'] = {}
+        self.extensions: Dict[str, '_Node'] = {}  # '*.ext' components
+        self.wildcards: List[Tuple[object, '_Node']] = []  # (compiled match, child)
+        self.globstar: Optional['_Node'] = None  # '**': zero or more components
+        self.rules: List[Tuple[int, bool, bool]] = []  # (index, negate, dir_only)
+
+    def child(self, segment: str) -> '_Node':
+        if segment == _GLOBSTAR:
+            if self.globstar is None:
+                self.globstar = _Node(is_globstar=True)
+            return self.globstar
+
+        if not _has_magic(segment):
+            key = _unescape(segment)
+            table = self.literals
+        elif (segment.startswith('*.') and not _has_magic(segment[2:])
+              and '.' not in segment[2:]):
+            key = _unescape(segment[2:])
+            table = self.extensions
+        else:
+            regex = _translate(segment)
+            for pattern, node in self.wildcards:
+                if pattern.pattern == regex:
+                    return node
+            node = _Node()
+            self.wildcards.append((re.compile(regex), node))
+            return node
+
+        node = table.get(key)
+        if node is None:
+            node = table[key] = _Node()
+        return node
+
+    def step(self, component: str, out: List['_Node']):
+        """Append the children reached by consuming one component"""
+        node = self.literals.get(component)
+        if node is not None:
+            out.append(node)
+        if self.extensions:
+            dot = component.rfind('.')
+            if dot >= 0:
+                node = self.extensions.get(component[dot + 1:])
+                if node is not None:
+                    out.append(node)
+        for pattern, node in self.wildcards:
+            if pattern.match(component):
+                out.append(node)
+
+
+def _has_magic(segment: str) -> bool:
+    escaped = False
+    for char in segment:
+        if escaped:
+            escaped = False
+        elif char == '\\':
+            escaped = True
+        elif char in '*?[':
+            return True
+    return False
+
+
+def _unescape(segment: str) -> str:
+    return re.sub(r'\\(.)', r'\1', segment)
+
+
+def _translate(segment: str) -> str:
+    # fnmatch has no backslash escapes, but a one-character class is literal
+    return fnmatch.translate(re.sub(r'\\(.)', lambda m: '[' + m.group(1) + ']', segment))
+
+
+def _closure(nodes: List[_Node]) -> List[_Node]:
+    """Add the '**' children of nodes, which match zero components"""
+    result = []
+    seen = set()
+    for node in nodes:
+        while node is not None and id(node) not in seen:
+            seen.add(id(node))
+            result.append(node)
+            node = node.globstar
+    return result
+
+
+class IgnoreRules:
+    """The patterns of one ignore file, relative to the directory holding it"""
+
+    def __init__(self, lines: List[str], base: str = '', source: str = None):
+        self.base = base
+        self.source = source
+        self.root = _Node()
+        self.count = 0
+
+        for line in lines:
+            self.add(line)
+
+    @classmethod
+    def from_file(cls, path: str) -> 'IgnoreRules':
+        """Load rules from an ignore file"""
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            return cls(f.read().splitlines(), os.path.dirname(path), path)
+
+    def add(self, line: str):
+        """Add one line of gitignore syntax"""
+        # Trailing spaces are dropped unless escaped
+        line = line.rstrip('\n\r')
+        stripped = line.rstrip(' ')
+        if stripped.endswith('\\') and len(stripped) < len(line):
+            stripped += ' '
+        line = stripped
+        if not line or line.startswith('#'):
+            return
+
+        negate = line.startswith('!')
+        if negate:
+            line = line[1:]
+        elif line.startswith('\\#') or line.startswith('\\!'):
+            line = line[1:]
+
+        dir_only = line.endswith('/')
+        line = line.rstrip('/')
+        if not line:
+            return
+
+        # A slash anywhere but the end anchors the pattern to this directory
+        anchored = '/' in line
+        segments = [segment for segment in line.lstrip('/').split('/') if segment]
+        if not anchored and segments[0] != _GLOBSTAR:
+            segments.insert(0, _GLOBSTAR)
+        if segments[-1] == _GLOBSTAR:
+            # 'dir/**' matches everything inside dir, but not dir itself
+            segments[-1:] = ['*', _GLOBSTAR]
+
+        node = self.root
+        previous = None
+        for segment in segments:
+            if segment == previous == _GLOBSTAR:
+                continue
+            node = node.child(segment)
+            previous = segment
+        node.rules.append((self.count, negate, dir_only))
+        self.count += 1
+
+    def match(self, components: List[str], is_directory: bool) -> Optional[bool]:
+        """Match a path relative to the base directory
+
+        Returns True if the last matching pattern ignores the path, False if
+        it re-includes it (``!pattern``) and None if no pattern matches.
+        """
+        nodes = _closure([self.root])
+        for component in components:
+            reached = []
+            for node in nodes:
+                node.step(component, reached)
+                if node.is_globstar:
+                    reached.append(node)
+            if not reached:
+                return None
+            nodes = _closure(reached)
+
+        best = None
+        for node in nodes:
+            for index, negate, dir_only in node.rules:
+                if dir_only and not is_directory:
+                    continue
+                if best is None or index > best[0]:
+                    best = (index, negate)
+        if best is None:
+            return None
+        return not best[1]
+
+    def __len__(self) -> int:
+        return self.count
+
+
+class IgnoreFileMatcher:
+    """Applies ignore files found in the monitored directories
+
+    Names without a path separator (``.gitignore``) are looked up in every
+    directory from the monitored root down to an event's directory; the file
+    is only read the first time an event comes from below that directory,
+    and read again only after an event reports that the file itself changed
+    (or after it dropped out of the ``cache_size`` most recently used
+    directories). Entries that are paths name a single file whose patterns apply below its
+    own directory, with lower precedence than per-directory files.
+    """
+
+    def __init__(self, roots: List[str], ignore_files: List[str], cache_size: int = 4096):
+        self.roots = sorted({os.path.realpath(root) for root in roots}, key=len, reverse=True)
+        self.names = frozenset(name for name in ignore_files if os.sep not in name and '/' not in name)
+
+        self.global_rules: List[IgnoreRules] = []
+        for path in ignore_files:
+            if path in self.names:
+                continue
+            path = os.path.realpath(os.path.expanduser(path))
+            try:
+                self.global_rules.append(IgnoreRules.from_file(path))
+            except OSError as e:
+                logger.warning(f"Cannot read ignore file {path}: {e}")
+
+        self._rules = LRUCache(max_size=cache_size)  # directory -> its loaded files
+        self._dir_verdicts = LRUCache(max_size=cache_size)
+
+        # Statistics
+        self.loads = 0
+
+    @classmethod
+    def from_config(cls, config) -> Optional['IgnoreFileMatcher']:
+        """Create a matcher from configuration, or None if no ignore files are set"""
+        ignore_files = config.get('monitoring.filters.ignore_files') or []
+        if not ignore_files:
+            return None
+        return cls(config.monitoring_paths, ignore_files,
+                   config.get('performance.filter_cache_size', 4096))
+
+    def _root_of(self, path: str) -> Optional[str]:
+        for root in self.roots:
+            if path == root or path.startswith(root.rstrip(os.sep) + os.sep):
+                return root
+        return None
+
+    def _rules_in(self, directory: str) -> List[IgnoreRules]:
+        """Get the ignore files of a directory, loading them on first use"""
+        rules = self._rules.get(directory)
+        if rules is None:
+            rules = []
+            for name in sorted(self.names):
+                path = os.path.join(directory, name)
+                try:
+                    rules.append(IgnoreRules.from_file(path))
+                    self.loads += 1
+                    logger.debug(f"Loaded ignore file {path}")
+                except FileNotFoundError:
+                    continue
+                except OSError as e:
+                    logger.warning(f"Cannot read ignore file {path}: {e}")
+            self._rules.put(directory, rules)
+        return rules
+
+    def notice(self, path: str) -> bool:
+        """Drop a cached ignore file if an event reports it changed
+
+        Returns True when path is an ignore file, so its verdicts were reset.
+        """
+        directory, name = os.path.split(path)
+        if name not in self.names:
+            return False
+        # Verdicts may rest on rules that have since been evicted, so reset them regardless
+        self._rules.pop(directory)
+        self._dir_verdicts.clear()
+        return True
+
+    def invalidate(self):
+        """Forget all loaded per-directory files and cached verdicts"""
+        self._rules.clear()
+        self._dir_verdicts.clear()
+
+    def is_ignored(self, path: str, is_directory: bool = False) -> bool:
+        """Check if an ignore file excludes the path or any directory above it"""
+        directory = os.path.dirname(path)
+        if directory != path and self._is_ignored_directory(directory):
+            return True
+        return self._match(path, is_directory)
+
+    def _is_ignored_directory(self, directory: str) -> bool:
+        verdict = self._dir_verdicts.get(directory)
+        if verdict is None:
+            parent = os.path.dirname(directory)
+            root = self._root_of(directory)
+            if root is not None and directory == root:
+                verdict = False
+            elif parent != directory and self._is_ignored_directory(parent):
+                verdict = True
+            else:
+                verdict = self._match(directory, True)
+            self._dir_verdicts.put(directory, verdict)
+        return verdict
+
+    def _match(self, path: str, is_directory: bool) -> bool:
+        verdict = None
+        for rules in self.global_rules:
+            result = self._match_rules(rules, path, is_directory)
+            if result is not None:
+                verdict = result
+
+        root = self._root_of(path)
+        if root is None or path == root or not self.names:
+            return bool(verdict)
+
+        # Deeper ignore files take precedence over shallower ones
+        components = os.path.relpath(path, root).split(os.sep)
+        directory = root
+        for depth in range(len(components)):
+            for rules in self._rules_in(directory):
+                result = rules.match(components[depth:], is_directory)
+                if result is not None:
+                    verdict = result
+            directory = os.path.join(directory, components[depth])
+        return bool(verdict)
+
+    @staticmethod
+    def _match_rules(rules: IgnoreRules, path: str, is_directory: bool) -> Optional[bool]:
+        base = rules.base
+        if path == base or not path.startswith(base.rstrip(os.sep) + os.sep):
+            return None
+        return rules.match(os.path.relpath(path, base).split(os.sep), is_directory)
+
+    def get_status(self) -> dict:
+        """Get ignore file statistics"""
+        return {
+            'ignore_files_loaded': sum(len(rules) for rules in self._rules.values())
+                                   + len(self.global_rules),
+            'ignore_file_loads': self.loads,
+        }
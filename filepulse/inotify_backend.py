@@ -0,0 +1,406 @@
+"""
+Native Linux inotify backend for FilePulse
+"""
+
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+import threading
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from .events import FileSystemEvent, EventHandler
+
+logger = logging.getLogger(__name__)
+
+# inotify event masks (see inotify(7))
+IN_MODIFY = 0x00000002
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_EXCL_UNLINK = 0x04000000
+IN_ISDIR = 0x40000000
+
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, 'O_CLOEXEC', 0o2000000)
+
+DEFAULT_MASK = (IN_CREATE | IN_DELETE | IN_MODIFY | IN_MOVED_FROM | IN_MOVED_TO |
+                IN_DELETE_SELF | IN_MOVE_SELF)
+
+# struct inotify_event { int wd; uint32_t mask; uint32_t cookie; uint32_t len; char name[]; }
+_EVENT_HEADER = struct.Struct('iIII')
+
+DEFAULT_BUFFER_SIZE = 256 * 1024
+
+# Compact decoded event: (event_type, src_path, dest_path, is_directory)
+RawEvent = Tuple[str, str, Optional[str], bool]
+
+_libc = None
+
+
+def _load_libc():
+    """Load libc and bind the inotify functions, or return None"""
+    global _libc
+    if _libc is not None:
+        return _libc or None
+
+    _libc = False
+    if not sys.platform.startswith('linux'):
+        return None
+
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_init1.restype = ctypes.c_int
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_add_watch.restype = ctypes.c_int
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        libc.inotify_rm_watch.restype = ctypes.c_int
+    except (OSError, AttributeError) as e:
+        logger.debug(f"inotify is not available: {e}")
+        return None
+
+    _libc = libc
+    return libc
+
+
+def is_available() -> bool:
+    """Check if the inotify backend can be used on this system"""
+    return _load_libc() is not None
+
+
+def decode_events(data: bytes) -> List[Tuple[int, int, int, bytes]]:
+    """Decode a raw inotify read buffer into (wd, mask, cookie, name) records"""
+    records = []
+    unpack_from = _EVENT_HEADER.unpack_from
+    header_size = _EVENT_HEADER.size
+    offset = 0
+    end = len(data)
+
+    while offset + header_size <= end:
+        wd, mask, cookie, length = unpack_from(data, offset)
+        offset += header_size
+        if length:
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+        else:
+            name = b''
+        records.append((wd, mask, cookie, name))
+
+    return records
+
+
+class InotifyBackend:
+    """Filesystem observer reading events directly from an inotify descriptor
+
+    Mirrors the parts of the watchdog ``Observer`` API used by
+    ``FileSystemMonitor`` (``schedule``/``start``/``stop``/``join``), but
+    decodes many kernel records per ``read`` and hands whole batches of
+    events to ``handle_events`` of the scheduled handler (an ``EventHandler``
+    or ``EventDispatcher``).
+    """
+
+    def __init__(self, buffer_size: int = DEFAULT_BUFFER_SIZE, planner=None):
+        self._libc = _load_libc()
+        if self._libc is None:
+            raise OSError("inotify is only available on Linux")
+
+        self.buffer_size = buffer_size
+        self.planner = planner
+        self.mask = 0 if planner else DEFAULT_MASK
+
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_init1 failed: {os.strerror(err)}")
+
+        self._wake_r, self._wake_w = os.pipe()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._running = False
+
+        self._handlers: List[EventHandler] = []
+        self._wd_to_path: Dict[int, str] = {}
+        self._path_to_wd: Dict[str, int] = {}
+        self._recursive_roots: List[str] = []
+
+        # MOVED_FROM records waiting for their MOVED_TO partner, keyed by cookie
+        self._pending_moves: Dict[int, Tuple[str, bool]] = {}
+
+        # Statistics
+        self.reads = 0
+        self.records = 0
+        self.overflows = 0
+
+    # -- watch management -------------------------------------------------
+
+    def schedule(self, event_handler: EventHandler, path: str, recursive: bool = True):
+        """Start watching a path and deliver its events to an event handler"""
+        path = os.path.abspath(path)
+        if event_handler not in self._handlers:
+            self._handlers.append(event_handler)
+        if self.planner:
+            self.mask |= self.planner.inotify_mask(recursive)
+
+        if recursive:
+            self._recursive_roots.append(path)
+            self._add_tree(path)
+        else:
+            self._add_watch(path)
+
+    def _should_watch(self, name: str) -> bool:
+        return self.planner is None or not self.planner.is_ignored_directory(name)
+
+    def _is_recursive(self, path: str) -> bool:
+        for root in self._recursive_roots:
+            if path == root or path.startswith(root.rstrip(os.sep) + os.sep):
+                return True
+        return False
+
+    def _add_watch(self, path: str) -> Optional[int]:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path),
+                                          self.mask | IN_ONLYDIR | IN_EXCL_UNLINK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == errno.ENOSPC:
+                logger.error("inotify watch limit reached; raise "
+                             "fs.inotify.max_user_watches to watch more directories")
+            elif err not in (errno.ENOENT, errno.ENOTDIR):
+                logger.warning(f"Failed to watch {path}: {os.strerror(err)}")
+            return None
+
+        with self._lock:
+            old_path = self._wd_to_path.get(wd)
+            if old_path is not None and old_path != path:
+                self._path_to_wd.pop(old_path, None)
+            self._wd_to_path[wd] = path
+            self._path_to_wd[path] = wd
+        return wd
+
+    def _add_tree(self, root: str, emit_contents: bool = False) -> List[RawEvent]:
+        """Watch a directory tree; optionally report its contents as created"""
+        created = []
+        stack = [root]
+        while stack:
+            directory = stack.pop()
+            if self._add_watch(directory) is None:
+                continue
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        try:
+                            is_dir = entry.is_dir(follow_symlinks=False)
+                        except OSError:
+                            continue
+                        if is_dir and self._should_watch(entry.name):
+                            stack.append(entry.path)
+                        if emit_contents:
+                            created.append(('created', entry.path, None, is_dir))
+            except OSError:
+                continue
+        return created
+
+    def _forget_tree(self, path: str):
+        """Drop watch bookkeeping for a directory and everything below it"""
+        prefix = path.rstrip(os.sep) + os.sep
+        with self._lock:
+            doomed = [p for p in self._path_to_wd if p == path or p.startswith(prefix)]
+            for p in doomed:
+                wd = self._path_to_wd.pop(p)
+                self._wd_to_path.pop(wd, None)
+                self._libc.inotify_rm_watch(self._fd, wd)
+
+    def _rename_tree(self, old_path: str, new_path: str):
+        """Update watch bookkeeping after a watched directory was moved"""
+        old_prefix = old_path.rstrip(os.sep) + os.sep
+        with self._lock:
+            moved = [p for p in self._path_to_wd if p == old_path or p.startswith(old_prefix)]
+            for p in moved:
+                wd = self._path_to_wd.pop(p)
+                renamed = new_path + p[len(old_path):]
+                self._wd_to_path[wd] = renamed
+                self._path_to_wd[renamed] = wd
+
+    @property
+    def watch_count(self) -> int:
+        """Number of installed inotify watches"""
+        return len(self._wd_to_path)
+
+    # -- lifecycle ----------------------------------------------------------
+
+    def start(self):
+        """Start the reader thread"""
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='FilePulseInotify', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Signal the reader thread to stop"""
+        self._running = False
+        try:
+            os.write(self._wake_w, b'x')
+        except OSError:
+            pass
+
+    def join(self, timeout: float = None):
+        """Wait for the reader thread and release the inotify descriptor"""
+        if self._thread:
+            self._thread.join(timeout)
+        self._close()
+
+    def is_alive(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    def _close(self):
+        for fd in (self._fd, self._wake_r, self._wake_w):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        self._fd = self._wake_r = self._wake_w = -1
+
+    # -- reading --------------------------------------------------------------
+
+    def _run(self):
+        poller = select.poll()
+        poller.register(self._fd, select.POLLIN)
+        poller.register(self._wake_r, select.POLLIN)
+
+        while self._running:
+            # Wake up periodically while a MOVED_FROM waits for its partner
+            timeout = 50 if self._pending_moves else None
+            try:
+                ready = poller.poll(timeout)
+            except InterruptedError:
+                continue
+
+            if not ready:
+                self._dispatch(self._flush_pending_moves())
+                continue
+
+            if not self._running:
+                break
+
+            try:
+                data = os.read(self._fd, self.buffer_size)
+            except BlockingIOError:
+                continue
+            except OSError as e:
+                logger.error(f"Error reading inotify events: {e}")
+                break
+
+            self.reads += 1
+            self._dispatch(self._translate(decode_events(data)))
+
+        self._dispatch(self._flush_pending_moves())
+
+    def _translate(self, records: List[Tuple[int, int, int, bytes]]) -> List[RawEvent]:
+        """Turn decoded kernel records into compact event tuples"""
+        events: List[RawEvent] = []
+        wd_to_path = self._wd_to_path
+        self.records += len(records)
+
+        # The kernel queues MOVED_FROM/MOVED_TO pairs back to back, so a move
+        # carried over from the previous read must be completed by this one
+        carried = set(self._pending_moves)
+
+        for wd, mask, cookie, name in records:
+            if mask & IN_Q_OVERFLOW:
+                self.overflows += 1
+                logger.warning("inotify queue overflowed; some events were lost")
+                continue
+
+            if mask & IN_IGNORED:
+                with self._lock:
+                    path = self._wd_to_path.pop(wd, None)
+                    if path is not None and self._path_to_wd.get(path) == wd:
+                        del self._path_to_wd[path]
+                continue
+
+            directory = wd_to_path.get(wd)
+            if directory is None or not name:
+                # Self events (IN_DELETE_SELF/IN_MOVE_SELF) are reported by the parent
+                continue
+
+            name_str = os.fsdecode(name)
+            path = os.path.join(directory, name_str)
+            is_dir = bool(mask & IN_ISDIR)
+
+            if mask & IN_CREATE:
+                events.append(('created', path, None, is_dir))
+                if is_dir and self._is_recursive(path) and self._should_watch(name_str):
+                    events.extend(self._add_tree(path, emit_contents=True))
+            elif mask & IN_MODIFY:
+                if not is_dir:
+                    events.append(('modified', path, None, False))
+            elif mask & IN_DELETE:
+                events.append(('deleted', path, None, is_dir))
+            elif mask & IN_MOVED_FROM:
+                self._pending_moves[cookie] = (path, is_dir)
+            elif mask & IN_MOVED_TO:
+                source = self._pending_moves.pop(cookie, None)
+                if source is not None:
+                    events.append(('moved', source[0], path, is_dir))
+                    if is_dir:
+                        if not self._should_watch(name_str):
+                            self._forget_tree(source[0])
+                        elif source[0] in self._path_to_wd:
+                            self._rename_tree(source[0], path)
+                        elif self._is_recursive(path):
+                            # Renamed before its creation was read (mkdir, fill,
+                            # rename): nothing inside it has been reported yet
+                            events.extend(self._add_tree(path, emit_contents=True))
+                else:
+                    events.append(('created', path, None, is_dir))
+                    if is_dir and self._is_recursive(path) and self._should_watch(name_str):
+                        events.extend(self._add_tree(path, emit_contents=True))
+
+        for cookie in carried:
+            if cookie in self._pending_moves:
+                path, is_dir = self._pending_moves.pop(cookie)
+                events.append(('deleted', path, None, is_dir))
+                if is_dir:
+                    self._forget_tree(path)
+
+        return events
+
+    def _flush_pending_moves(self) -> List[RawEvent]:
+        """Report unpaired MOVED_FROM records as deletions (moved out of view)"""
+        events = []
+        for path, is_dir in self._pending_moves.values():
+            events.append(('deleted', path, None, is_dir))
+            if is_dir:
+                self._forget_tree(path)
+        self._pending_moves.clear()
+        return events
+
+    def _dispatch(self, raw_events: List[RawEvent]):
+        """Hand a decoded batch to the registered event handlers"""
+        if not raw_events:
+            return
+
+        timestamp = time.time()
+        events = [
+            FileSystemEvent(event_type, src_path, dest_path=dest_path,
+                            is_directory=is_directory, timestamp=timestamp)
+            for event_type, src_path, dest_path, is_directory in raw_events
+        ]
+
+        for handler in self._handlers:
+            try:
+                handler.handle_events(events)
+            except Exception as e:
+                logger.error(f"Error handling inotify events: {e}")
@@ -0,0 +1,329 @@
+"""
+Sparse timestamp index for JSONL event logs
+
+The index of ``events.jsonl`` lives next to it in ``events.jsonl.tsidx``::
+
+    header  := magic, u32 interval
+    entry   := f64 timestamp, u64 byte offset    (little-endian)
+
+Entry ``k`` points at record ``k * interval`` of the log, counted from the
+record the first entry points at, so the index holds one entry per
+``interval`` records and can be appended to as the log grows. An index
+started on an existing log (see ``IndexWriter.resume``) begins at the end
+of the log; readers scan the unindexed start of the log in full.
+
+Readers binary-search the timestamps to find where a time window starts
+instead of reading the log from the beginning. This relies on the
+log being in roughly chronological order, as JsonFileOutputHandler writes
+it; a window is widened by one interval on each side to allow for events
+that arrived a little late.
+"""
+
+import os
+import re
+import json
+import mmap
+import struct
+import logging
+from array import array
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from itertools import accumulate
+from typing import Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+INDEX_SUFFIX = '.tsidx'
+MAGIC = b'FPTSX\x00\x01\n'
+HEADER = struct.Struct('<8sI')
+ENTRY = struct.Struct('<dQ')
+
+DEFAULT_INTERVAL = 1000
+CHUNK_SIZE = 64 * 1024 * 1024  # bytes of log scanned per worker task
+
+_TIMESTAMP = re.compile(rb'"timestamp":\s*(-?[0-9][0-9.eE+-]*)')
+
+
+def index_path(log_path: str) -> str:
+    """Path of the index of a JSONL log"""
+    return log_path + INDEX_SUFFIX
+
+
+def record_timestamp(line: bytes) -> Optional[float]:
+    """Timestamp of one JSONL record, or None if it has none"""
+    match = _TIMESTAMP.search(line)
+    if match:
+        try:
+            return float(match.group(1))
+        except ValueError:
+            pass
+    try:
+        timestamp = json.loads(line).get('timestamp')
+        return float(timestamp) if timestamp is not None else None
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+def scan_lines(data: bytes, base: int, first_record: int, interval: int,
+               previous: Optional[float] = 0.0) -> Tuple[List[Tuple[float, int]], int]:
+    """Index entries for the complete lines in data, which starts at log offset base
+
+    ``first_record`` is the number of the first line in the log. Returns
+    the entries and the number of complete lines; a record without a
+    timestamp reuses ``previous``, the timestamp of the entry before it.
+    """
+    lines = data.split(b'\n')
+    lines.pop()  # empty, or a line still being written
+    starts = list(accumulate(map(len, lines), initial=0))
+    entries = []
+    for row in range((-first_record) % interval, len(lines), interval):
+        timestamp = record_timestamp(lines[row])
+        if timestamp is None:
+            timestamp = previous
+        entries.append((timestamp, base + starts[row] + row))
+        previous = timestamp
+    return entries, len(lines)
+
+
+def _count_lines(path: str, start: int, end: int) -> int:
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        return data[start:end].count(b'\n')
+
+
+def _scan_chunk(path: str, start: int, end: int, first_record: int,
+                interval: int) -> List[Tuple[float, int]]:
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        return scan_lines(data[start:end], start, first_record, interval, previous=None)[0]
+
+
+def _chunks(path: str, size: int, chunk_size: int) -> List[Tuple[int, int]]:
+    """Split a log into byte ranges that start and end at line boundaries"""
+    if size == 0:
+        return []
+    bounds = [0]
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        position = chunk_size
+        while position < size:
+            newline = data.find(b'\n', position - 1)
+            if newline < 0:
+                break
+            bounds.append(newline + 1)
+            position = newline + 1 + chunk_size
+    if bounds[-1] < size:
+        bounds.append(size)
+    return list(zip(bounds, bounds[1:]))
+
+
+class TimestampIndex:
+    """The (timestamp, offset) entries of a JSONL log"""
+
+    def __init__(self, interval: int = DEFAULT_INTERVAL, timestamps=None, offsets=None,
+                 records: int = None):
+        self.interval = interval
+        self.timestamps = array('d', timestamps or [])
+        self.offsets = array('Q', offsets or [])
+        self.records = records  # lines indexed, when known
+
+    @classmethod
+    def load(cls, path: str) -> 'TimestampIndex':
+        """Read an index file; a partly written last entry is ignored"""
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) < HEADER.size:
+            raise ValueError(f"Not a FilePulse timestamp index: {path}")
+        magic, interval = HEADER.unpack_from(data)
+        if magic != MAGIC or interval <= 0:
+            raise ValueError(f"Not a FilePulse timestamp index: {path}")
+        count = (len(data) - HEADER.size) // ENTRY.size
+        entries = list(ENTRY.iter_unpack(data[HEADER.size:HEADER.size + count * ENTRY.size]))
+        return cls(interval, [entry[0] for entry in entries], [entry[1] for entry in entries])
+
+    def append(self, entries: List[Tuple[float, int]]):
+        """Add entries for records after the last one indexed"""
+        for timestamp, offset in entries:
+            self.timestamps.append(timestamp)
+            self.offsets.append(offset)
+
+    def to_bytes(self) -> bytes:
+        """The encoded index file"""
+        return HEADER.pack(MAGIC, self.interval) + self.entry_bytes()
+
+    def entry_bytes(self, start: int = 0) -> bytes:
+        """Encoded entries from start on, for appending to an index file"""
+        return b''.join(ENTRY.pack(timestamp, offset)
+                        for timestamp, offset in zip(self.timestamps[start:], self.offsets[start:]))
+
+    def save(self, path: str):
+        """Write the index atomically"""
+        partial = path + '.tmp'
+        with open(partial, 'wb') as f:
+            f.write(self.to_bytes())
+        os.replace(partial, path)
+
+    def seek(self, since: Optional[float]) -> int:
+        """Log offset to start reading at for events at or after since"""
+        if since is None:
+            return 0
+        entry = bisect_left(self.timestamps, since) - 2  # one interval of slack
+        return self.offsets[entry] if entry >= 0 else 0
+
+    def stop(self, until: Optional[float]) -> Optional[int]:
+        """Log offset at which events after until begin, or None for the end of the log"""
+        if until is None:
+            return None
+        entry = bisect_right(self.timestamps, until) + 1  # one interval of slack
+        return self.offsets[entry] if entry < len(self.offsets) else None
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+
+def build_index(log_path: str, interval: int = DEFAULT_INTERVAL, workers: int = None,
+                chunk_size: int = CHUNK_SIZE) -> TimestampIndex:
+    """Index a JSONL log and write its sidecar
+
+    The log is memory-mapped and split into chunks at line boundaries.
+    Newlines are counted per chunk first (a C-level scan, much cheaper than
+    the indexing itself) so every chunk knows the number of its first
+    record; the chunks are then indexed in parallel worker processes.
+    """
+    size = os.path.getsize(log_path)
+    chunks = _chunks(log_path, size, chunk_size)
+    workers = workers or os.cpu_count() or 1
+    paths = [log_path] * len(chunks)
+    starts = [start for start, _ in chunks]
+    ends = [end for _, end in chunks]
+
+    if workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as pool:
+            counts = list(pool.map(_count_lines, paths, starts, ends))
+            firsts = [0] + list(accumulate(counts))[:-1]
+            results = list(pool.map(_scan_chunk, paths, starts, ends, firsts,
+                                    [interval] * len(chunks)))
+    else:
+        counts = [_count_lines(log_path, start, end) for start, end in chunks]
+        firsts = [0] + list(accumulate(counts))[:-1]
+        results = [_scan_chunk(log_path, start, end, first, interval)
+                   for start, end, first in zip(starts, ends, firsts)]
+
+    index = TimestampIndex(interval, records=sum(counts))
+    previous = 0.0
+    for entries in results:
+        for timestamp, offset in entries:
+            # Records without a timestamp take the one of the entry before them
+            previous = previous if timestamp is None else timestamp
+            index.timestamps.append(previous)
+            index.offsets.append(offset)
+    index.save(index_path(log_path))
+    return index
+
+
+def read_window(log_path: str, since: float = None, until: float = None,
+                index: TimestampIndex = None) -> Iterator[bytes]:
+    """Yield the lines of a JSONL log with since <= timestamp <= until
+
+    Only the part of the log the index points to is read; without an index
+    (or with ``index`` None and no sidecar) the whole log is scanned.
+    """
+    if index is None:
+        try:
+            index = TimestampIndex.load(index_path(log_path))
+        except (OSError, ValueError):
+            index = TimestampIndex()
+    start = index.seek(since)
+    stop = index.stop(until)
+    low = -float('inf') if since is None else since
+    high = float('inf') if until is None else until
+
+    with open(log_path, 'rb') as f:
+        f.seek(start)
+        position = start
+        for line in f:
+            if stop is not None and position >= stop:
+                break
+            position += len(line)
+            if not line.endswith(b'\n'):
+                break  # still being written
+            timestamp = record_timestamp(line)
+            if timestamp is not None and low <= timestamp <= high:
+                yield line
+
+
+class IndexWriter:
+    """Keeps the index of a JSONL log up to date as batches are appended"""
+
+    def __init__(self, log_path: str, interval: int = DEFAULT_INTERVAL):
+        self.log_path = log_path
+        self.path = index_path(log_path)
+        self.interval = interval
+        self.index = TimestampIndex(interval)
+        self.records = 0
+        self._file = None
+
+    def resume(self, log_size: int):
+        """Match the index to a log of log_size bytes (called when the log is (re)opened)
+
+        Entries past the end of the log are dropped and records appended
+        since the last entry are indexed. A missing index, or one that does
+        not fit the log, is started afresh at the current end of the log
+        rather than rebuilt: this runs on the sink's write path, and a
+        rebuild reads the whole log. ``filepulse index-log`` (build_index)
+        indexes an existing log in full.
+        """
+        self.close()
+        index = None
+        if log_size:
+            try:
+                index = TimestampIndex.load(self.path)
+            except (OSError, ValueError):
+                index = None
+
+        if index is not None and index.interval == self.interval:
+            keep = bisect_left(index.offsets, log_size)
+            if keep:
+                last = index.offsets[keep - 1]
+                with open(self.log_path, 'rb') as f:
+                    f.seek(max(last - 1, 0))
+                    valid = last == 0 or f.read(1) == b'\n'
+                    data = f.read(log_size - last) if valid else b''
+                if valid:
+                    first = (keep - 1) * self.interval
+                    entries, lines = scan_lines(data, last, first, self.interval,
+                                                index.timestamps[keep - 2] if keep > 1 else 0.0)
+                    self.index = TimestampIndex(self.interval, index.timestamps[:keep - 1],
+                                                index.offsets[:keep - 1])
+                    self.index.append(entries)
+                    self.records = first + lines
+                    self.index.save(self.path)
+                    self._open()
+                    return
+
+        if log_size:
+            logger.info(f"Timestamp index for {self.log_path} is missing or stale; indexing "
+                        f"from offset {log_size} on (run `filepulse index-log` to index it all)")
+        self.index = TimestampIndex(self.interval)
+        self.records = 0
+        self.index.save(self.path)
+        self._open()
+
+    def _open(self):
+        self._file = open(self.path, 'ab')
+
+    def append(self, data: bytes, offset: int):
+        """Index a batch of complete lines written at log offset"""
+        if self._file is None:
+            self.resume(offset)
+        previous = self.index.timestamps[-1] if len(self.index) else 0.0
+        entries, lines = scan_lines(data, offset, self.records, self.interval, previous)
+        self.records += lines
+        if entries:
+            start = len(self.index)
+            self.index.append(entries)
+            self._file.write(self.index.entry_bytes(start))
+            self._file.flush()
+
+    def close(self):
+        """Close the index file"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
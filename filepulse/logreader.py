@@ -0,0 +1,166 @@
+"""
+Reader for FilePulse binary event logs
+
+Segments are memory-mapped and records are sliced out of the map without
+copying; only the columns of a block are decoded, and events are built
+only when asked for. Rotated segments compressed with gzip or zstd are
+decompressed into memory instead.
+
+Usage:
+    python -m filepulse.logreader events.fplog [-o events.jsonl]
+"""
+
+import argparse
+import gzip
+import mmap
+import sys
+from typing import Iterator, List, Optional, TextIO, Tuple
+
+from .binlog import (MAGIC, RECORD_EVENTS, RECORD_RESET, RECORD_STRINGS, EventBlock,
+                     decode_varint, unpack_strings)
+from .events import FileSystemEvent
+from .serialization import EventSerializer
+
+
+class LogReader:
+    """Iterates the records of a binary event log segment
+
+    ``magic`` lets other files in the same record framing (history store
+    indexes) be read the same way.
+    """
+
+    def __init__(self, path: str, magic: bytes = MAGIC):
+        self.path = path
+        self.magic = magic
+        self._file = None
+        self._map = None
+
+        if path.endswith('.gz'):
+            with gzip.open(path, 'rb') as f:
+                data = f.read()
+        elif path.endswith('.zst'):
+            import zstandard
+            with open(path, 'rb') as f:
+                data = zstandard.ZstdDecompressor().stream_reader(f).read()
+        else:
+            self._file = open(path, 'rb')
+            try:
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+                data = self._map
+            except ValueError:  # empty file
+                data = b''
+
+        self._buffer = memoryview(data)
+        if len(self._buffer) and bytes(self._buffer[:len(magic)]) != magic:
+            self.close()
+            raise ValueError(f"Not a FilePulse binary event log: {path}")
+
+    def records(self, start: int = None) -> Iterator[Tuple[int, int, memoryview]]:
+        """Yield (offset, kind, body) for each complete record
+
+        ``body`` is a zero-copy view into the segment. A record cut short
+        (e.g. one still being written) ends the iteration.
+        """
+        buffer = self._buffer
+        end = len(buffer)
+        pos = len(self.magic) if start is None else start
+        while pos < end:
+            offset = pos
+            try:
+                size, pos = decode_varint(buffer, pos)
+            except IndexError:
+                return
+            if pos + size > end or not size:
+                return
+            body = buffer[pos:pos + size]
+            pos += size
+            yield offset, body[0], body
+
+    def record_at(self, offset: int) -> Tuple[int, memoryview]:
+        """Get (kind, body) of the record starting at offset"""
+        size, pos = decode_varint(self._buffer, offset)
+        body = self._buffer[pos:pos + size]
+        if not size or len(body) < size:
+            raise ValueError(f"Incomplete record at offset {offset} in {self.path}")
+        return body[0], body
+
+    def record_length(self, offset: int) -> int:
+        """Total length (framing included) of the record starting at offset"""
+        size, pos = decode_varint(self._buffer, offset)
+        return pos - offset + size
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def blocks(self, start: int = None, strings: List[str] = None) -> Iterator[Tuple[int, EventBlock]]:
+        """Yield (offset, decoded block) for each EVENTS record"""
+        strings = [] if strings is None else strings
+        for offset, kind, body in self.records(start):
+            if kind == RECORD_EVENTS:
+                yield offset, EventBlock(body, strings)
+            elif kind == RECORD_STRINGS:
+                count, pos = decode_varint(body, 1)
+                new, _ = unpack_strings(body, pos, count)
+                strings.extend(new)
+            elif kind == RECORD_RESET:
+                del strings[:]
+
+    def events(self) -> Iterator[FileSystemEvent]:
+        """Yield every event in the segment"""
+        for _, block in self.blocks():
+            yield from block.events()
+
+    __iter__ = events
+
+    def close(self):
+        """Release the memory map and file"""
+        self._buffer.release()
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                pass  # record views are still in use; the map is unmapped once they are freed
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> 'LogReader':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def convert_to_jsonl(path: str, output: TextIO, serializer: Optional[EventSerializer] = None) -> int:
+    """Write a binary segment as JSONL (one block at a time); returns the event count"""
+    serializer = serializer or EventSerializer()
+    total = 0
+    with LogReader(path) as reader:
+        for _, block in reader.blocks():
+            events = block.events()
+            output.write(serializer.serialize_batch(events))
+            total += len(events)
+    return total
+
+
+def main(argv: List[str] = None) -> int:
+    """Convert binary event log segments to JSONL"""
+    parser = argparse.ArgumentParser(prog='python -m filepulse.logreader',
+                                     description='Convert FilePulse binary event logs to JSONL')
+    parser.add_argument('segments', nargs='+', help='Binary log segments (.fplog, .gz, .zst)')
+    parser.add_argument('-o', '--output', help='JSONL file to write (default: stdout)')
+    args = parser.parse_args(argv)
+
+    output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        for segment in args.segments:
+            convert_to_jsonl(segment, output)
+    finally:
+        if args.output:
+            output.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -13,14 +13,20 @@ from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler as WatchdogHandler
 
 from .config import Config
-from .events import FileSystemEvent, EventHandler
+from .events import FileSystemEvent, EventHandler, clear_path_cache
 from .output import create_output_handlers
+from .dispatch import EventDispatcher
+from .watch_planner import WatchPlanner
 
 logger = logging.getLogger(__name__)
 
 
 class FilePulseHandler(WatchdogHandler):
-    """Custom watchdog event handler"""
+    """Custom watchdog event handler
+    
+    ``event_handler`` may be an ``EventHandler`` or an ``EventDispatcher``;
+    both accept events through ``handle_event``.
+    """
     
     def __init__(self, event_handler: EventHandler):
         super().__init__()
@@ -176,9 +182,13 @@ class FileSystemMonitor:
     
     def __init__(self, config: Optional[Config] = None):
         self.config = config or Config()
-        self.observer = Observer()
+        self.observer = None
+        self.backend = None
+        self.watch_planner = None
         self.event_handler = None
+        self.dispatcher = None
         self.resource_monitor = None
+        self.reconciler = None
         self.is_running = False
         
         # Setup logging
@@ -212,6 +222,13 @@ class FileSystemMonitor:
         # Create event handler
         self.event_handler = EventHandler(self.config, output_handlers)
         
+        # Hand events from the observer thread to a dedicated dispatcher thread
+        self.dispatcher = EventDispatcher(
+            self.event_handler,
+            capacity=self.config.get('performance.dispatch_queue_size', 10000),
+            overflow_policy=self.config.get('performance.overflow_policy', 'block')
+        )
+        
         # Setup resource monitoring
         memory_limit = self.config.get('performance.memory_limit_mb', 50)
         cpu_throttle = self.config.get('performance.cpu_throttle', False)
@@ -220,15 +237,50 @@ class FileSystemMonitor:
         # Connect event handler to resource monitor for memory management
         self.resource_monitor.set_event_handler_ref(self.event_handler)
         
-        # Setup watchdog handlers for each path
+        # Setup watchers for each path
+        self.watch_planner = WatchPlanner(self.config)
+        self.observer = self._create_observer()
         self._setup_watchers()
+        
+        # Persisted snapshots to catch up on changes made while not running
+        self.reconciler = None
+        if self.config.get('monitoring.reconcile.enabled', False):
+            from .reconcile import Reconciler
+            self.reconciler = Reconciler(self.config, self.dispatcher.handle_events,
+                                         prune=self.watch_planner.is_ignored_directory)
+    
+    def _create_observer(self):
+        """Create the filesystem observer for the configured backend"""
+        backend = self.config.get('monitoring.backend', 'watchdog')
+        
+        if backend == 'inotify':
+            from . import inotify_backend
+            if inotify_backend.is_available():
+                buffer_size = self.config.get('monitoring.inotify_buffer_size',
+                                              inotify_backend.DEFAULT_BUFFER_SIZE)
+                self.backend = 'inotify'
+                return inotify_backend.InotifyBackend(buffer_size=buffer_size,
+                                                      planner=self.watch_planner)
+            logger.warning("inotify backend is not available on this system, using watchdog")
+        elif backend != 'watchdog':
+            logger.warning(f"Unknown monitoring backend '{backend}', using watchdog")
+        
+        self.backend = 'watchdog'
+        return Observer()
+    
+    def _create_handler(self):
+        """Create the handler object passed to observer.schedule()"""
+        if self.backend == 'inotify':
+            # The inotify backend delivers whole batches to the dispatcher
+            return self.dispatcher
+        return FilePulseHandler(self.dispatcher)
     
     def _setup_watchers(self):
         """Setup filesystem watchers for configured paths"""
         paths = self.config.monitoring_paths
         recursive = self.config.is_recursive
         
-        handler = FilePulseHandler(self.event_handler)
+        handler = self._create_handler()
         
         for path in paths:
             if not os.path.exists(path):
@@ -236,11 +288,28 @@ class FileSystemMonitor:
                 continue
             
             try:
-                self.observer.schedule(handler, path, recursive=recursive)
+                self._schedule(handler, path, recursive)
                 logger.info(f"Watching path: {path} (recursive: {recursive})")
             except Exception as e:
                 logger.error(f"Failed to setup watcher for {path}: {e}")
     
+    def _schedule(self, handler, path: str, recursive: bool):
+        """Schedule a path on the observer with the planned event subscription"""
+        if self.backend == 'inotify':
+            self.observer.schedule(handler, path, recursive=recursive)
+            return
+        
+        event_filter = self.watch_planner.watchdog_event_filter(recursive)
+        if event_filter is not None:
+            try:
+                self.observer.schedule(handler, path, recursive=recursive,
+                                       event_filter=event_filter)
+                return
+            except TypeError:
+                # watchdog < 4.0 has no event_filter support
+                pass
+        self.observer.schedule(handler, path, recursive=recursive)
+    
     def start(self):
         """Start the filesystem monitor"""
         if self.is_running:
@@ -251,10 +320,17 @@ class FileSystemMonitor:
             # Start resource monitoring
             self.resource_monitor.start_monitoring()
             
+            # Start the dispatcher before events can arrive
+            self.dispatcher.start()
+            
             # Start filesystem observer
             self.observer.start()
             self.is_running = True
             
+            # Rescan for offline changes once live events are being captured
+            if self.reconciler:
+                self.reconciler.start()
+            
             logger.info("FilePulse monitor started")
             logger.info(f"Monitoring paths: {self.config.monitoring_paths}")
             logger.info(f"Monitoring events: {self.config.monitoring_events}")
@@ -270,16 +346,23 @@ class FileSystemMonitor:
         
         logger.info("Stopping FilePulse monitor...")
         
+        # Save the final snapshots while the observer still sees changes
+        if self.reconciler:
+            self.reconciler.stop()
+        
         # Stop observer
         self.observer.stop()
         self.observer.join()
         
+        # Drain events still queued for the dispatcher
+        self.dispatcher.stop()
+        
         # Stop resource monitoring
         self.resource_monitor.stop_monitoring()
         
-        # Flush any pending events
+        # Stop the batch timer and flush any pending events
         if self.event_handler:
-            self.event_handler.flush()
+            self.event_handler.close()
         
         self.is_running = False
         logger.info("FilePulse monitor stopped")
@@ -299,10 +382,18 @@ class FileSystemMonitor:
         """Get monitor status information"""
         return {
             'is_running': self.is_running,
+            'backend': self.backend,
+            'watch_count': getattr(self.observer, 'watch_count', None),
             'monitored_paths': self.config.monitoring_paths,
             'monitored_events': self.config.monitoring_events,
             'memory_usage_mb': psutil.Process().memory_info().rss / 1024 / 1024,
-            'cpu_percent': psutil.Process().cpu_percent()
+            'cpu_percent': psutil.Process().cpu_percent(),
+            'batching': self.event_handler.get_batching_status() if self.event_handler else None,
+            'filter': self.event_handler.event_filter.get_status() if self.event_handler else None,
+            'dispatch_queue': self.dispatcher.get_status() if self.dispatcher else None,
+            'admission': (self.event_handler.admission.get_status()
+                          if self.event_handler and self.event_handler.admission else None),
+            'reconcile': self.reconciler.get_status() if self.reconciler else None
         }
     
     def reload_config(self, config_path: Optional[str] = None):
@@ -311,6 +402,11 @@ class FileSystemMonitor:
             logger.info("Stopping monitor for configuration reload...")
             self.stop()
         
+        # Cached filter decisions and resolved paths may no longer hold
+        if self.event_handler:
+            self.event_handler.event_filter.invalidate_cache()
+        clear_path_cache()
+        
         # Reload configuration
         self.config = Config(config_path) if config_path else Config()
         
@@ -327,8 +423,8 @@ class FileSystemMonitor:
         if not os.path.exists(path):
             raise ValueError(f"Path does not exist: {path}")
         
-        handler = FilePulseHandler(self.event_handler)
-        self.observer.schedule(handler, path, recursive=recursive)
+        handler = self._create_handler()
+        self._schedule(handler, path, recursive)
         
         # Update config
         paths = self.config.monitoring_paths.copy()
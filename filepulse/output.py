@@ -2,26 +2,71 @@
 Output handling for FilePulse events
 """
 
-import json
+import os
+import math
 import sys
+import time
+import threading
 from typing import List, Dict, Any, TextIO
 from datetime import datetime
 from pathlib import Path
 import logging
 
 from .events import FileSystemEvent
+from .serialization import default_serializer
+from .rotation import RotationPolicy, rotated_name, compressor
+from . import binlog
+from . import history
+from .binlog import SegmentEncoder
+from .jsonlindex import IndexWriter
 
 logger = logging.getLogger(__name__)
 
 
+class TimestampFormatter:
+    """Formats event timestamps, reusing the string for every event in the same second"""
+    
+    def __init__(self, timestamp_format: str, cache_size: int = 1024):
+        self.timestamp_format = timestamp_format
+        self.cache_size = cache_size
+        # Sub-second directives change within a second and cannot be cached
+        self.per_second = '%f' not in timestamp_format
+        self._cache: Dict[float, str] = {}
+    
+    def __call__(self, timestamp: float) -> str:
+        if not self.per_second:
+            return datetime.fromtimestamp(timestamp).strftime(self.timestamp_format)
+        
+        # Round to the second the same way datetime.fromtimestamp() does
+        fraction, second = math.modf(timestamp)
+        microseconds = round(fraction * 1e6)
+        if microseconds >= 1000000:
+            second += 1
+        elif microseconds < 0:
+            second -= 1
+        
+        text = self._cache.get(second)
+        if text is None:
+            if len(self._cache) >= self.cache_size:
+                self._cache.clear()
+            text = datetime.fromtimestamp(second).strftime(self.timestamp_format)
+            self._cache[second] = text
+        return text
+
+
 class ConsoleOutputHandler:
-    """Output events to console"""
+    """Output events to console
+    
+    Each batch is rendered into one string and written with a single
+    write and flush.
+    """
     
     def __init__(self, config, output_stream: TextIO = None):
         self.config = config
         self.output_stream = output_stream or sys.stdout
         self.format_type = config.get('output.console_format', 'simple')
         self.timestamp_format = config.get('output.timestamp_format', '%Y-%m-%d %H:%M:%S')
+        self.format_timestamp = TimestampFormatter(self.timestamp_format)
         
         # Color support
         try:
@@ -36,56 +81,257 @@ class ConsoleOutputHandler:
             }
         except ImportError:
             self.colors = {key: '' for key in ['created', 'modified', 'deleted', 'moved', 'reset']}
+        
+        # Colored event type labels, built once per (event type, file type)
+        self._prefixes: Dict[tuple, str] = {}
+        
+        if self.format_type == 'json':
+            self._format_event = self._format_json
+        elif self.format_type == 'detailed':
+            self._format_event = self._format_detailed
+        else:
+            self._format_event = self._format_simple
     
     def __call__(self, events: List[FileSystemEvent]):
         """Handle a batch of events"""
-        for event in events:
-            self._output_event(event)
+        if self.format_type == 'json':
+            # Shared with the JSONL file sink, which reuses the serialized batch
+            text = default_serializer.serialize_batch(events)
+        else:
+            lines = [self._format_event(event) for event in events]
+            lines.append('')
+            text = '\n'.join(lines)
+        if text:
+            self.output_stream.write(text)
+            self.output_stream.flush()
     
     def _output_event(self, event: FileSystemEvent):
         """Output a single event"""
-        if self.format_type == 'json':
-            self._output_json(event)
-        elif self.format_type == 'detailed':
-            self._output_detailed(event)
-        else:
-            self._output_simple(event)
+        self([event])
+    
+    def _prefix(self, event_type: str, file_type: str = None) -> str:
+        """Get the colored label for an event type"""
+        key = (event_type, file_type)
+        prefix = self._prefixes.get(key)
+        if prefix is None:
+            color = self.colors.get(event_type, '')
+            prefix = f"{color}{event_type.upper()}{self.colors['reset']}"
+            if file_type:
+                prefix = f"{prefix} {file_type}"
+            self._prefixes[key] = prefix
+        return prefix
     
-    def _output_simple(self, event: FileSystemEvent):
+    def _format_simple(self, event: FileSystemEvent) -> str:
         """Simple output format"""
-        timestamp = datetime.fromtimestamp(event.timestamp).strftime(self.timestamp_format)
-        color = self.colors.get(event.event_type, '')
-        reset = self.colors['reset']
+        timestamp = self.format_timestamp(event.timestamp)
+        prefix = self._prefix(event.event_type)
         
         if event.event_type == 'moved':
-            message = f"[{timestamp}] {color}{event.event_type.upper()}{reset}: {event.src_path} -> {event.dest_path}"
-        else:
-            message = f"[{timestamp}] {color}{event.event_type.upper()}{reset}: {event.src_path}"
-        
-        print(message, file=self.output_stream)
-        self.output_stream.flush()
+            return f"[{timestamp}] {prefix}: {event.src_path} -> {event.dest_path}"
+        elif event.count is not None:
+            return f"[{timestamp}] {prefix}: {event.count} events under {event.src_path}"
+        return f"[{timestamp}] {prefix}: {event.src_path}"
     
-    def _output_detailed(self, event: FileSystemEvent):
+    def _format_detailed(self, event: FileSystemEvent) -> str:
         """Detailed output format"""
-        timestamp = datetime.fromtimestamp(event.timestamp).strftime(self.timestamp_format)
-        color = self.colors.get(event.event_type, '')
-        reset = self.colors['reset']
-        
-        file_type = "DIR" if event.is_directory else "FILE"
+        timestamp = self.format_timestamp(event.timestamp)
+        prefix = self._prefix(event.event_type, "DIR" if event.is_directory else "FILE")
         
         if event.event_type == 'moved':
-            message = f"[{timestamp}] {color}{event.event_type.upper()}{reset} {file_type}: {event.src_path} -> {event.dest_path}"
+            return f"[{timestamp}] {prefix}: {event.src_path} -> {event.dest_path}"
+        elif event.count is not None:
+            return f"[{timestamp}] {prefix}: {event.count} events under {event.src_path}"
+        return f"[{timestamp}] {prefix}: {event.src_path}"
+    
+    def _format_json(self, event: FileSystemEvent) -> str:
+        """JSON output format"""
+        return default_serializer.serialize(event)
+
+
+class AppendFile:
+    """Long-lived append handle shared by the file sinks
+    
+    Writes go through a large buffer and are committed once per batch
+    according to ``durability``:
+    
+    - ``none``: data reaches the OS when the buffer fills or on close
+    - ``flush``: the buffer is flushed to the OS after every batch
+    - ``fsync``: as ``flush``, and the file is fsync'ed at most every
+      ``fsync_interval_ms`` milliseconds (group commit); a timer makes sure
+      the last batch is synced even if no further batches arrive
+    
+    When the path no longer refers to the open file (log rotation by an
+    external tool), the file is reopened at the path. With a ``rotation``
+    policy the file rotates itself by size and/or time; rotated segments are
+    compressed and pruned on a background thread.
+    """
+    
+    DURABILITY = ('none', 'flush', 'fsync')
+    
+    def __init__(self, path: str, buffer_size: int = 1024 * 1024, durability: str = 'flush',
+                 fsync_interval_ms: float = 1000, rotation: RotationPolicy = None,
+                 binary: bool = False):
+        if durability not in self.DURABILITY:
+            raise ValueError(f"Unknown durability setting: {durability}")
+        
+        self.path = path
+        self.buffer_size = buffer_size
+        self.durability = durability
+        self.fsync_interval = fsync_interval_ms / 1000.0
+        self.rotation = rotation
+        self.binary = binary
+        
+        self._file = None
+        self._size = 0  # approximate bytes in the current segment
+        self._started = 0.0  # when the current segment was begun
+        self._identity = None  # (st_dev, st_ino) of the open file
+        self._lock = threading.Lock()
+        self._last_sync = 0.0
+        self._unsynced = False
+        self._sync_timer = None
+        
+        # Statistics
+        self.reopens = 0
+        self.rotations = 0
+        self.syncs = 0
+    
+    @classmethod
+    def from_config(cls, config, path: str, binary: bool = False, rotate: bool = True) -> 'AppendFile':
+        """Create an append file with the configured buffering and durability"""
+        return cls(
+            path,
+            buffer_size=config.get('output.write_buffer_size', 1024 * 1024),
+            durability=config.get('output.durability', 'flush'),
+            fsync_interval_ms=config.get('output.fsync_interval_ms', 1000),
+            rotation=RotationPolicy.from_config(config) if rotate else None,
+            binary=binary,
+        )
+    
+    @property
+    def size(self) -> int:
+        """Approximate bytes in the current segment"""
+        return self._size
+    
+    def _open(self):
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        if self.binary:
+            self._file = open(self.path, 'ab', buffering=self.buffer_size)
         else:
-            message = f"[{timestamp}] {color}{event.event_type.upper()}{reset} {file_type}: {event.src_path}"
+            self._file = open(self.path, 'a', encoding='utf-8', buffering=self.buffer_size)
+        stat_result = os.fstat(self._file.fileno())
+        self._identity = (stat_result.st_dev, stat_result.st_ino)
+        self._size = stat_result.st_size
+        # An existing segment dates from its last write, so a restart still rotates on time
+        self._started = stat_result.st_mtime if stat_result.st_size else time.time()
+    
+    def _rotated(self) -> bool:
+        """Check whether the path now names a different file than the one open"""
+        try:
+            stat_result = os.stat(self.path)
+        except FileNotFoundError:
+            return True
+        # Filesystems without inode numbers report 0; never treat that as rotation
+        return bool(stat_result.st_ino) and (stat_result.st_dev, stat_result.st_ino) != self._identity
+    
+    def write_batch(self, text):
+        """Append the text of one batch and commit it per the durability setting
         
-        print(message, file=self.output_stream)
-        self.output_stream.flush()
+        ``text`` may also be a callable rendering the batch; it is called with
+        the lock held and ``fresh=True`` when the batch is the first written
+        through a newly opened handle (new file, rotation or reopen).
+        """
+        with self._lock:
+            fresh = False
+            if self._file is not None and self._rotated():
+                self._close_file()
+                self.reopens += 1
+            if self._file is None:
+                self._open()
+                fresh = True
+            pending = 0 if callable(text) else len(text)
+            if (self.rotation is not None and self._size
+                    and self.rotation.should_rotate(self._size + pending, self._started, time.time())):
+                self._rotate()
+                fresh = True
+            if callable(text):
+                text = text(fresh)
+            
+            try:
+                self._file.write(text)
+                self._size += len(text)
+                if self.durability != 'none':
+                    self._file.flush()
+                if self.durability == 'fsync':
+                    self._unsynced = True
+                    self._sync_if_due()
+            except (OSError, ValueError):
+                # Start from a fresh handle next time
+                self._close_file()
+                raise
     
-    def _output_json(self, event: FileSystemEvent):
-        """JSON output format"""
-        json_str = json.dumps(event.to_dict(), indent=None, separators=(',', ':'))
-        print(json_str, file=self.output_stream)
-        self.output_stream.flush()
+    def _rotate(self):
+        """Move the current segment aside and start a new one (lock held)"""
+        self._close_file()
+        target = rotated_name(self.path, time.time())
+        try:
+            os.replace(self.path, target)
+        except FileNotFoundError:
+            target = None
+        self._open()
+        if target is not None:
+            self.rotations += 1
+            compressor.submit(target, self.path, self.rotation)
+    
+    def _sync_if_due(self):
+        """fsync now if the interval has passed, otherwise schedule it (lock held)"""
+        remaining = self._last_sync + self.fsync_interval - time.monotonic()
+        if remaining <= 0:
+            self._fsync()
+        elif self._sync_timer is None:
+            self._sync_timer = threading.Timer(remaining, self._timed_sync)
+            self._sync_timer.daemon = True
+            self._sync_timer.start()
+    
+    def _timed_sync(self):
+        with self._lock:
+            self._sync_timer = None
+            if self._file is not None and self._unsynced:
+                try:
+                    self._fsync()
+                except OSError as e:
+                    logger.error(f"Failed to sync {self.path}: {e}")
+    
+    def _fsync(self):
+        os.fsync(self._file.fileno())
+        self._last_sync = time.monotonic()
+        self._unsynced = False
+        self.syncs += 1
+    
+    def _close_file(self):
+        if self._sync_timer is not None:
+            self._sync_timer.cancel()
+            self._sync_timer = None
+        file, self._file = self._file, None
+        if file is None:
+            return
+        try:
+            file.flush()
+            if self._unsynced:
+                os.fsync(file.fileno())
+                self._unsynced = False
+                self.syncs += 1
+        except (OSError, ValueError):
+            pass
+        finally:
+            try:
+                file.close()
+            except (OSError, ValueError):
+                pass
+    
+    def close(self):
+        """Flush, sync if required, and close the handle (reopened on the next write)"""
+        with self._lock:
+            self._close_file()
 
 
 class FileOutputHandler:
@@ -95,52 +341,168 @@ class FileOutputHandler:
         self.config = config
         self.file_path = file_path
         self.timestamp_format = config.get('output.timestamp_format', '%Y-%m-%d %H:%M:%S')
+        self.format_timestamp = TimestampFormatter(self.timestamp_format)
+        self.file = AppendFile.from_config(config, file_path)
         
         # Ensure directory exists
         Path(file_path).parent.mkdir(parents=True, exist_ok=True)
     
     def __call__(self, events: List[FileSystemEvent]):
         """Handle a batch of events"""
+        text = ''.join(self._format_event(event) for event in events)
+        if not text:
+            return
         try:
-            with open(self.file_path, 'a', encoding='utf-8') as f:
-                for event in events:
-                    self._write_event(f, event)
-        except IOError as e:
+            self.file.write_batch(text)
+        except (OSError, ValueError) as e:
             logger.error(f"Failed to write to log file {self.file_path}: {e}")
     
-    def _write_event(self, file: TextIO, event: FileSystemEvent):
-        """Write a single event to file"""
-        timestamp = datetime.fromtimestamp(event.timestamp).strftime(self.timestamp_format)
+    def _format_event(self, event: FileSystemEvent) -> str:
+        """Format a single event as a log line"""
+        timestamp = self.format_timestamp(event.timestamp)
         
         if event.event_type == 'moved':
-            line = f"[{timestamp}] {event.event_type.upper()}: {event.src_path} -> {event.dest_path}\n"
-        else:
-            line = f"[{timestamp}] {event.event_type.upper()}: {event.src_path}\n"
-        
-        file.write(line)
-        file.flush()
+            return f"[{timestamp}] {event.event_type.upper()}: {event.src_path} -> {event.dest_path}\n"
+        elif event.count is not None:
+            return f"[{timestamp}] {event.event_type.upper()}: {event.count} events under {event.src_path}\n"
+        return f"[{timestamp}] {event.event_type.upper()}: {event.src_path}\n"
+    
+    def close(self):
+        """Close the log file"""
+        self.file.close()
 
 
 class JsonFileOutputHandler:
-    """Output events to a JSON file"""
+    """Output events to a JSON file
+    
+    With ``output.json_index`` a sparse timestamp index is kept next to the
+    file (see filepulse.jsonlindex), updated as batches are appended.
+    """
     
     def __init__(self, config, file_path: str):
         self.config = config
         self.file_path = file_path
+        self.file = AppendFile.from_config(config, file_path, binary=True)
+        self.index = None
+        if config.get('output.json_index', False):
+            self.index = IndexWriter(file_path, config.get('output.json_index_interval', 1000))
         
         # Ensure directory exists
         Path(file_path).parent.mkdir(parents=True, exist_ok=True)
     
     def __call__(self, events: List[FileSystemEvent]):
         """Handle a batch of events"""
+        text = default_serializer.serialize_batch(events)
+        if not text:
+            return
+        data = text.encode('utf-8')
         try:
-            with open(self.file_path, 'a', encoding='utf-8') as f:
-                for event in events:
-                    json_str = json.dumps(event.to_dict())
-                    f.write(json_str + '\n')
-                    f.flush()
-        except IOError as e:
+            if self.index is None:
+                self.file.write_batch(data)
+            else:
+                self.file.write_batch(lambda fresh: self._indexed(data, fresh))
+        except (OSError, ValueError) as e:
             logger.error(f"Failed to write to JSON file {self.file_path}: {e}")
+    
+    def _indexed(self, data: bytes, fresh: bool) -> bytes:
+        """Index a batch at the offset it is about to be written at"""
+        if fresh:
+            # New file, rotation or reopen: catch up with what the file holds
+            self.index.resume(self.file.size)
+        self.index.append(data, self.file.size)
+        return data
+    
+    def close(self):
+        """Close the JSON file"""
+        self.file.close()
+        if self.index is not None:
+            self.index.close()
+
+
+class BinaryOutputHandler:
+    """Output events to a compact binary event log (see filepulse.binlog)
+    
+    Read it back with ``filepulse.logreader``.
+    """
+    
+    def __init__(self, config, file_path: str):
+        self.config = config
+        self.file_path = file_path
+        self.file = AppendFile.from_config(config, file_path, binary=True)
+        self.encoder = SegmentEncoder()
+        
+        # Ensure directory exists
+        Path(file_path).parent.mkdir(parents=True, exist_ok=True)
+    
+    def __call__(self, events: List[FileSystemEvent]):
+        """Handle a batch of events"""
+        if not events:
+            return
+        try:
+            self.file.write_batch(lambda fresh: self._encode(events, fresh))
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to write to binary log {self.file_path}: {e}")
+    
+    def _encode(self, events, fresh: bool) -> bytes:
+        """Encode a batch; a new handle starts a segment or resets the string table"""
+        prefix = b''
+        if fresh:
+            self.encoder.reset()
+            prefix = binlog.MAGIC if self.file.size == 0 else binlog.reset_record()
+        return prefix + self.encoder.encode(events)
+    
+    def close(self):
+        """Close the binary log"""
+        self.file.close()
+
+
+class HistoryOutputHandler:
+    """Store events in an indexed history directory (see filepulse.history)
+    
+    Segments are partitioned by time instead of rotated; query them with
+    ``filepulse query``.
+    """
+    
+    MAX_OPEN_SEGMENTS = 2
+    
+    def __init__(self, config, directory: str):
+        self.config = config
+        self.directory = directory
+        self.partition = int(config.get('output.history_partition', 3600))
+        self._segments: Dict[int, history.SegmentWriter] = {}  # partition start -> writer
+        
+        # Ensure directory exists
+        Path(directory).mkdir(parents=True, exist_ok=True)
+    
+    def __call__(self, events: List[FileSystemEvent]):
+        """Handle a batch of events"""
+        if not events:
+            return
+        try:
+            for start, part in history.split_partitions(events, self.partition):
+                self._segment(start).write(part)
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to write to event history {self.directory}: {e}")
+    
+    def _segment(self, start: int) -> 'history.SegmentWriter':
+        """Writer for a partition; late events may reopen an older one"""
+        segment = self._segments.pop(start, None)
+        if segment is None:
+            while len(self._segments) >= self.MAX_OPEN_SEGMENTS:
+                # Dicts keep insertion order: the first entry was used longest ago
+                self._segments.pop(next(iter(self._segments))).close()
+            path = os.path.join(self.directory, history.segment_name(start, self.partition))
+            segment = history.SegmentWriter(
+                path, lambda file_path: AppendFile.from_config(self.config, file_path, binary=True,
+                                                               rotate=False))
+        self._segments[start] = segment
+        return segment
+    
+    def close(self):
+        """Close all open segments"""
+        for segment in self._segments.values():
+            segment.close()
+        self._segments.clear()
 
 
 class CustomOutputHandler:
@@ -227,6 +589,16 @@ def create_output_handlers(config) -> List:
         json_file = config.get('output.json_file', 'filepulse_events.jsonl')
         handlers.append(JsonFileOutputHandler(config, json_file))
     
+    # Binary event log
+    if config.get('output.binary_output', False):
+        binary_file = config.get('output.binary_file', 'filepulse_events.fplog')
+        handlers.append(BinaryOutputHandler(config, binary_file))
+    
+    # Indexed history store
+    if config.get('output.history_output', False):
+        history_dir = config.get('output.history_dir', 'filepulse_history')
+        handlers.append(HistoryOutputHandler(config, history_dir))
+    
     return handlers
 
 
@@ -0,0 +1,221 @@
+"""
+Startup reconciliation for FilePulse
+
+The observer only sees changes from the moment it starts. With
+``monitoring.reconcile.enabled`` the monitor keeps a snapshot of every
+monitored root in ``state_dir``, saved when it stops and every
+``snapshot_interval`` seconds while it runs. On start, each root is
+rescanned in the background and diffed against its saved snapshot; what
+changed in the meantime is emitted as ordinary events flagged
+``reconciled``. The rescan is throttled to ``max_entries_per_second`` so it
+does not starve the live event path.
+
+After a crash the last periodic snapshot is used, so changes the monitor
+already reported after it was saved are reported again as reconciled.
+"""
+
+import os
+import time
+import hashlib
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from .snapshot import diff_snapshots, take_snapshot
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_SUFFIX = '.fpsnap'
+
+
+class ScanCancelled(Exception):
+    """Raised inside a throttled scan when the reconciler is stopping"""
+
+
+class ScanThrottle:
+    """Limits a scan to rate entries per second, shared by its worker threads
+
+    Called once per entry. Sleeps are taken every ``rate / 100`` entries
+    rather than per entry, and a scan that fell behind may catch up by at
+    most one second's worth of entries.
+    """
+
+    def __init__(self, rate: Optional[float], stopping: threading.Event = None):
+        self.rate = rate
+        self.stopping = stopping
+        self.step = max(1, int(rate // 100)) if rate else 0
+        self._count = 0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        if self.stopping is not None and self.stopping.is_set():
+            raise ScanCancelled()
+        if not self.rate:
+            return
+        with self._lock:
+            self._count += 1
+            if self._count < self.step:
+                return
+            self._count = 0
+            now = time.monotonic()
+            self._next = max(self._next, now - 1.0) + self.step / self.rate
+            delay = self._next - now
+        if delay > 0:
+            if self.stopping is not None:
+                if self.stopping.wait(delay):
+                    raise ScanCancelled()
+            else:
+                time.sleep(delay)
+
+
+class Reconciler:
+    """Keeps per-root snapshots and reports changes made while the monitor was down
+
+    ``emit`` receives lists of reconciled events, e.g. the dispatcher's
+    ``handle_events``. ``prune`` decides which directory names are left out
+    of snapshots, like the ignored directories of the watch planner.
+    """
+
+    BATCH_SIZE = 512
+
+    def __init__(self, config, emit: Callable[[List], None],
+                 prune: Callable[[str], bool] = None):
+        self.emit = emit
+        self.prune = prune
+        self.state_dir = os.path.abspath(config.get('monitoring.reconcile.state_dir', 'filepulse_state'))
+        # The state directory may sit inside a monitored root; never report our own files
+        self.exclude = [os.path.realpath(self.state_dir)]
+        self.snapshot_interval = config.get('monitoring.reconcile.snapshot_interval', 3600)
+        self.max_entries_per_second = config.get('monitoring.reconcile.max_entries_per_second', 20000)
+        self.workers = config.get('monitoring.reconcile.workers', 4)
+        self.recursive = config.is_recursive
+        self.roots = []
+        for path in config.monitoring_paths:
+            root = os.path.realpath(path)
+            if os.path.isdir(root) and root not in self.roots:
+                self.roots.append(root)
+
+        self._stopping = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()  # one snapshot writer per state file at a time
+        self._ready = set()  # roots whose offline changes have been reported
+
+        # Statistics
+        self.reconciled = 0
+        self.scanning = None
+        self.last_snapshot = None
+
+    def state_path(self, root: str) -> str:
+        """Snapshot file kept for a monitored root"""
+        digest = hashlib.sha1(os.fsencode(root)).hexdigest()[:16]
+        name = os.path.basename(root.rstrip(os.sep)) or 'root'
+        return os.path.join(self.state_dir, f"{name}-{digest}{SNAPSHOT_SUFFIX}")
+
+    def start(self):
+        """Reconcile every root in the background, then snapshot periodically"""
+        if self._thread is not None:
+            return
+        os.makedirs(self.state_dir, exist_ok=True)
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name='FilePulseReconciler', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            for root in self.roots:
+                if self._stopping.is_set():
+                    return
+                self.reconcile(root)
+            while self.snapshot_interval and not self._stopping.wait(self.snapshot_interval):
+                for root in self.roots:
+                    self.save(root)
+        except ScanCancelled:
+            pass
+        except Exception as e:
+            logger.error(f"Reconciliation failed: {e}")
+
+    def _snapshot(self, root: str, output: str, throttled: bool):
+        throttle = ScanThrottle(self.max_entries_per_second if throttled else None,
+                                self._stopping if throttled else None)
+        self.scanning = root
+        try:
+            take_snapshot(root, output, workers=self.workers, pacer=throttle, prune=self.prune,
+                          recursive=self.recursive, exclude=self.exclude)
+        finally:
+            self.scanning = None
+        self.last_snapshot = time.time()
+
+    def reconcile(self, root: str) -> int:
+        """Rescan root, emit what changed since its saved snapshot and save the new one
+
+        Returns the number of events emitted. Without a saved snapshot the
+        rescan only records the baseline.
+        """
+        state = self.state_path(root)
+        current = state + '.new'
+        emitted = 0
+        with self._lock:
+            try:
+                self._snapshot(root, current, throttled=True)
+                if os.path.exists(state):
+                    try:
+                        batch = []
+                        for event in diff_snapshots(state, current):
+                            event.reconciled = True
+                            batch.append(event)
+                            if len(batch) >= self.BATCH_SIZE:
+                                if self._stopping.is_set():
+                                    raise ScanCancelled()
+                                self.emit(batch)
+                                emitted += len(batch)
+                                batch = []
+                        if batch:
+                            self.emit(batch)
+                            emitted += len(batch)
+                    except ValueError as e:
+                        logger.warning(f"Ignoring unreadable snapshot {state}: {e}")
+                else:
+                    logger.info(f"No saved snapshot for {root}, recording a baseline")
+                os.replace(current, state)
+                self._ready.add(root)
+            finally:
+                if os.path.exists(current):
+                    os.remove(current)
+        self.reconciled += emitted
+        if emitted:
+            logger.info(f"Reconciled {emitted} changes under {root} made while not monitoring")
+        return emitted
+
+    def save(self, root: str, throttled: bool = True):
+        """Save the current state of root (once its offline changes were reported)"""
+        if root not in self._ready:
+            return  # keep the old snapshot so the changes are not lost
+        state = self.state_path(root)
+        with self._lock:
+            try:
+                self._snapshot(root, state, throttled)
+            except OSError as e:
+                logger.error(f"Failed to save snapshot of {root}: {e}")
+
+    def stop(self):
+        """Stop the background scan and save the final snapshots
+
+        Call this while the observer is still running: a change made after
+        the final snapshot recorded its entry is then still seen live.
+        """
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        for root in self.roots:
+            self.save(root, throttled=False)
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            'roots': len(self.roots),
+            'reconciled': self.reconciled,
+            'pending': [root for root in self.roots if root not in self._ready],
+            'scanning': self.scanning,
+            'last_snapshot': self.last_snapshot,
+        }
@@ -0,0 +1,232 @@
+"""
+Replay recorded events through FilePulse's event pipeline
+
+Events from a JSONL log, a binary event log (``.fplog``, also rotated
+``.gz``/``.zst`` segments) or a history directory are injected straight into
+``EventHandler.handle_event``, so filtering, batching and the sinks run
+exactly as they would for a live storm, but no filesystem is watched. Each
+sink is timed per batch, and peak memory is sampled while the replay runs.
+"""
+
+import os
+import gzip
+import json
+import time
+import threading
+import logging
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+import psutil
+
+from .binlog import MAGIC
+from .events import EventHandler, FileSystemEvent
+from .history import HistoryStore
+from .logreader import LogReader
+from .output import create_output_handlers
+
+logger = logging.getLogger(__name__)
+
+
+def read_recorded_events(path: str) -> Iterator[FileSystemEvent]:
+    """Yield the events of a JSONL log, binary event log or history directory"""
+    if os.path.isdir(path):
+        yield from HistoryStore(path).query()
+        return
+
+    base, suffix = os.path.splitext(path)
+    if suffix in ('.gz', '.zst'):
+        binary = base.endswith('.fplog')
+    else:
+        with open(path, 'rb') as f:
+            binary = f.read(len(MAGIC)) == MAGIC
+    if binary:
+        with LogReader(path) as reader:
+            for _, block in reader.blocks():
+                yield from block.events()
+        return
+
+    opener = gzip.open if suffix == '.gz' else open
+    skipped = 0
+    with opener(path, 'rt', encoding='utf-8', errors='surrogateescape') as f:
+        for line in f:
+            try:
+                yield FileSystemEvent.from_dict(json.loads(line))
+            except (ValueError, KeyError, TypeError):
+                skipped += 1
+    if skipped:
+        logger.warning(f"Skipped {skipped} unreadable records in {path}")
+
+
+def configure_sinks(config, sinks: List[str], output_dir: str):
+    """Enable exactly the named sinks, writing their files to output_dir"""
+    config.set('output.console', 'console' in sinks)
+    config.set('output.log_file', os.path.join(output_dir, 'filepulse.log') if 'log' in sinks else None)
+    config.set('output.json_output', 'json' in sinks)
+    config.set('output.json_file', os.path.join(output_dir, 'filepulse_events.jsonl'))
+    config.set('output.binary_output', 'binary' in sinks)
+    config.set('output.binary_file', os.path.join(output_dir, 'filepulse_events.fplog'))
+    config.set('output.history_output', 'history' in sinks)
+    config.set('output.history_dir', os.path.join(output_dir, 'history'))
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of sorted values"""
+    if not values:
+        return 0.0
+    rank = max(int(fraction * len(values) + 0.999999) - 1, 0)
+    return values[min(rank, len(values) - 1)]
+
+
+class TimedSink:
+    """Wraps an output handler and records how long each batch takes"""
+
+    def __init__(self, handler: Callable, name: str):
+        self.handler = handler
+        self.name = name
+        self.latencies: List[float] = []
+        self.events = 0
+
+    def __call__(self, events):
+        started = time.perf_counter()
+        try:
+            self.handler(events)
+        finally:
+            self.latencies.append(time.perf_counter() - started)
+            self.events += len(events)
+
+    def close(self):
+        """Close the wrapped handler"""
+        close = getattr(self.handler, 'close', None)
+        if close is not None:
+            close()
+
+    def get_status(self) -> Dict[str, Any]:
+        latencies = sorted(self.latencies)
+        total = sum(latencies)
+        return {
+            'name': self.name,
+            'batches': len(latencies),
+            'events': self.events,
+            'p50': percentile(latencies, 0.50),
+            'p90': percentile(latencies, 0.90),
+            'p99': percentile(latencies, 0.99),
+            'max': latencies[-1] if latencies else 0.0,
+            'per_event': total / self.events if self.events else 0.0,
+        }
+
+
+class MemorySampler:
+    """Samples the resident set size on a background thread and keeps the peak"""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.process = psutil.Process()
+        self.baseline = self.process.memory_info().rss
+        self.peak = self.baseline
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='FilePulseMemorySampler', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        self.peak = max(self.peak, self.process.memory_info().rss)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.sample()
+
+
+class Replayer:
+    """Injects events into an EventHandler at original pacing, N times faster or flat out"""
+
+    def __init__(self, config, speed: Optional[float] = None,
+                 output_handlers: List[Callable] = None):
+        if speed is not None and speed <= 0:
+            raise ValueError(f"Replay speed must be positive: {speed}")
+        self.speed = speed
+
+        handlers = create_output_handlers(config) if output_handlers is None else output_handlers
+        names = [type(handler).__name__ for handler in handlers]
+        self.sinks = [TimedSink(handler, name if names.count(name) == 1 else f"{name}#{position}")
+                      for position, (handler, name) in enumerate(zip(handlers, names), 1)]
+        self.handler = EventHandler(config, self.sinks)
+
+    def run(self, events: Iterable[FileSystemEvent], limit: int = None) -> Dict[str, Any]:
+        """Replay events, close the pipeline and return the report"""
+        sampler = MemorySampler()
+        sampler.start()
+        handle_event = self.handler.handle_event
+        speed = self.speed
+        source = iter(events)
+        reading = 0.0
+        injected = 0
+        first = None
+        behind = 0.0
+        started = time.perf_counter()
+
+        while limit is None or injected < limit:
+            began = time.perf_counter()
+            event = next(source, None)
+            reading += time.perf_counter() - began
+            if event is None:
+                break
+            if speed is not None:
+                if first is None:
+                    first = event.timestamp
+                delay = started + (event.timestamp - first) / speed - time.perf_counter()
+                if delay > 0.001:
+                    time.sleep(delay)
+                else:
+                    behind = max(behind, -delay)
+            handle_event(event)
+            injected += 1
+
+        self.handler.close()  # deliver what is still batched and close the sinks
+        elapsed = time.perf_counter() - started
+        sampler.stop()
+
+        busy = elapsed - reading
+        return {
+            'events': injected,
+            'delivered': self.sinks[0].events if self.sinks else 0,
+            'speed': speed,
+            'elapsed': elapsed,
+            'reading': reading,
+            'throughput': injected / busy if busy > 0 else 0.0,
+            'max_lag': behind,
+            'sinks': [sink.get_status() for sink in self.sinks],
+            'peak_rss': sampler.peak,
+            'rss_growth': sampler.peak - sampler.baseline,
+        }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Human-readable summary of a replay report"""
+    pacing = 'as fast as possible' if report['speed'] is None else f"{report['speed']:g}x speed"
+    lines = [
+        f"Replayed {report['events']} events in {report['elapsed']:.2f}s ({pacing})",
+        f"  throughput: {report['throughput']:,.0f} events/s "
+        f"(excluding {report['reading']:.2f}s reading the log)",
+        f"  delivered:  {report['delivered']} events after filtering",
+    ]
+    if report['speed'] is not None:
+        lines.append(f"  max lag behind schedule: {report['max_lag'] * 1000:.1f} ms")
+    if report['sinks']:
+        lines.append(f"  {'sink':28} {'batches':>8} {'events':>9} {'p50 ms':>8} {'p90 ms':>8} "
+                     f"{'p99 ms':>8} {'max ms':>8} {'us/event':>9}")
+        for sink in report['sinks']:
+            lines.append(f"  {sink['name']:28} {sink['batches']:8} {sink['events']:9} "
+                         f"{sink['p50'] * 1000:8.3f} {sink['p90'] * 1000:8.3f} "
+                         f"{sink['p99'] * 1000:8.3f} {sink['max'] * 1000:8.3f} "
+                         f"{sink['per_event'] * 1e6:9.2f}")
+    lines.append(f"  peak memory: {report['peak_rss'] / 1048576:.1f} MB RSS "
+                 f"(+{report['rss_growth'] / 1048576:.1f} MB during replay)")
+    return '\n'.join(lines)
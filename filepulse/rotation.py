@@ -0,0 +1,156 @@
+"""
+Log rotation and background compression for FilePulse file sinks
+"""
+
+import os
+import re
+import glob
+import gzip
+import queue
+import shutil
+import threading
+import time
+import logging
+from typing import Optional
+
+from .utils import cleanup_old_logs
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+except ImportError:  # zstd compression falls back to gzip
+    zstandard = None
+
+COMPRESSION_SUFFIXES = {'gzip': '.gz', 'zstd': '.zst'}
+
+# Suffix rotated_name() gives a segment, plus the one compression adds
+_SEGMENT_SUFFIX = re.compile(r'\.\d{8}-\d{6}(?:-\d+)?(?:\.gz|\.zst)?')
+
+
+class RotationPolicy:
+    """Decides when a log file is rotated and what happens to old segments
+
+    A file is rotated once it holds ``max_bytes`` or when the wall clock
+    crosses a multiple of ``interval`` seconds (so an interval of 3600
+    rotates on the hour). Rotated segments are compressed and then pruned
+    with the age/count rules of ``cleanup_old_logs``.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None, interval: Optional[float] = None,
+                 compression: str = 'gzip', max_files: int = 10, max_age_days: float = 30):
+        if compression not in ('gzip', 'zstd', 'none'):
+            raise ValueError(f"Unknown compression: {compression}")
+        if compression == 'zstd' and zstandard is None:
+            logger.warning("zstandard is not installed, compressing rotated logs with gzip")
+            compression = 'gzip'
+
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self.compression = compression
+        self.max_files = max_files
+        self.max_age_days = max_age_days
+
+    @classmethod
+    def from_config(cls, config) -> Optional['RotationPolicy']:
+        """Create a policy from configuration, or None if rotation is off"""
+        max_bytes = config.get('output.rotation.max_bytes')
+        interval = config.get('output.rotation.interval')
+        if not max_bytes and not interval:
+            return None
+        return cls(
+            max_bytes=max_bytes or None,
+            interval=interval or None,
+            compression=config.get('output.rotation.compression', 'gzip'),
+            max_files=config.get('output.rotation.max_files', 10),
+            max_age_days=config.get('output.rotation.max_age_days', 30),
+        )
+
+    def should_rotate(self, size: int, started: float, now: float) -> bool:
+        """Check a segment of ``size`` bytes opened at ``started``"""
+        if self.max_bytes and size >= self.max_bytes:
+            return True
+        if self.interval and size and int(now // self.interval) != int(started // self.interval):
+            return True
+        return False
+
+
+def rotated_name(path: str, now: float) -> str:
+    """Free name for a rotated segment, e.g. events.jsonl.20240101-120000"""
+    base = f"{path}.{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}"
+    candidate = base
+    counter = 1
+    while any(os.path.exists(candidate + suffix) for suffix in ('', '.gz', '.zst')):
+        candidate = f"{base}-{counter}"
+        counter += 1
+    return candidate
+
+
+def is_rotated_segment(name: str, live_name: str) -> bool:
+    """Check whether a file name is a rotated (maybe compressed) segment of live_name
+
+    Sidecars such as ``events.jsonl.tsidx`` and ``.tmp`` files of a
+    compression in progress are not segments.
+    """
+    return (name.startswith(live_name)
+            and _SEGMENT_SUFFIX.fullmatch(name, len(live_name)) is not None)
+
+
+def compress_file(path: str, compression: str) -> str:
+    """Compress a file next to itself and remove the original
+
+    The compressed data is written to a temporary name first, so an
+    interrupted run never leaves a truncated archive in place of the log.
+    """
+    target = path + COMPRESSION_SUFFIXES[compression]
+    partial = target + '.tmp'
+    with open(path, 'rb') as source:
+        if compression == 'zstd':
+            with open(partial, 'wb') as raw:
+                zstandard.ZstdCompressor().copy_stream(source, raw)
+        else:
+            with gzip.open(partial, 'wb') as compressed:
+                shutil.copyfileobj(source, compressed, 1024 * 1024)
+    os.replace(partial, target)
+    os.remove(path)
+    return target
+
+
+class BackgroundCompressor:
+    """Compresses rotated segments and applies retention off the event path"""
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, path: str, live_path: str, policy: RotationPolicy):
+        """Queue a rotated segment of live_path for compression and retention"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='FilePulseCompressor',
+                                                daemon=True)
+                self._thread.start()
+        self._queue.put((path, live_path, policy))
+
+    def wait(self):
+        """Block until every queued segment has been processed"""
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            path, live_path, policy = self._queue.get()
+            try:
+                if policy.compression != 'none':
+                    compress_file(path, policy.compression)
+                live_name = os.path.basename(live_path)
+                cleanup_old_logs(os.path.dirname(live_path) or '.', policy.max_age_days,
+                                 policy.max_files, patterns=[glob.escape(live_name) + '.*'],
+                                 match=lambda name: is_rotated_segment(name, live_name))
+            except Exception as e:
+                logger.error(f"Failed to compress rotated log {path}: {e}")
+            finally:
+                self._queue.task_done()
+
+
+compressor = BackgroundCompressor()
@@ -0,0 +1,187 @@
+"""
+Fast JSON serialization of FilePulse events
+"""
+
+import math
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from json.encoder import encode_basestring_ascii
+from typing import Any, Dict, Iterable
+
+from .events import FileSystemEvent
+
+try:
+    import orjson
+except ImportError:  # the built-in writer produces the same records
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+
+def split_timestamp(timestamp: float):
+    """Split a timestamp into whole seconds and microseconds like datetime.fromtimestamp()"""
+    fraction, second = math.modf(timestamp)
+    microseconds = round(fraction * 1e6)
+    if microseconds >= 1000000:
+        second += 1
+        microseconds -= 1000000
+    elif microseconds < 0:
+        second -= 1
+        microseconds += 1000000
+    return second, microseconds
+
+
+class EventSerializer:
+    """Writes events as compact JSON objects, one per line
+
+    The records have the same fields as ``FileSystemEvent.to_dict()``. Keys
+    are written from precomputed fragments and the ISO datetime is built
+    from a per-second cache. When ``orjson`` is installed it encodes the
+    records instead; records with non-ASCII text go through the built-in
+    writer so that they are escaped (``\\u00e9``) like ``json.dumps``
+    output and both writers produce the same bytes. Within a ``delivery()``
+    the JSONL text of the delivered batch is shared, so the console and the
+    JSONL file sink serialize each batch only once.
+    """
+
+    def __init__(self, use_orjson: bool = None, cache_size: int = 1024):
+        self.use_orjson = orjson is not None if use_orjson is None else bool(use_orjson and orjson)
+        self.cache_size = cache_size
+        self._iso_seconds: Dict[float, str] = {}
+        
+        # Events read together share a timestamp; remember the last one.
+        # Memos are single tuples so concurrent sinks never see half an update.
+        self._last_timestamp = (None, '', '')  # (timestamp, JSON text, ISO datetime)
+
+        # Batch being delivered on each thread and its text, once serialized
+        self._delivery = threading.local()
+
+        # Statistics
+        self.batches = 0
+        self.reused = 0
+
+    def isoformat(self, timestamp: float) -> str:
+        """Same as datetime.fromtimestamp(timestamp).isoformat()"""
+        second, microseconds = split_timestamp(timestamp)
+        text = self._iso_seconds.get(second)
+        if text is None:
+            if len(self._iso_seconds) >= self.cache_size:
+                self._iso_seconds.clear()
+            text = datetime.fromtimestamp(second).isoformat()
+            self._iso_seconds[second] = text
+        return f"{text}.{microseconds:06d}" if microseconds else text
+
+    def _timestamp_fields(self, timestamp: float):
+        """(timestamp, JSON text of the timestamp, ISO datetime)"""
+        last = self._last_timestamp
+        if last[0] != timestamp:
+            last = self._last_timestamp = (timestamp, repr(timestamp), self.isoformat(timestamp))
+        return last
+    
+    def to_dict(self, event: FileSystemEvent) -> Dict[str, Any]:
+        """Same as event.to_dict(), using the cached ISO datetime"""
+        data = {
+            'event_type': event.event_type,
+            'src_path': event.src_path,
+            'dest_path': event.dest_path,
+            'is_directory': event.is_directory,
+            'timestamp': event.timestamp,
+            'datetime': self._timestamp_fields(event.timestamp)[2]
+        }
+        if event.count is not None:
+            data['count'] = event.count
+        if event.size is not None:
+            data['size'] = event.size
+            data['mtime'] = event.mtime
+        if event.reconciled:
+            data['reconciled'] = True
+        return data
+
+    def serialize(self, event: FileSystemEvent) -> str:
+        """Serialize one event to a compact JSON object"""
+        if self.use_orjson:
+            try:
+                data = orjson.dumps(self.to_dict(event))
+                if data.isascii():
+                    return data.decode('ascii')
+            except TypeError:
+                pass  # e.g. undecodable file names kept as surrogates
+        return self._serialize_ascii(event)
+
+    def _serialize_ascii(self, event: FileSystemEvent) -> str:
+        """The built-in writer, which escapes all non-ASCII text"""
+        dest_path = event.dest_path
+        _, timestamp, iso = self._timestamp_fields(event.timestamp)
+        parts = [
+            '{"event_type":', encode_basestring_ascii(event.event_type),
+            ',"src_path":', encode_basestring_ascii(event.src_path),
+            ',"dest_path":', encode_basestring_ascii(dest_path) if dest_path is not None else 'null',
+            ',"is_directory":', 'true' if event.is_directory else 'false',
+            ',"timestamp":', timestamp,
+            ',"datetime":"', iso, '"',
+        ]
+        if event.count is not None:
+            parts += (',"count":', repr(event.count))
+        if event.size is not None:
+            parts += (',"size":', repr(event.size), ',"mtime":', repr(event.mtime))
+        if event.reconciled:
+            parts.append(',"reconciled":true')
+        parts.append('}')
+        return ''.join(parts)
+
+    @contextmanager
+    def delivery(self, events: Iterable[FileSystemEvent]):
+        """Share the JSONL text of events among the sinks it is delivered to
+
+        Inside the block serialize_batch() of that same batch returns the
+        text built by the first sink that asked for it. The text is dropped
+        when the block ends, so a batch reused or changed later is
+        serialized afresh.
+        """
+        delivery = self._delivery
+        previous = getattr(delivery, 'batch', None), getattr(delivery, 'text', None)
+        delivery.batch, delivery.text = events, None
+        try:
+            yield
+        finally:
+            delivery.batch, delivery.text = previous
+
+    def serialize_batch(self, events: Iterable[FileSystemEvent]) -> str:
+        """Serialize a batch to JSONL text, shared within a delivery() of the batch"""
+        delivery = self._delivery
+        shared = getattr(delivery, 'batch', None) is events
+        if shared and delivery.text is not None:
+            self.reused += 1
+            return delivery.text
+
+        if self.use_orjson:
+            text = self._orjson_batch(events)
+        else:
+            serialize = self.serialize
+            text = ''.join([serialize(event) + '\n' for event in events])
+        if shared:
+            delivery.text = text
+        self.batches += 1
+        return text
+
+    def _orjson_batch(self, events: Iterable[FileSystemEvent]) -> str:
+        """Encode a batch with orjson, decoding the joined bytes once"""
+        dumps = orjson.dumps
+        to_dict = self.to_dict
+        lines = []
+        for event in events:
+            try:
+                line = dumps(to_dict(event))
+                if not line.isascii():
+                    line = self._serialize_ascii(event).encode('ascii')
+            except TypeError:
+                line = self._serialize_ascii(event).encode('ascii')
+            lines.append(line)
+        lines.append(b'')
+        return b'\n'.join(lines).decode('ascii')
+
+
+# Shared by the output handlers so each batch is serialized once
+default_serializer = EventSerializer()
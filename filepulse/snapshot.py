@@ -0,0 +1,471 @@
+"""
+Directory tree snapshots and snapshot diffs for FilePulse
+
+A snapshot records every entry below a root directory: path, inode, size,
+modification time and optionally a content hash. Entries are stored in
+path order, which lets ``diff_snapshots`` compare two snapshots with a
+streaming merge-join instead of loading either into memory.
+
+File format::
+
+    MAGIC, varint len(header), header (JSON: root, taken, hashed)
+    record := varint shared, varint len(rest), rest,
+              u8 flags, u64 inode, u64 size, i64 mtime (ns), [16-byte hash]
+
+A record's key is its path relative to the root, with NUL separating the
+components (so a directory's entries sort right after it) and ``shared``
+leading bytes taken from the previous record's key. Records are ordered by
+key.
+"""
+
+import os
+import json
+import mmap
+import heapq
+import pickle
+import shutil
+import struct
+import hashlib
+import logging
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+
+from .binlog import decode_varint, encode_varint
+from .events import FileSystemEvent
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'FPSNAP\x00\x01\n'
+RECORD = struct.Struct('<BQQq')
+HASH_SIZE = 16
+
+FLAG_DIRECTORY = 0x01
+FLAG_SYMLINK = 0x02
+FLAG_HASHED = 0x04
+
+_SEPARATOR = b'\0'
+_HASH_CHUNK = 1024 * 1024
+
+
+class SnapshotEntry(NamedTuple):
+    """One entry of a snapshot"""
+    key: bytes  # path below the root, components separated by NUL
+    flags: int
+    inode: int
+    size: int
+    mtime_ns: int
+    digest: Optional[bytes]
+
+    @property
+    def is_directory(self) -> bool:
+        return bool(self.flags & FLAG_DIRECTORY)
+
+
+def key_to_path(root: str, key: bytes) -> str:
+    """Absolute path of a snapshot key"""
+    return os.path.join(root, os.fsdecode(key.replace(_SEPARATOR, os.fsencode(os.sep))))
+
+
+def file_digest(path: str) -> Optional[bytes]:
+    """Content hash stored in snapshots, or None if the file cannot be read"""
+    digest = hashlib.blake2b(digest_size=HASH_SIZE)
+    try:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(_HASH_CHUNK), b''):
+                digest.update(chunk)
+    except OSError:
+        return None
+    return digest.digest()
+
+
+class SnapshotWriter:
+    """Encodes snapshot records (in key order) to a binary file"""
+
+    def __init__(self, f):
+        self.f = f
+        self.previous = b''
+        self.count = 0
+
+    def write_header(self, header: Dict[str, Any]):
+        data = json.dumps(header).encode('utf-8')
+        self.f.write(MAGIC + encode_varint(len(data)) + data)
+
+    def write(self, key: bytes, flags: int, inode: int, size: int, mtime_ns: int,
+              digest: Optional[bytes] = None):
+        previous = self.previous
+        limit = min(len(previous), len(key))
+        shared = 0
+        while shared < limit and previous[shared] == key[shared]:
+            shared += 1
+        if digest is not None:
+            flags |= FLAG_HASHED
+        else:
+            flags &= ~FLAG_HASHED
+        rest = key[shared:]
+        self.f.write(b''.join((encode_varint(shared), encode_varint(len(rest)), rest,
+                               RECORD.pack(flags, inode, size, mtime_ns), digest or b'')))
+        self.previous = key
+        self.count += 1
+
+    def write_stat(self, key: bytes, stat_result: os.stat_result, digest: Optional[bytes] = None):
+        mode = stat_result.st_mode
+        flags = (FLAG_DIRECTORY if _is_dir(mode) else 0) | (FLAG_SYMLINK if _is_link(mode) else 0)
+        self.write(key, flags, stat_result.st_ino, stat_result.st_size, stat_result.st_mtime_ns,
+                   digest)
+
+
+def _is_dir(mode: int) -> bool:
+    return (mode & 0o170000) == 0o040000
+
+
+def _is_link(mode: int) -> bool:
+    return (mode & 0o170000) == 0o120000
+
+
+def _is_regular(mode: int) -> bool:
+    return (mode & 0o170000) == 0o100000
+
+
+def _entry_is_dir(entry: os.DirEntry) -> bool:
+    try:
+        return entry.is_dir(follow_symlinks=False)
+    except OSError:
+        return False
+
+
+class SnapshotReader:
+    """Iterates the entries of a snapshot file in key order"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            self._file.close()
+            raise ValueError(f"Not a FilePulse snapshot: {path}")
+        if self._map[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"Not a FilePulse snapshot: {path}")
+        size, pos = decode_varint(self._map, len(MAGIC))
+        self.header = json.loads(self._map[pos:pos + size].decode('utf-8'))
+        self._start = pos + size
+
+    @property
+    def root(self) -> str:
+        return self.header['root']
+
+    @property
+    def taken(self) -> float:
+        return self.header['taken']
+
+    def __iter__(self) -> Iterator[SnapshotEntry]:
+        data = self._map
+        end = len(data)
+        pos = self._start
+        unpack = RECORD.unpack_from
+        record_size = RECORD.size
+        previous = b''
+        while pos < end:
+            shared, pos = decode_varint(data, pos)
+            length, pos = decode_varint(data, pos)
+            key = previous[:shared] + data[pos:pos + length]
+            pos += length
+            flags, inode, size, mtime_ns = unpack(data, pos)
+            pos += record_size
+            digest = None
+            if flags & FLAG_HASHED:
+                digest = data[pos:pos + HASH_SIZE]
+                pos += HASH_SIZE
+            previous = key
+            yield SnapshotEntry(key, flags, inode, size, mtime_ns, digest)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self) -> 'SnapshotReader':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class _Walk:
+    """Shared state of one snapshot walk"""
+
+    def __init__(self, hashing: bool, pacer=None, prune=None, exclude=()):
+        self.hashing = hashing
+        self.pacer = pacer  # called once per entry, e.g. to throttle the scan
+        self.prune = prune  # directory name -> True to leave it out with its contents
+        self.exclude = frozenset(exclude)  # absolute paths left out with their contents
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def error(self, path: str, error: OSError):
+        with self._lock:
+            self.errors += 1
+        logger.debug(f"Cannot read {path}: {error}")
+
+    def listing(self, path: str) -> List[os.DirEntry]:
+        """Directory entries sorted the way keys sort"""
+        try:
+            with os.scandir(path) as entries:
+                listing = sorted(entries, key=lambda entry: os.fsencode(entry.name))
+        except OSError as e:
+            self.error(path, e)
+            return []
+        if self.prune is not None:
+            listing = [entry for entry in listing
+                       if not (self.prune(entry.name) and _entry_is_dir(entry))]
+        if self.exclude:
+            listing = [entry for entry in listing if entry.path not in self.exclude]
+        return listing
+
+    def record(self, writer: SnapshotWriter, key: bytes, entry: os.DirEntry) -> bool:
+        """Write one entry; returns True if it is a directory to descend into"""
+        if self.pacer is not None:
+            self.pacer()
+        try:
+            stat_result = entry.stat(follow_symlinks=False)
+        except OSError as e:
+            self.error(entry.path, e)
+            return False
+        digest = None
+        if self.hashing and _is_regular(stat_result.st_mode):
+            digest = file_digest(entry.path)
+        writer.write_stat(key, stat_result, digest)
+        return _is_dir(stat_result.st_mode)
+
+    def walk(self, writer: SnapshotWriter, path: str, key: bytes):
+        """Write the entries below a directory depth-first, in key order"""
+        stack = [(key, iter(self.listing(path)))]
+        while stack:
+            prefix, entries = stack[-1]
+            entry = next(entries, None)
+            if entry is None:
+                stack.pop()
+                continue
+            child = prefix + _SEPARATOR + os.fsencode(entry.name)
+            if self.record(writer, child, entry):
+                stack.append((child, iter(self.listing(entry.path))))
+
+
+def take_snapshot(root: str, output: str, hashing: bool = False, workers: int = None,
+                  pacer=None, prune=None, recursive: bool = True,
+                  exclude: List[str] = ()) -> Dict[str, Any]:
+    """Snapshot the tree below root into the file output
+
+    Every top-level subdirectory is walked by a thread pool worker into a
+    run file of its own, kept in a temporary directory. Each worker walks
+    depth-first with sorted listings, so its run is already in key order
+    and the snapshot is the runs concatenated in top-level order. Memory use is bounded by the
+    largest directory listing, not by the size of the tree.
+
+    ``pacer`` is called before every entry is stat'ed (and may sleep to
+    throttle the scan), and directories whose name ``prune`` returns True
+    for are left out, as are the paths in ``exclude`` and the snapshot's
+    own partial and run files. Without ``recursive`` only the entries
+    directly in root are recorded. Returns the snapshot header with entry and error
+    counts.
+    """
+    root = os.path.realpath(root)
+    if not os.path.isdir(root):
+        raise NotADirectoryError(f"Not a directory: {root}")
+    partial = output + '.tmp'
+    scratch = tempfile.mkdtemp(prefix='filepulse-snapshot-')
+    excluded = {os.path.realpath(path) for path in exclude}
+    excluded.update((os.path.realpath(scratch), os.path.realpath(partial)))
+    walk = _Walk(hashing, pacer, prune, excluded)
+    header = {'root': root, 'taken': time.time(), 'hashed': hashing}
+    runs: Dict[int, str] = {}
+    try:
+        top_level = walk.listing(root)
+        with ThreadPoolExecutor(max_workers=workers or min(32, (os.cpu_count() or 1) * 4)) as pool:
+            futures = {}
+            for position, entry in enumerate(top_level):
+                if recursive and _entry_is_dir(entry):
+                    runs[position] = os.path.join(scratch, f'run-{position}')
+                    futures[position] = pool.submit(_walk_run, walk, entry, runs[position])
+
+            with open(partial, 'wb') as f:
+                writer = SnapshotWriter(f)
+                writer.write_header(header)
+                for position, entry in enumerate(top_level):
+                    is_dir = walk.record(writer, os.fsencode(entry.name), entry)
+                    if position in futures:
+                        count = futures[position].result()
+                        if is_dir:
+                            # A run starts without a shared prefix, so it can be appended as is
+                            with open(runs[position], 'rb') as run:
+                                shutil.copyfileobj(run, f, _HASH_CHUNK)
+                            writer.count += count
+                            writer.previous = b''
+        os.replace(partial, output)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+        if os.path.exists(partial):
+            os.remove(partial)
+
+    header.update(entries=writer.count, errors=walk.errors)
+    return header
+
+
+def _walk_run(walk: _Walk, entry: os.DirEntry, run_path: str) -> int:
+    with open(run_path, 'wb') as f:
+        writer = SnapshotWriter(f)
+        walk.walk(writer, entry.path, os.fsencode(entry.name))
+        return writer.count
+
+
+class ExternalSorter:
+    """Sorts tuples, spilling sorted runs to temporary files beyond max_items"""
+
+    CHUNK = 10000
+
+    def __init__(self, max_items: int = 500000):
+        self.max_items = max_items
+        self._items: List[tuple] = []
+        self._runs: List[str] = []
+
+    def add(self, item: tuple):
+        self._items.append(item)
+        if len(self._items) >= self.max_items:
+            self._spill()
+
+    def _spill(self):
+        self._items.sort()
+        handle, path = tempfile.mkstemp(prefix='filepulse-sort-')
+        with os.fdopen(handle, 'wb') as f:
+            for start in range(0, len(self._items), self.CHUNK):
+                pickle.dump(self._items[start:start + self.CHUNK], f, pickle.HIGHEST_PROTOCOL)
+        self._runs.append(path)
+        self._items = []
+
+    @staticmethod
+    def _read_run(path: str) -> Iterator[tuple]:
+        with open(path, 'rb') as f:
+            while True:
+                try:
+                    chunk = pickle.load(f)
+                except EOFError:
+                    return
+                yield from chunk
+
+    def __iter__(self) -> Iterator[tuple]:
+        self._items.sort()
+        if not self._runs:
+            return iter(self._items)
+        return heapq.merge(*(self._read_run(path) for path in self._runs), self._items)
+
+    def close(self):
+        """Remove the spilled runs"""
+        for path in self._runs:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._runs = []
+        self._items = []
+
+
+def _modified(old: SnapshotEntry, new: SnapshotEntry) -> bool:
+    if old.digest is not None and new.digest is not None:
+        return old.digest != new.digest or old.size != new.size
+    return old.size != new.size or old.mtime_ns != new.mtime_ns or old.inode != new.inode
+
+
+def _same_object(old: SnapshotEntry, new: SnapshotEntry) -> bool:
+    """Whether entries with the same inode are one file that was moved"""
+    if old.is_directory != new.is_directory:
+        return False
+    # A renamed file keeps its size and mtime; anything else is likely a reused inode
+    return old.is_directory or (old.size == new.size and old.mtime_ns == new.mtime_ns)
+
+
+def diff_snapshots(old_path: str, new_path: str,
+                   max_items: int = 500000) -> Iterator[FileSystemEvent]:
+    """Yield the events that turn the old snapshot into the new one, ordered by path
+
+    Entries are matched by path with a merge-join. Entries present on only
+    one side are then matched by inode to find moves (also for entries
+    inside a moved directory, as watchdog reports them). Unmatched entries
+    become created and deleted events; directories are never reported as
+    modified. Sorting beyond ``max_items`` entries spills to temporary
+    files, so memory stays bounded however large the trees are.
+    """
+    deleted = ExternalSorter(max_items)
+    created = ExternalSorter(max_items)
+    results = ExternalSorter(max_items)
+    try:
+        with SnapshotReader(old_path) as old, SnapshotReader(new_path) as new:
+            old_root, new_root, taken = old.root, new.root, new.taken
+            old_entries, new_entries = iter(old), iter(new)
+            a = next(old_entries, None)
+            b = next(new_entries, None)
+            while a is not None or b is not None:
+                if b is None or (a is not None and a.key < b.key):
+                    deleted.add((a.inode, a.key, a.flags, a.size, a.mtime_ns))
+                    a = next(old_entries, None)
+                elif a is None or b.key < a.key:
+                    created.add((b.inode, b.key, b.flags, b.size, b.mtime_ns))
+                    b = next(new_entries, None)
+                else:
+                    if a.is_directory != b.is_directory:
+                        deleted.add((a.inode, a.key, a.flags, a.size, a.mtime_ns))
+                        created.add((b.inode, b.key, b.flags, b.size, b.mtime_ns))
+                    elif not b.is_directory and _modified(a, b):
+                        results.add((key_to_path(new_root, b.key), 'modified', None,
+                                     b.flags, b.size, b.mtime_ns))
+                    a = next(old_entries, None)
+                    b = next(new_entries, None)
+
+        gone = iter(deleted)
+        added = iter(created)
+        d = next(gone, None)
+        c = next(added, None)
+        while d is not None or c is not None:
+            if c is None or (d is not None and d[0] < c[0]):
+                results.add((key_to_path(old_root, d[1]), 'deleted', None) + d[2:])
+                d = next(gone, None)
+            elif d is None or c[0] < d[0]:
+                results.add((key_to_path(new_root, c[1]), 'created', None) + c[2:])
+                c = next(added, None)
+            else:
+                old_entry = SnapshotEntry(d[1], d[2], d[0], d[3], d[4], None)
+                new_entry = SnapshotEntry(c[1], c[2], c[0], c[3], c[4], None)
+                if _same_object(old_entry, new_entry):
+                    results.add((key_to_path(old_root, d[1]), 'moved',
+                                 key_to_path(new_root, c[1])) + c[2:])
+                else:
+                    results.add((key_to_path(old_root, d[1]), 'deleted', None) + d[2:])
+                    results.add((key_to_path(new_root, c[1]), 'created', None) + c[2:])
+                d = next(gone, None)
+                c = next(added, None)
+        deleted.close()
+        created.close()
+
+        for src_path, event_type, dest_path, flags, size, mtime_ns in results:
+            yield snapshot_event(event_type, src_path, dest_path, flags, size, mtime_ns, taken)
+    finally:
+        deleted.close()
+        created.close()
+        results.close()
+
+
+def snapshot_event(event_type: str, src_path: str, dest_path: Optional[str], flags: int,
+                   size: int, mtime_ns: int, timestamp: float) -> FileSystemEvent:
+    """Build the event for a difference between snapshots"""
+    is_directory = bool(flags & FLAG_DIRECTORY)
+    event = FileSystemEvent(event_type, src_path, dest_path, is_directory=is_directory,
+                            timestamp=timestamp)
+    # Snapshot paths are already absolute and resolved
+    event._src_path = event.raw_src_path
+    event._dest_path = event.raw_dest_path
+    if not is_directory:
+        event.size = size
+        event.mtime = mtime_ns / 1e9
+    return event
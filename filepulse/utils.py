@@ -7,15 +7,21 @@ import sys
 import time
 import hashlib
 import platform
-from typing import Dict, List, Any, Optional
+import threading
+from collections import OrderedDict, deque
+from typing import Callable, Dict, List, Any, Optional, Hashable
 from pathlib import Path
+from stat import S_ISDIR, S_ISREG
 
 
-def get_file_info(file_path: str) -> Dict[str, Any]:
-    """Get detailed information about a file"""
+def get_file_info(file_path: str, stat_result: Optional[os.stat_result] = None) -> Dict[str, Any]:
+    """Get detailed information about a file
+    
+    Pass ``stat_result`` when the file was already stat'ed to avoid another syscall.
+    """
     try:
         path = Path(file_path)
-        stat = path.stat()
+        stat = stat_result if stat_result is not None else path.stat()
         
         return {
             'path': str(path.resolve()),
@@ -24,9 +30,9 @@ def get_file_info(file_path: str) -> Dict[str, Any]:
             'created': stat.st_ctime,
             'modified': stat.st_mtime,
             'accessed': stat.st_atime,
-            'is_directory': path.is_dir(),
-            'is_file': path.is_file(),
-            'exists': path.exists(),
+            'is_directory': S_ISDIR(stat.st_mode),
+            'is_file': S_ISREG(stat.st_mode),
+            'exists': True,
             'extension': path.suffix,
             'parent': str(path.parent)
         }
@@ -184,8 +190,14 @@ def validate_path(path: str) -> bool:
         return False
 
 
-def cleanup_old_logs(log_directory: str, max_age_days: int = 30, max_files: int = 10):
-    """Clean up old log files"""
+def cleanup_old_logs(log_directory: str, max_age_days: int = 30, max_files: int = 10,
+                     patterns: List[str] = None, match: Callable[[str], bool] = None):
+    """Clean up old log files
+    
+    Keeps at most ``max_files`` of the files matching ``patterns`` (newest
+    first) and removes any older than ``max_age_days``. ``match``, if given,
+    narrows the globbed files down by name.
+    """
     try:
         log_path = Path(log_directory)
         if not log_path.exists():
@@ -193,8 +205,10 @@ def cleanup_old_logs(log_directory: str, max_age_days: int = 30, max_files: int
         
         # Find log files
         log_files = []
-        for pattern in ['*.log', '*.jsonl']:
+        for pattern in patterns or ['*.log', '*.jsonl']:
             log_files.extend(log_path.glob(pattern))
+        if match is not None:
+            log_files = [log_file for log_file in log_files if match(log_file.name)]
         
         # Sort by modification time (newest first)
         log_files.sort(key=lambda x: x.stat().st_mtime, reverse=True)
@@ -234,21 +248,113 @@ def get_disk_usage(path: str) -> Dict[str, int]:
         return {'total': 0, 'used': 0, 'free': 0, 'percent_used': 0}
 
 
+class LRUCache:
+    """Thread-safe bounded least-recently-used cache"""
+    
+    def __init__(self, max_size: int = 4096):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get a cached value and mark it as recently used"""
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def put(self, key: Hashable, value: Any):
+        """Store a value, evicting the least recently used entry if full"""
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+    
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove an entry and return its value"""
+        with self._lock:
+            return self._data.pop(key, default)
+    
+    def keys(self) -> List[Hashable]:
+        """Snapshot of the cached keys, least recently used first"""
+        with self._lock:
+            return list(self._data)
+    
+    def values(self) -> List[Any]:
+        """Snapshot of the cached values, least recently used first"""
+        with self._lock:
+            return list(self._data.values())
+    
+    def clear(self):
+        """Remove all entries and reset the hit counters"""
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+    
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups answered from the cache"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+    
+    def __len__(self) -> int:
+        return len(self._data)
+    
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+
+class TokenBucket:
+    """Token bucket rate limiter with O(1) checks"""
+    
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else rate
+        self.tokens = self.capacity
+        self.updated = None
+    
+    def consume(self, tokens: float = 1.0, now: Optional[float] = None) -> bool:
+        """Take tokens from the bucket if enough are available"""
+        if now is None:
+            now = time.time()
+        if self.updated is not None and now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True
+        return False
+    
+    def refund(self, tokens: float = 1.0):
+        """Return tokens taken by a consume() whose work was not done"""
+        self.tokens = min(self.capacity, self.tokens + tokens)
+
+
 class RateLimiter:
     """Simple rate limiter to prevent event flooding"""
     
     def __init__(self, max_calls: int = 100, time_window: float = 1.0):
         self.max_calls = max_calls
         self.time_window = time_window
-        self.calls = []
+        self.calls = deque()
     
     def allow(self) -> bool:
         """Check if call is allowed under rate limit"""
         current_time = time.time()
         
-        # Remove old calls outside the time window
-        self.calls = [call_time for call_time in self.calls 
-                     if current_time - call_time < self.time_window]
+        # Remove old calls outside the time window (oldest first)
+        while self.calls and current_time - self.calls[0] >= self.time_window:
+            self.calls.popleft()
         
         # Check if we're under the limit
         if len(self.calls) < self.max_calls:
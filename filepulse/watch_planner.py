@@ -0,0 +1,80 @@
+"""
+Watch planning for FilePulse
+
+Decides which directories receive kernel watches and which event kinds
+those watches subscribe to, so that ignored subtrees and unwanted event
+types are dropped before they ever reach Python.
+"""
+
+from typing import List, Optional
+
+from . import inotify_backend as inotify
+from .events import PatternMatcher
+
+
+class WatchPlanner:
+    """Plans watch registration from the monitoring configuration"""
+
+    def __init__(self, config):
+        self.config = config
+        self.monitoring_events = set(config.monitoring_events)
+
+        self.ignored = PatternMatcher(config.ignore_directories)
+
+    def is_ignored_directory(self, name: str) -> bool:
+        """Check if a directory name is excluded from watching"""
+        return self.ignored.matches(name)
+
+    def inotify_mask(self, recursive: bool = True) -> int:
+        """Translate monitoring.events into the narrowest inotify mask"""
+        events = self.monitoring_events
+        mask = 0
+
+        if 'created' in events:
+            # Files moved in from outside the watched tree are reported as created
+            mask |= inotify.IN_CREATE | inotify.IN_MOVED_TO
+        if 'deleted' in events:
+            # Files moved out of the watched tree are reported as deleted
+            mask |= inotify.IN_DELETE | inotify.IN_MOVED_FROM
+        if 'modified' in events:
+            mask |= inotify.IN_MODIFY
+        if 'moved' in events:
+            mask |= inotify.IN_MOVED_FROM | inotify.IN_MOVED_TO
+
+        if recursive:
+            # New and renamed directories must be seen to keep watches current
+            mask |= inotify.IN_CREATE | inotify.IN_MOVED_FROM | inotify.IN_MOVED_TO
+
+        return mask | inotify.IN_DELETE_SELF | inotify.IN_MOVE_SELF
+
+    def watchdog_event_filter(self, recursive: bool = True) -> Optional[List[type]]:
+        """Translate monitoring.events into a watchdog ``event_filter`` list
+
+        Returns None when every event kind is wanted.
+        """
+        try:
+            from watchdog.events import (
+                FileCreatedEvent, DirCreatedEvent, FileModifiedEvent,
+                FileDeletedEvent, DirDeletedEvent, FileMovedEvent, DirMovedEvent,
+            )
+        except ImportError:
+            return None
+
+        events = self.monitoring_events
+        if {'created', 'modified', 'deleted', 'moved'} <= events:
+            return None
+
+        classes = set()
+        if 'created' in events:
+            classes.update((FileCreatedEvent, DirCreatedEvent))
+        if 'deleted' in events:
+            classes.update((FileDeletedEvent, DirDeletedEvent, FileMovedEvent, DirMovedEvent))
+        if 'modified' in events:
+            # Directory modifications are discarded by FilePulseHandler anyway
+            classes.add(FileModifiedEvent)
+        if 'moved' in events:
+            classes.update((FileMovedEvent, DirMovedEvent))
+        if recursive:
+            classes.update((DirCreatedEvent, DirMovedEvent))
+
+        return list(classes)
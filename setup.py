@@ -62,6 +62,7 @@ setup(
         ],
         "gui": [],  # GUI dependencies are already in main requirements
         "design": ["Pillow>=8.0.0"],  # Design tools dependencies
+        "fast": ["orjson>=3.6"],  # Fast JSON output
     },
     entry_points={
         "console_scripts": [
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Tests for the binary event log format and reader
+"""
+
+import io
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, '.')
+
+from filepulse.binlog import SegmentEncoder, MAGIC, encode_varint, decode_varint
+from filepulse.config import Config
+from filepulse.events import FileSystemEvent, EventBatch
+from filepulse.logreader import LogReader, convert_to_jsonl
+from filepulse.output import BinaryOutputHandler
+from filepulse.serialization import EventSerializer
+
+
+def sample_events(root):
+    events = [
+        FileSystemEvent('created', os.path.join(root, 'a.txt'), timestamp=1700000000.000001),
+        FileSystemEvent('modified', os.path.join(root, 'sub', 'café.txt'), timestamp=1700000000.25),
+        FileSystemEvent('moved', os.path.join(root, 'a.txt'), os.path.join(root, 'sub', 'b.txt'),
+                        timestamp=1700000000.25),
+        FileSystemEvent('deleted', os.path.join(root, 'sub'), is_directory=True, timestamp=1700000001.5),
+        FileSystemEvent('suppressed', root, is_directory=True, timestamp=1700000002.0, count=70000),
+        FileSystemEvent('modified', os.path.join(root, 'bad\udcff'), timestamp=1699999999.0),
+    ]
+    events[1].size, events[1].mtime, events[1].inode = 12, 1699999998.5, 4242
+    return events
+
+
+def test_varint_round_trip():
+    for value in (0, 1, 127, 128, 300, 2 ** 35, 2 ** 63):
+        assert decode_varint(encode_varint(value), 0) == (value, len(encode_varint(value)))
+
+
+def test_binary_sink_round_trips_through_reader():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.realpath(tmp)
+        path = os.path.join(root, 'events.fplog')
+        handler = BinaryOutputHandler(Config(), path)
+
+        events = sample_events(root)
+        handler(EventBatch(events[:3]))
+        handler(events[3:])  # plain lists work too, unsorted ones included
+        handler.close()
+
+        # Resuming an existing segment resets the string table
+        handler(EventBatch(events[:1]))
+        handler.close()
+
+        with open(path, 'rb') as f:
+            assert f.read(len(MAGIC)) == MAGIC
+
+        with LogReader(path) as reader:
+            decoded = [event.to_dict() for event in reader]
+        expected = [event.to_dict() for event in EventBatch(events[:3])]
+        expected += [event.to_dict() for event in EventBatch(events[3:])]
+        expected += [events[0].to_dict()]
+        assert decoded == expected
+
+
+def test_blocks_store_resolved_directories():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.realpath(tmp)
+        os.makedirs(os.path.join(root, 'real'))
+        os.symlink(os.path.join(root, 'real'), os.path.join(root, 'link'))
+        unresolved = FileSystemEvent('created', os.path.join(root, 'link', 'a.txt'), timestamp=1.0)
+        resolved = FileSystemEvent('created', os.path.join(root, 'real', 'b.txt'), timestamp=2.0)
+        resolved.src_path = resolved.raw_src_path
+        top = FileSystemEvent('created', '/', is_directory=True, timestamp=3.0)
+        top.src_path = '/'
+
+        path = os.path.join(root, 'events.fplog')
+        with open(path, 'wb') as f:
+            f.write(MAGIC + SegmentEncoder().encode([unresolved, resolved, top]))
+        with LogReader(path) as reader:
+            (_, block), = reader.blocks()
+            assert block.paths() == [os.path.join(root, 'real', 'a.txt'),
+                                     os.path.join(root, 'real', 'b.txt'), '/']
+            assert [event.src_path for event in block.events()] == block.paths()
+            assert [event.to_dict() for event in block.events([2, 0])] == \
+                [event.to_dict() for event in (block.events()[2], block.events()[0])]
+
+
+def test_convert_to_jsonl_matches_json_sink():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.realpath(tmp)
+        path = os.path.join(root, 'events.fplog')
+        events = EventBatch(sample_events(root))
+        with open(path, 'wb') as f:
+            f.write(MAGIC + SegmentEncoder().encode(events))
+
+        output = io.StringIO()
+        assert convert_to_jsonl(path, output) == len(events)
+        assert output.getvalue() == EventSerializer().serialize_batch(list(events))
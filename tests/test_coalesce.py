@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Tests for per-path event coalescing
+"""
+
+import sys
+import time
+
+sys.path.insert(0, '.')
+
+from filepulse.config import Config
+from filepulse.events import FileSystemEvent, EventHandler
+from filepulse.coalesce import EventCoalescer
+
+
+def _event(event_type, path, **kwargs):
+    return FileSystemEvent(event_type, path, **kwargs)
+
+
+def test_coalescing_state_machine():
+    coalescer = EventCoalescer(window=1.0)
+    now = 1000.0
+
+    # created -> modified -> modified collapses to created
+    for event_type in ('created', 'modified', 'modified'):
+        assert coalescer.add(_event(event_type, '/data/a.txt'), now) == []
+    # created -> deleted cancels out
+    coalescer.add(_event('created', '/data/tmp.txt'), now)
+    coalescer.add(_event('deleted', '/data/tmp.txt'), now)
+    # repeated modified collapses to one
+    for _ in range(5):
+        coalescer.add(_event('modified', '/data/b.txt'), now)
+
+    assert coalescer.expire(now + 0.5) == []
+    released = coalescer.expire(now + 1.2)
+    assert sorted((e.event_type, e.raw_src_path) for e in released) == [
+        ('created', '/data/a.txt'),
+        ('modified', '/data/b.txt'),
+    ]
+    assert len(coalescer) == 0
+    assert coalescer.next_deadline() is None
+
+
+def test_moves_release_pending_state_first():
+    coalescer = EventCoalescer(window=1.0)
+    coalescer.add(_event('created', '/data/a.tmp'), 0.0)
+    released = coalescer.add(_event('moved', '/data/a.tmp', dest_path='/data/a.txt'), 0.0)
+    assert [e.event_type for e in released] == ['created', 'moved']
+
+
+def test_event_handler_coalesces_within_window():
+    config = Config()
+    config.set('performance.coalesce_window', 0.05)
+    config.set('performance.batch_timeout', 0.01)
+    received = []
+    handler = EventHandler(config, [received.extend])
+
+    handler.handle_event(_event('created', '/data/a.txt'))
+    handler.handle_event(_event('modified', '/data/a.txt'))
+    handler.handle_event(_event('modified', '/data/a.txt'))
+
+    deadline = time.time() + 2
+    while not received and time.time() < deadline:
+        time.sleep(0.01)
+    handler.close()
+
+    assert [(e.event_type, e.raw_src_path) for e in received] == [('created', '/data/a.txt')]
+
+
+def test_intake_chunks_reach_the_coalescer_in_order():
+    import threading
+
+    config = Config()
+    config.set('performance.coalesce_window', 0.05)
+    config.set('performance.batch_timeout', 0.01)
+    config.set('performance.filter_chunk_size', 1)
+    received = []
+    handler = EventHandler(config, [received.extend])
+
+    # The first chunk is slow to filter; the second must still follow it
+    filter_batch = handler.event_filter.filter_batch
+    def slow_filter_batch(events):
+        if events[0].event_type == 'deleted':
+            time.sleep(0.2)
+        return filter_batch(events)
+    handler.event_filter.filter_batch = slow_filter_batch
+
+    first = threading.Thread(target=handler.handle_events, args=([_event('deleted', '/data/a.txt')],))
+    first.start()
+    time.sleep(0.05)
+    handler.handle_events([_event('created', '/data/a.txt')])
+    first.join()
+
+    deadline = time.time() + 2
+    while not received and time.time() < deadline:
+        time.sleep(0.01)
+    handler.close()
+
+    # deleted -> created collapses to modified; the reverse order would cancel out
+    assert [(e.event_type, e.raw_src_path) for e in received] == [('modified', '/data/a.txt')]
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Tests for the bounded event dispatcher
+"""
+
+import sys
+import threading
+import time
+
+sys.path.insert(0, '.')
+
+from filepulse.config import Config
+from filepulse.events import FileSystemEvent, EventHandler
+from filepulse.dispatch import EventDispatcher
+
+
+def _make_handler():
+    config = Config()
+    config.set('performance.batch_events', False)
+    config.set('monitoring.filters.exclude_patterns', [])
+    received = []
+    release = threading.Event()
+
+    def slow_sink(events):
+        release.wait(5)
+        received.extend(events)
+
+    return EventHandler(config, [slow_sink]), received, release
+
+
+def _events(count, directory='/data'):
+    return [FileSystemEvent('created', f'{directory}/file{i}.txt') for i in range(count)]
+
+
+def test_summarize_policy_reports_suppressed_events():
+    """Overflowing events are folded into a summary event"""
+    handler, received, release = _make_handler()
+    dispatcher = EventDispatcher(handler, capacity=10, overflow_policy='summarize', chunk_size=1)
+    dispatcher.start()
+
+    dispatcher.handle_events(_events(1))
+    time.sleep(0.1)  # the sink is now blocked on the first event
+    dispatcher.handle_events(_events(50))
+
+    status = dispatcher.get_status()
+    assert status['depth'] == 10
+    assert status['suppressed'] == 40
+
+    release.set()
+    dispatcher.stop()
+
+    summaries = [e for e in received if e.event_type == 'suppressed']
+    assert len(received) == 12
+    assert summaries[0].count == 40
+    assert summaries[0].src_path.endswith('data')
+
+
+def test_summaries_are_reported_with_a_capacity_of_one():
+    """An empty queue always counts as eased, whatever the capacity"""
+    handler, received, release = _make_handler()
+    dispatcher = EventDispatcher(handler, capacity=1, overflow_policy='summarize', chunk_size=1)
+    dispatcher.start()
+
+    dispatcher.handle_events(_events(1))
+    time.sleep(0.1)
+    dispatcher.handle_events(_events(5))
+    assert dispatcher.get_status()['suppressed'] == 4
+
+    release.set()
+    deadline = time.time() + 2
+    while time.time() < deadline and not any(e.event_type == 'suppressed' for e in received):
+        time.sleep(0.01)
+    dispatcher.stop(timeout=1)
+    summaries = [e for e in received if e.event_type == 'suppressed']
+    assert len(summaries) == 1 and summaries[0].count == 4
+
+
+def test_drop_oldest_policy_counts_drops():
+    """The oldest queued events are discarded when the queue is full"""
+    handler, received, release = _make_handler()
+    dispatcher = EventDispatcher(handler, capacity=5, overflow_policy='drop_oldest', chunk_size=1)
+    dispatcher.start()
+
+    dispatcher.handle_events(_events(1))
+    time.sleep(0.1)
+    dispatcher.handle_events(_events(20))
+    assert dispatcher.get_status()['dropped'] == 15
+
+    release.set()
+    dispatcher.stop()
+    assert [e.raw_src_path for e in received[1:]] == [f'/data/file{i}.txt' for i in range(15, 20)]
+
+
+def test_unstarted_dispatcher_processes_synchronously():
+    handler, received, release = _make_handler()
+    release.set()
+    EventDispatcher(handler).handle_event(FileSystemEvent('created', '/data/a.txt'))
+    assert len(received) == 1
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Tests for event representation, filtering and batching
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, '.')
+
+from filepulse.config import Config
+from filepulse.events import FileSystemEvent, EventFilter, EventHandler, EventBatch, resolve_path
+
+
+def test_event_paths_resolve_lazily():
+    """Paths are resolved on first access, not when the event is created"""
+    with tempfile.TemporaryDirectory() as tmp:
+        real = os.path.join(tmp, 'real')
+        os.mkdir(real)
+        link = os.path.join(tmp, 'link')
+        os.symlink(real, link)
+
+        event = FileSystemEvent('created', os.path.join(link, 'a.txt'), timestamp=1700000000.5)
+        assert event._src_path is None
+        assert event._datetime is None
+
+        expected = os.path.join(str(Path(real).resolve()), 'a.txt')
+        assert event.src_path == expected
+        assert event.dest_path is None
+        assert event.datetime.timestamp() == event.timestamp
+
+
+def test_resolve_path_handles_relative_paths():
+    """Relative paths resolve against the working directory"""
+    assert resolve_path('some_file.txt') == str(Path('some_file.txt').resolve())
+    assert resolve_path('/') == str(Path('/').resolve())
+
+
+def test_replaced_directories_are_resolved_afresh():
+    """Deleting or moving a directory drops its cached resolutions"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = os.path.realpath(tmp)
+        first, second = os.path.join(tmp, 'first'), os.path.join(tmp, 'second')
+        os.makedirs(os.path.join(first, 'sub'))
+        os.makedirs(os.path.join(second, 'sub'))
+        link = os.path.join(tmp, 'link')
+        os.symlink(first, link)
+        event_filter = EventFilter(Config())
+
+        def resolved(*parts):
+            event = FileSystemEvent('created', os.path.join(link, *parts))
+            event_filter.filter_batch([event])
+            return event.src_path
+
+        assert resolved('a.txt') == os.path.join(first, 'a.txt')
+        assert resolved('sub', 'a.txt') == os.path.join(first, 'sub', 'a.txt')
+
+        # Repointed with `ln -sfn`: a new link is renamed over the old one
+        os.symlink(second, link + '.new')
+        os.replace(link + '.new', link)
+        event_filter.filter_batch([FileSystemEvent('moved', link + '.new', link)])
+        assert resolved('a.txt') == os.path.join(second, 'a.txt')
+        assert resolved('sub', 'a.txt') == os.path.join(second, 'sub', 'a.txt')
+
+        # A directory replaced by a symlink, reported through should_process_event
+        real = os.path.join(tmp, 'real')
+        os.makedirs(os.path.join(real, 'sub'))
+        event = FileSystemEvent('created', os.path.join(real, 'sub', 'b.txt'))
+        event_filter.should_process_event(event)
+        assert event.src_path == os.path.join(real, 'sub', 'b.txt')
+        os.rename(real, os.path.join(tmp, 'old'))
+        os.symlink(second, real)
+        event_filter.should_process_event(FileSystemEvent('moved', real, os.path.join(tmp, 'old'),
+                                                          is_directory=True))
+        event = FileSystemEvent('created', os.path.join(real, 'sub', 'b.txt'))
+        event_filter.should_process_event(event)
+        assert event.src_path == os.path.join(second, 'sub', 'b.txt')
+
+
+def test_event_batch_round_trip():
+    """EventBatch yields equivalent events in timestamp order"""
+    events = [
+        FileSystemEvent('modified', '/data/project/b.txt', timestamp=20.0),
+        FileSystemEvent('created', '/data/project/a.txt', timestamp=10.0),
+        FileSystemEvent('moved', '/data/project/a.txt', dest_path='/data/other/a.txt',
+                        timestamp=30.0),
+        FileSystemEvent('created', '/data/project/sub', is_directory=True, timestamp=30.0),
+    ]
+
+    batch = EventBatch(events)
+    assert len(batch) == 4
+    assert len(batch._dirs) == 1
+
+    expected = sorted(events, key=lambda e: e.timestamp)
+    assert [e.to_dict() for e in batch] == [e.to_dict() for e in expected]
+    assert batch[-1].is_directory
+    assert batch[0].event_type == 'created'
+
+    # The order of an unsorted batch is computed once and redone after appends
+    order = batch._order()
+    assert batch._order() is order
+    batch.append(FileSystemEvent('deleted', '/data/project/c.txt', timestamp=5.0))
+    assert batch[0].raw_src_path == '/data/project/c.txt'
+    assert [e.timestamp for e in batch] == [5.0, 10.0, 20.0, 30.0, 30.0]
+
+
+def test_batch_timer_flushes_without_new_events():
+    """Batched events reach the sinks within batch_timeout on their own"""
+    import time
+
+    config = Config()
+    config.set('performance.batch_timeout', 0.05)
+    received = []
+    handler = EventHandler(config, [received.extend])
+
+    handler.handle_event(FileSystemEvent('created', '/data/a.txt'))
+    assert received == []
+
+    deadline = time.time() + 2
+    while not received and time.time() < deadline:
+        time.sleep(0.01)
+    handler.close()
+
+    assert [e.raw_src_path for e in received] == ['/data/a.txt']
+
+
+def test_event_batch_tracks_memory_incrementally():
+    """The running byte estimate grows on append and starts over per batch"""
+    batch = EventBatch()
+    assert batch.nbytes == 0
+
+    batch.append(FileSystemEvent('created', '/data/a.txt'))
+    first = batch.nbytes
+    batch.append(FileSystemEvent('created', '/data/b.txt'))
+    # Second event reuses the interned directory, so it costs less
+    assert 0 < batch.nbytes - first < first
+
+    batch.clear()
+    assert batch.nbytes == 0
+
+
+def test_rate_limited_events_are_summarized():
+    """Events over max_events_per_second become a suppressed summary"""
+    config = Config()
+    config.set('monitoring.paths', ['/data'])
+    config.set('performance.batch_events', False)
+    config.set('performance.max_events_per_second', 10)
+    received = []
+    handler = EventHandler(config, [received.extend])
+
+    for i in range(25):
+        handler.handle_event(FileSystemEvent('created', f'/data/sub/file{i}.txt'))
+    handler.close()
+
+    summaries = [e for e in received if e.event_type == 'suppressed']
+    assert len(received) - len(summaries) == 10
+    assert [(e.src_path, e.count) for e in summaries] == [(os.path.realpath('/data'), 15)]
+
+
+def test_adaptive_batching_tracks_load():
+    """Idle monitors get the minimum timeout; costly storms get bigger batches"""
+    from filepulse.adaptive import AdaptiveBatchTuner
+
+    tuner = AdaptiveBatchTuner(timeout_range=(0.02, 2.0), size_range=(10, 10000))
+    now = 1000.0
+    for _ in range(10):
+        now += 5.0
+        tuner.observe_flush(events=1, cost=0.0001, now=now)
+    assert tuner.batch_timeout == 0.02
+    assert tuner.max_events_per_batch == 10
+
+    for _ in range(30):
+        now += tuner.batch_timeout
+        tuner.observe_flush(events=5000, cost=0.2, now=now)
+    assert tuner.batch_timeout > 0.5
+    assert tuner.max_events_per_batch > 1000
+
+    status = tuner.get_status()
+    assert set(status) == {'batch_timeout', 'max_events_per_batch', 'arrival_rate', 'flush_cost_ms'}
+
+
+def test_batching_status_reports_adaptive_bounds():
+    config = Config()
+    config.set('performance.adaptive_batching', True)
+    handler = EventHandler(config)
+    status = handler.get_batching_status()
+    assert status['adaptive'] is True
+    assert status['batch_timeout'] == 0.02
+
+
+def test_pattern_matcher_agrees_with_fnmatch():
+    """Compiled patterns match exactly what fnmatch would"""
+    import fnmatch
+    from filepulse.events import PatternMatcher
+
+    patterns = ['*.tmp', '*.tar.gz', '.DS_Store', 'Thumbs.db', '~$*', '*.py[co]',
+                'build-??', '*.log~', '[!a]*.bak']
+    names = ['a.tmp', '.tmp', 'x.tmp.txt', 'backup.tar.gz', '.DS_Store', 'Thumbs.db',
+             '~$report.docx', 'mod.pyc', 'mod.py', 'build-01', 'build-001', 'app.log~',
+             'b.bak', 'a.bak', 'noext', '']
+
+    matcher = PatternMatcher(patterns)
+    for name in names:
+        expected = any(fnmatch.fnmatch(name, pattern) for pattern in patterns)
+        assert matcher.matches(name) == expected, name
+
+
+def test_event_filter_ignores_directories_and_patterns():
+    config = Config()
+    event_filter = EventFilter(config)
+
+    def accepted(path):
+        return event_filter.should_process_event(FileSystemEvent('modified', path))
+
+    assert accepted('/repo/src/main.py')
+    assert not accepted('/repo/.git/objects/ab/cdef')
+    assert not accepted('/repo/node_modules/pkg/index.js')
+    assert not accepted('/repo/src/.main.py.swp')
+    assert not accepted('/repo/src/__pycache__')
+
+
+def test_filter_caches_directory_verdicts():
+    config = Config()
+    event_filter = EventFilter(config)
+
+    for i in range(10):
+        event_filter.should_process_event(FileSystemEvent('modified', f'/repo/.git/objects/{i}'))
+        event_filter.should_process_event(FileSystemEvent('modified', f'/repo/src/file{i}.py'))
+
+    status = event_filter.get_status()
+    assert status['dir_cache_misses'] == 2
+    assert status['dir_cache_hits'] == 18
+
+    event_filter.invalidate_cache()
+    assert event_filter.get_status()['dir_cache_size'] == 0
+
+
+def test_size_filter_stats_once_and_attaches_result(monkeypatch):
+    with tempfile.TemporaryDirectory() as tmp:
+        small = os.path.join(tmp, 'small.txt')
+        large = os.path.join(tmp, 'large.txt')
+        Path(small).write_bytes(b'x')
+        Path(large).write_bytes(b'x' * 100)
+
+        # Only count stats of the files themselves, not of path resolution
+        calls = []
+        real_stat = os.stat
+
+        def counting_stat(path, *args, **kwargs):
+            if os.path.basename(path) in ('small.txt', 'large.txt', 'gone'):
+                calls.append(path)
+            return real_stat(path, *args, **kwargs)
+
+        monkeypatch.setattr(os, 'stat', counting_stat)
+
+        config = Config()
+        event_filter = EventFilter(config)
+        assert event_filter.should_process_event(FileSystemEvent('modified', large))
+        assert calls == []
+
+        config.set('monitoring.filters.min_file_size', 10)
+        event_filter = EventFilter(config)
+        large_event = FileSystemEvent('modified', large)
+        assert not event_filter.should_process_event(FileSystemEvent('modified', small))
+        assert event_filter.should_process_event(large_event)
+        assert event_filter.should_process_event(FileSystemEvent('deleted', os.path.join(tmp, 'gone')))
+        assert len(calls) == 2
+
+        assert large_event.size == 100
+        data = EventBatch([large_event])[0].to_dict()
+        assert data['size'] == 100 and data['mtime'] == real_stat(large).st_mtime
+
+
+def test_filter_batch_agrees_with_per_event_filter():
+    import random
+
+    config = Config()
+    config.set('monitoring.events', ['created', 'modified', 'moved'])
+    config.set('monitoring.filters.include_patterns', ['*.py', '*.txt', 'Makefile'])
+    config.set('monitoring.filters.exclude_patterns', ['test_*'])
+    event_filter = EventFilter(config)
+
+    rng = random.Random(7)
+    dirs = ['/src', '/src/__pycache__', '/repo/.git/objects', '/repo/lib']
+    names = ['a.py', 'b.txt', 'test_a.py', 'Makefile', 'c.pyc', 'd.md', '.DS_Store']
+    types = ['created', 'modified', 'deleted', 'moved']
+    batch = []
+    for _ in range(500):
+        event_type = rng.choice(types)
+        dest = os.path.join(rng.choice(dirs), rng.choice(names)) if event_type == 'moved' else None
+        batch.append(FileSystemEvent(event_type, os.path.join(rng.choice(dirs), rng.choice(names)), dest))
+    batch.append(FileSystemEvent('suppressed', '/repo/.git', is_directory=True, count=3))
+
+    expected = [event_filter.should_process_event(event) for event in batch]
+    assert any(expected) and not all(expected)
+    assert event_filter.filter_batch(batch) == expected
+
+    # Events of unmonitored types are rejected without resolving their paths
+    assert all(event._src_path is None for event in batch if event.event_type == 'deleted')
+
+
+def test_batched_events_are_filtered_in_chunks():
+    received = []
+    config = Config()
+    config.set('performance.batch_timeout', 60)
+    config.set('performance.max_events_per_batch', 1000)
+    config.set('monitoring.filters.exclude_patterns', ['*.pyc'])
+    handler = EventHandler(config, [lambda events: received.extend(events)])
+    try:
+        handler.handle_event(FileSystemEvent('modified', '/tmp/keep.txt'))
+        handler.handle_event(FileSystemEvent('modified', '/tmp/skip.pyc'))
+        assert handler.get_batching_status()['unfiltered_events'] == 2
+
+        handler.flush()
+        assert [event.raw_src_path for event in received] == ['/tmp/keep.txt']
+    finally:
+        handler.close()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Tests for the indexed event history store
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, '.')
+
+from filepulse.config import Config
+from filepulse.events import FileSystemEvent, EventBatch
+from filepulse.history import (HistoryStore, INDEX_SUFFIX, build_index, parse_segment_name,
+                               parse_time, repair_segment, segment_name)
+from filepulse.output import HistoryOutputHandler
+
+BASE = 1700000000  # a partition boundary for 100 second partitions
+
+
+def history_config():
+    config = Config()
+    config.set('output.history_partition', 100)
+    return config
+
+
+def sample_batches(root):
+    """Batches in several partitions, one of them straddling a boundary"""
+    batches = []
+    for batch in range(6):
+        events = []
+        for i in range(50):
+            n = batch * 50 + i
+            directory = os.path.join(root, ('src', 'docs', os.path.join('src', 'lib'))[n % 3])
+            events.append(FileSystemEvent(('created', 'modified', 'deleted')[n % 3 - (n % 7 == 0)],
+                                          os.path.join(directory, f'file{n % 11}.txt'),
+                                          timestamp=BASE + n * 0.9))
+        batches.append(EventBatch(events))
+    batches.append([FileSystemEvent('moved', os.path.join(root, 'tmp', 'x'),
+                                    os.path.join(root, 'src', 'x'), timestamp=BASE + 150.0)])
+    return batches
+
+
+def expected(batches, since, until, prefix, types):
+    below = prefix.rstrip(os.sep) + os.sep if prefix else None
+    result = []
+    for batch in batches:
+        for event in EventBatch(list(batch)):
+            if since is not None and event.timestamp < since:
+                continue
+            if until is not None and event.timestamp > until:
+                continue
+            if types and event.event_type not in types:
+                continue
+            if prefix and not any(path == prefix or path.startswith(below)
+                                  for path in (event.src_path, event.dest_path) if path):
+                continue
+            result.append(event.to_dict())
+    return sorted(result, key=lambda event: (event['timestamp'], event['src_path']))
+
+
+def query(store, *args):
+    return sorted((event.to_dict() for event in store.query(*args)),
+                  key=lambda event: (event['timestamp'], event['src_path']))
+
+
+def test_segment_names_round_trip():
+    name = segment_name(BASE, 100)
+    assert name == 'events-20231114T221320Z-100.fplog'
+    assert parse_segment_name(name) == (BASE, 100)
+    assert parse_segment_name(name + INDEX_SUFFIX) is None
+
+
+def test_parse_time():
+    assert parse_time('1700000000.5') == 1700000000.5
+    assert parse_time('15m', now=BASE) == BASE - 900
+    assert parse_time('2023-11-14T22:13:20Z') == BASE
+
+
+def test_queries_match_a_full_scan():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.realpath(tmp)
+        handler = HistoryOutputHandler(history_config(), os.path.join(root, 'history'))
+        batches = sample_batches(root)
+        for batch in batches:
+            handler(batch)
+        handler.close()
+
+        store = HistoryStore(os.path.join(root, 'history'))
+        assert len(store.segments()) == 3
+
+        queries = [
+            (None, None, None, None),
+            (BASE + 40, BASE + 120.5, None, None),
+            (None, None, os.path.join(root, 'src'), None),
+            (None, None, os.path.join(root, 'src', 'file3.txt'), None),
+            (BASE + 100, None, os.path.join(root, 'docs'), ['deleted', 'moved']),
+            (None, None, os.path.join(root, 'src', 'x'), ['moved']),
+        ]
+        for args in queries:
+            assert query(store, *args) == expected(batches, *args), args
+
+        # A narrow query only decodes blocks in its partition and time range
+        list(store.query(BASE + 250, BASE + 260))
+        assert store.segments_read == 1
+        assert store.blocks_read == 1
+
+
+def test_missing_and_stale_indexes_are_handled():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.realpath(tmp)
+        directory = os.path.join(root, 'history')
+        handler = HistoryOutputHandler(history_config(), directory)
+        batches = sample_batches(root)
+        for batch in batches[:2]:
+            handler(batch)
+        handler.close()
+
+        store = HistoryStore(directory)
+        segment = store.segments()[0][2]
+        with open(segment + INDEX_SUFFIX, 'rb') as f:
+            index = f.read()
+
+        # Queries scan what the index does not cover
+        os.truncate(segment + INDEX_SUFFIX, len(index) - 3)
+        assert query(store) == expected(batches[:2], None, None, None, None)
+        os.remove(segment + INDEX_SUFFIX)
+        assert query(store) == expected(batches[:2], None, None, None, None)
+
+        # Appending repairs the index and a segment cut short mid-record
+        with open(segment, 'ab') as f:
+            f.write(b'\x40\x02partial')
+        assert repair_segment(segment)
+        with open(segment + INDEX_SUFFIX, 'rb') as f:
+            assert f.read() == index
+        assert not repair_segment(segment)
+
+        for batch in batches[2:]:
+            handler(batch)
+        handler.close()
+        assert query(store) == expected(batches, None, None, None, None)
+        assert query(store, None, None, os.path.join(root, 'docs'), None) == \
+            expected(batches, None, None, os.path.join(root, 'docs'), None)
+
+        # A rebuilt index matches the one written incrementally
+        with open(segment + INDEX_SUFFIX, 'rb') as f:
+            index = f.read()
+        build_index(segment)
+        with open(segment + INDEX_SUFFIX, 'rb') as f:
+            assert f.read() == index
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Tests for gitignore-style ignore files
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, '.')
+
+from filepulse.config import Config
+from filepulse.events import FileSystemEvent, EventFilter
+from filepulse.ignorefile import IgnoreRules
+
+
+def test_gitignore_pattern_semantics():
+    rules = IgnoreRules([
+        '# comment',
+        '*.log',
+        '!keep.log',
+        '/build',
+        'tmp/',
+        'docs/**/*.md',
+        'out/**',
+        '\\#literal',
+    ])
+
+    def match(path, is_directory=False):
+        return rules.match(path.split('/'), is_directory)
+
+    assert match('a/b/debug.log') is True
+    assert match('a/keep.log') is False
+    assert match('build', True) is True
+    assert match('src/build', True) is None
+    assert match('tmp') is None
+    assert match('src/tmp', True) is True
+    assert match('docs/guide.md') is True
+    assert match('docs/a/b/guide.md') is True
+    assert match('out', True) is None
+    assert match('out/a/b.txt') is True
+    assert match('#literal') is True
+    assert match('src/main.py') is None
+
+
+def test_filter_applies_nested_ignore_files_lazily():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.realpath(tmp)
+        os.makedirs(os.path.join(root, 'pkg', 'cache'))
+        Path(root, '.gitignore').write_text('*.log\ncache/\n')
+        Path(root, 'pkg', '.gitignore').write_text('!important.log\n')
+
+        config = Config()
+        config.set('monitoring.paths', [root])
+        config.set('monitoring.filters.ignore_files', ['.gitignore'])
+        event_filter = EventFilter(config)
+
+        def passes(*parts):
+            return event_filter.should_process_event(FileSystemEvent('modified', os.path.join(root, *parts)))
+
+        assert passes('main.py')
+        assert not passes('debug.log')
+        assert event_filter.get_status()['ignore_file_loads'] == 1
+
+        assert passes('pkg', 'important.log')
+        assert not passes('pkg', 'other.log')
+        assert not passes('pkg', 'cache', 'important.log')
+        assert event_filter.get_status()['ignore_file_loads'] == 2
+
+        # Only a change to the ignore file itself reloads it
+        Path(root, '.gitignore').write_text('cache/\n')
+        assert not passes('debug.log')
+        event_filter.should_process_event(FileSystemEvent('modified', os.path.join(root, '.gitignore')))
+        assert passes('debug.log')
+        assert event_filter.get_status()['ignore_file_loads'] == 3
+
+
+def test_loaded_ignore_files_are_bounded():
+    from filepulse.ignorefile import IgnoreFileMatcher
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.realpath(tmp)
+        Path(root, '.gitignore').write_text('*.log\n')
+        for n in range(20):
+            os.makedirs(os.path.join(root, f'dir{n}'))
+        matcher = IgnoreFileMatcher([root], ['.gitignore'], cache_size=4)
+
+        for n in range(20):
+            assert matcher.is_ignored(os.path.join(root, f'dir{n}', 'x.log'))
+            assert not matcher.is_ignored(os.path.join(root, f'dir{n}', 'x.txt'))
+        assert len(matcher._rules) <= 4
+
+        # Changing an ignore file whose rules were evicted still resets the verdicts
+        Path(root, 'dir0', '.gitignore').write_text('*.txt\n')
+        assert matcher.notice(os.path.join(root, 'dir0', '.gitignore'))
+        assert matcher.is_ignored(os.path.join(root, 'dir0', 'x.txt'))
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Tests for the native inotify backend
+"""
+
+import os
+import sys
+import time
+import struct
+import tempfile
+
+import pytest
+
+sys.path.insert(0, '.')
+
+from filepulse.config import Config
+from filepulse.monitor import FileSystemMonitor
+from filepulse import inotify_backend
+
+pytestmark = pytest.mark.skipif(not inotify_backend.is_available(),
+                                reason="inotify is only available on Linux")
+
+
+def _wait_for(predicate, timeout=3.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return predicate()
+
+
+def _make_monitor(path, **overrides):
+    config = Config()
+    config.set('monitoring.paths', [path])
+    config.set('monitoring.backend', 'inotify')
+    config.set('output.console', False)
+    config.set('performance.batch_events', False)
+    for key, value in overrides.items():
+        config.set(key, value)
+
+    events = []
+    monitor = FileSystemMonitor(config)
+    monitor.event_handler.add_output_handler(events.extend)
+    return monitor, events
+
+
+def test_decode_events():
+    """Several records in one buffer decode in order"""
+    name = b'file.txt\0\0\0\0\0\0\0\0'
+    data = struct.pack('iIII', 1, inotify_backend.IN_CREATE, 0, len(name)) + name
+    data += struct.pack('iIII', 1, inotify_backend.IN_MODIFY, 0, 0)
+
+    records = inotify_backend.decode_events(data)
+    assert records == [
+        (1, inotify_backend.IN_CREATE, 0, b'file.txt'),
+        (1, inotify_backend.IN_MODIFY, 0, b''),
+    ]
+
+
+def test_inotify_backend_delivers_events():
+    """Created, modified, moved and deleted files reach the output handlers"""
+    with tempfile.TemporaryDirectory() as tmp:
+        monitor, events = _make_monitor(tmp)
+        assert monitor.get_status()['backend'] == 'inotify'
+        monitor.start()
+        try:
+            subdir = os.path.join(tmp, 'sub')
+            os.mkdir(subdir)
+            # The new directory is watched once its creation has been read
+            assert _wait_for(lambda: any(e.event_type == 'created' for e in events))
+            path = os.path.join(subdir, 'a.txt')
+            with open(path, 'w') as f:
+                f.write('hello')
+            os.rename(path, os.path.join(subdir, 'b.txt'))
+            os.remove(os.path.join(subdir, 'b.txt'))
+
+            assert _wait_for(lambda: any(e.event_type == 'deleted' for e in events))
+        finally:
+            monitor.stop()
+
+        kinds = [(e.event_type, os.path.basename(e.src_path)) for e in events]
+        assert ('created', 'sub') in kinds
+        assert ('created', 'a.txt') in kinds
+        assert ('modified', 'a.txt') in kinds
+        assert ('moved', 'a.txt') in kinds
+        assert ('deleted', 'b.txt') in kinds
+
+
+def test_directory_filled_and_renamed_before_it_was_watched():
+    """The contents of a directory moved before its creation was read are reported"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = os.path.realpath(tmp)
+        monitor, events = _make_monitor(tmp)
+        monitor.start()
+        try:
+            staging = os.path.join(tmp, 'staging')
+            os.makedirs(os.path.join(staging, 'deep'))
+            with open(os.path.join(staging, 'deep', 'c.txt'), 'w') as f:
+                f.write('c')
+            os.rename(staging, os.path.join(tmp, 'final'))
+
+            def reported(name):
+                return any(os.path.basename(e.dest_path or e.src_path) == name for e in events)
+            assert _wait_for(lambda: reported('deep') and reported('c.txt'))
+        finally:
+            monitor.stop()
+
+    # The same records read only after the rename, as a slow reader sees them
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = os.path.realpath(tmp)
+        backend = inotify_backend.InotifyBackend()
+        try:
+            backend.schedule(None, tmp)
+            wd = backend._path_to_wd[tmp]
+            os.makedirs(os.path.join(tmp, 'final', 'deep'))
+            open(os.path.join(tmp, 'final', 'deep', 'c.txt'), 'w').close()
+
+            is_dir = inotify_backend.IN_ISDIR
+            raw = backend._translate([
+                (wd, inotify_backend.IN_CREATE | is_dir, 0, b'staging'),
+                (wd, inotify_backend.IN_MOVED_FROM | is_dir, 7, b'staging'),
+                (wd, inotify_backend.IN_MOVED_TO | is_dir, 7, b'final'),
+            ])
+        finally:
+            backend.join()
+
+        final = os.path.join(tmp, 'final')
+        assert raw == [
+            ('created', os.path.join(tmp, 'staging'), None, True),
+            ('moved', os.path.join(tmp, 'staging'), final, True),
+            ('created', os.path.join(final, 'deep'), None, True),
+            ('created', os.path.join(final, 'deep', 'c.txt'), None, False),
+        ]
+        assert final in backend._path_to_wd
+
+
+def test_ignored_directories_are_not_watched():
+    """The watch planner prunes ignored subtrees before watches are installed"""
+    with tempfile.TemporaryDirectory() as tmp:
+        os.makedirs(os.path.join(tmp, 'node_modules', 'pkg', 'lib'))
+        os.makedirs(os.path.join(tmp, 'src', 'app'))
+
+        monitor, events = _make_monitor(tmp)
+        # root, src and src/app only
+        assert monitor.get_status()['watch_count'] == 3
+        monitor.observer.join()
+
+
+def test_inotify_mask_follows_monitored_events():
+    """Only the kernel events needed for monitoring.events are subscribed"""
+    from filepulse.watch_planner import WatchPlanner
+
+    config = Config()
+    config.set('monitoring.events', ['created'])
+    mask = WatchPlanner(config).inotify_mask(recursive=False)
+
+    assert mask & inotify_backend.IN_CREATE
+    assert not mask & inotify_backend.IN_MODIFY
+    assert not mask & inotify_backend.IN_DELETE
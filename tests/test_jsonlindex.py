@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Tests for the JSONL timestamp index
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, '.')
+
+from filepulse.config import Config
+from filepulse.events import FileSystemEvent
+from filepulse.jsonlindex import (TimestampIndex, build_index, index_path, read_window,
+                                  record_timestamp)
+from filepulse.output import JsonFileOutputHandler
+
+
+def write_log(path, batches, config=None, first=0):
+    handler = JsonFileOutputHandler(config or Config(), path)
+    for start in range(first, first + batches * 37, 37):
+        handler([FileSystemEvent('modified', f'/data/d{n % 5}/file{n}.txt', timestamp=1700000000 + n * 0.5)
+                 for n in range(start, start + 37)])
+    handler.close()
+
+
+def line_offsets(path):
+    offsets = [0]
+    with open(path, 'rb') as f:
+        for line in f:
+            offsets.append(offsets[-1] + len(line))
+    return offsets[:-1]
+
+
+def test_record_timestamp():
+    assert record_timestamp(b'{"event_type":"created","timestamp":1700000000.25,"x":1}') == 1700000000.25
+    assert record_timestamp(b'{"timestamp": 1.5e9, "event_type": "created"}') == 1.5e9
+    assert record_timestamp(b'{"event_type":"created"}') is None
+
+
+def test_build_index_in_chunks():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'events.jsonl')
+        write_log(path, 20)
+        offsets = line_offsets(path)
+
+        whole = build_index(path, interval=10, workers=1)
+        assert whole.records == len(offsets)
+        assert list(whole.offsets) == offsets[::10]
+        assert list(whole.timestamps) == [1700000000 + n * 0.5 for n in range(0, len(offsets), 10)]
+
+        for workers in (1, 2):
+            chunked = build_index(path, interval=10, workers=workers, chunk_size=1000)
+            assert list(chunked.offsets) == list(whole.offsets)
+            assert list(chunked.timestamps) == list(whole.timestamps)
+        assert list(TimestampIndex.load(index_path(path)).offsets) == list(whole.offsets)
+
+
+def test_sink_maintains_index_incrementally():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'events.jsonl')
+        config = Config()
+        config.set('output.json_index', True)
+        config.set('output.json_index_interval', 10)
+        write_log(path, 3, config)
+        write_log(path, 4, config)  # resumes the existing file and index
+
+        incremental = TimestampIndex.load(index_path(path))
+        assert list(incremental.offsets) == line_offsets(path)[::10]
+
+        # A partly written last entry is dropped and the index carries on
+        with open(index_path(path), 'r+b') as f:
+            f.truncate(40)
+        write_log(path, 1, config)
+        assert list(TimestampIndex.load(index_path(path)).offsets) == line_offsets(path)[::10]
+
+
+def test_sink_starts_a_lost_index_at_the_end_of_the_log(monkeypatch):
+    import filepulse.jsonlindex as jsonlindex
+
+    def no_rebuild(*args, **kwargs):
+        raise AssertionError("the sink must not rebuild the index")
+    monkeypatch.setattr(jsonlindex, 'build_index', no_rebuild)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'events.jsonl')
+        config = Config()
+        config.set('output.json_index', True)
+        config.set('output.json_index_interval', 10)
+        write_log(path, 2, config)
+        os.remove(index_path(path))
+        existing = os.path.getsize(path)
+        write_log(path, 2, config, first=2 * 37)
+
+        offsets = line_offsets(path)
+        tail = [offset for offset in offsets if offset >= existing]
+        assert list(TimestampIndex.load(index_path(path)).offsets) == tail[::10]
+        with open(path, 'rb') as f:
+            lines = f.readlines()
+        for since in (None, 1700000000, 1700000020, 1700000045):
+            expected = [line for line in lines if since is None or record_timestamp(line) >= since]
+            assert list(read_window(path, since)) == expected
+
+
+def test_read_window_matches_full_scan():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'events.jsonl')
+        write_log(path, 20)
+        with open(path, 'rb') as f:
+            lines = f.readlines()
+
+        for since, until in ((None, None), (1700000100, 1700000130.5), (1700000300, None),
+                             (None, 1700000001), (1800000000, None)):
+            expected = [line for line in lines
+                        if (since is None or record_timestamp(line) >= since)
+                        and (until is None or record_timestamp(line) <= until)]
+            assert list(read_window(path, since, until)) == expected  # no index: full scan
+            index = build_index(path, interval=16, workers=1)
+            assert list(read_window(path, since, until)) == expected
+            if since == 1700000300:
+                assert 0 < index.seek(since) <= line_offsets(path)[600]
+            os.remove(index_path(path))
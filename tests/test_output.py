@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Tests for output handlers
+"""
+
+import io
+import os
+import json
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, '.')
+
+from filepulse.config import Config
+from filepulse.events import EventHandler, FileSystemEvent
+from filepulse.output import ConsoleOutputHandler, TimestampFormatter, AppendFile, JsonFileOutputHandler
+from filepulse.serialization import EventSerializer, default_serializer
+
+
+def sample_events():
+    return [
+        FileSystemEvent('created', '/tmp/a.txt', timestamp=1700000000.25),
+        FileSystemEvent('modified', '/tmp/a.txt', timestamp=1700000000.9999997),
+        FileSystemEvent('moved', '/tmp/a.txt', '/tmp/b.txt', timestamp=1700000001.5),
+        FileSystemEvent('deleted', '/tmp/dir', is_directory=True, timestamp=1700000002.0),
+        FileSystemEvent('suppressed', '/tmp', is_directory=True, timestamp=1700000003.0, count=7),
+    ]
+
+
+def legacy_line(handler, event, format_type):
+    """Render an event the way the per-event print() implementation did"""
+    if format_type == 'json':
+        return json.dumps(event.to_dict(), indent=None, separators=(',', ':'))
+    timestamp = datetime.fromtimestamp(event.timestamp).strftime(handler.timestamp_format)
+    label = f"{handler.colors.get(event.event_type, '')}{event.event_type.upper()}{handler.colors['reset']}"
+    if format_type == 'detailed':
+        label += " DIR" if event.is_directory else " FILE"
+    if event.event_type == 'moved':
+        return f"[{timestamp}] {label}: {event.src_path} -> {event.dest_path}"
+    if event.count is not None:
+        return f"[{timestamp}] {label}: {event.count} events under {event.src_path}"
+    return f"[{timestamp}] {label}: {event.src_path}"
+
+
+class CountingStream(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+        self.flushes = 0
+
+    def write(self, text):
+        self.writes += 1
+        return super().write(text)
+
+    def flush(self):
+        self.flushes += 1
+
+
+def test_console_output_is_byte_identical_and_written_once():
+    for format_type in ('simple', 'detailed', 'json'):
+        config = Config()
+        config.set('output.console_format', format_type)
+        stream = CountingStream()
+        handler = ConsoleOutputHandler(config, stream)
+
+        events = sample_events()
+        events.append(FileSystemEvent('created', '/tmp/caf\u00e9', timestamp=1700000004.0))
+        handler(events)
+
+        expected = ''.join(legacy_line(handler, event, format_type) + '\n' for event in events)
+        assert stream.getvalue() == expected
+        assert stream.writes == 1 and stream.flushes == 1
+
+
+def test_timestamp_formatter_caches_per_second():
+    formatter = TimestampFormatter('%H:%M:%S')
+    for timestamp in (1700000000.0, 1700000000.5, 1700000000.9999996, -0.25):
+        assert formatter(timestamp) == datetime.fromtimestamp(timestamp).strftime('%H:%M:%S')
+
+    precise = TimestampFormatter('%H:%M:%S.%f')
+    assert not precise.per_second
+    assert precise(1700000000.5) == datetime.fromtimestamp(1700000000.5).strftime('%H:%M:%S.%f')
+
+
+def test_file_sink_keeps_handle_and_survives_rotation():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'events.jsonl')
+        config = Config()
+        handler = JsonFileOutputHandler(config, path)
+
+        handler(sample_events()[:2])
+        handle = handler.file._file
+        handler(sample_events()[2:])
+        assert handler.file._file is handle
+        with open(path) as f:
+            assert len(f.readlines()) == 5
+
+        # An external tool rotates the log away
+        os.rename(path, path + '.1')
+        handler(sample_events()[:1])
+        assert handler.file.reopens == 1
+        handler.close()
+
+        with open(path) as f:
+            assert len(f.readlines()) == 1
+        with open(path + '.1') as f:
+            assert len(f.readlines()) == 5
+
+
+def test_fsync_durability_group_commits():
+    with tempfile.TemporaryDirectory() as tmp:
+        sink = AppendFile(os.path.join(tmp, 'log'), durability='fsync', fsync_interval_ms=50)
+        for _ in range(20):
+            sink.write_batch('line\n')
+        assert sink.syncs == 1
+
+        # The timer syncs the trailing batches without further writes
+        time.sleep(0.2)
+        assert sink.syncs == 2
+        sink.close()
+        assert sink.syncs == 2
+
+
+def test_serializer_matches_to_dict():
+    events = sample_events()
+    events[0].size, events[0].mtime = 12, 1699999999.5
+    events.append(FileSystemEvent('created', '/tmp/caf\u00e9 "quoted"', timestamp=1700000004.000001))
+
+    builtin = EventSerializer(use_orjson=False)
+    for event in events:
+        text = builtin.serialize(event)
+        assert text == json.dumps(event.to_dict(), separators=(',', ':'))
+
+    for serializer in (builtin, EventSerializer()):
+        lines = serializer.serialize_batch(events).splitlines()
+        assert [json.loads(line) for line in lines] == [event.to_dict() for event in events]
+
+    # Both writers produce the same bytes, with non-ASCII escaped
+    text = builtin.serialize_batch(list(events))
+    assert 'caf\\u00e9' in text and text.isascii()
+    assert EventSerializer(use_orjson=True).serialize_batch(list(events)) == text
+    assert [EventSerializer(use_orjson=True).serialize(event) for event in events] == text.splitlines()
+
+
+def test_batch_is_serialized_once_for_console_and_file():
+    with tempfile.TemporaryDirectory() as tmp:
+        config = Config()
+        config.set('output.console_format', 'json')
+        console = ConsoleOutputHandler(config, io.StringIO())
+        sink = JsonFileOutputHandler(config, os.path.join(tmp, 'events.jsonl'))
+
+        handler = EventHandler(config, [console, sink])
+
+        batch = sample_events()
+        before = (default_serializer.batches, default_serializer.reused)
+        handler._deliver(batch)
+        sink.close()
+        assert (default_serializer.batches, default_serializer.reused) == (before[0] + 1, before[1] + 1)
+
+        with open(os.path.join(tmp, 'events.jsonl')) as f:
+            assert f.read() == console.output_stream.getvalue()
+
+
+def test_serialized_text_is_not_reused_outside_a_delivery():
+    serializer = EventSerializer()
+    batch = sample_events()
+    first = serializer.serialize_batch(batch)
+    batch.pop()  # a caller reusing and changing its list
+    assert serializer.serialize_batch(batch) == ''.join(first.splitlines(True)[:-1])
+
+    with serializer.delivery(batch):
+        text = serializer.serialize_batch(batch)
+        assert serializer.serialize_batch(batch) is text
+        assert serializer.serialize_batch(list(batch)) is not text
+    assert serializer._delivery.batch is None  # nothing is kept alive afterwards
+    assert serializer.reused == 1
+
+
+def test_size_rotation_compresses_and_prunes_segments():
+    import gzip
+    from filepulse.rotation import RotationPolicy, compressor
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'events.log')
+        sink = AppendFile(path, rotation=RotationPolicy(max_bytes=100, max_files=2))
+        for batch in range(4):
+            sink.write_batch(f'batch {batch} '.ljust(79, '.') + '\n')
+            compressor.wait()
+            time.sleep(0.02)  # distinct segment mtimes for retention
+        sink.close()
+
+        assert sink.rotations == 3
+        rotated = [name for name in os.listdir(tmp) if name != 'events.log']
+        assert len(rotated) == 2 and all(name.endswith('.gz') for name in rotated)
+        contents = []
+        for name in rotated:
+            with gzip.open(os.path.join(tmp, name), 'rt') as f:
+                contents.append(f.read()[:8])
+        assert sorted(contents) == ['batch 1 ', 'batch 2 ']
+        with open(path) as f:
+            assert f.read().startswith('batch 3 ')
+
+
+def test_retention_leaves_sidecars_and_partial_archives_alone():
+    from filepulse.rotation import RotationPolicy, compressor, is_rotated_segment
+
+    assert is_rotated_segment('events.jsonl.20240101-120000', 'events.jsonl')
+    assert is_rotated_segment('events.jsonl.20240101-120000-2.zst', 'events.jsonl')
+    assert not is_rotated_segment('events.jsonl.tsidx', 'events.jsonl')
+    assert not is_rotated_segment('events.jsonl.20240101-120000.gz.tmp', 'events.jsonl')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'events.jsonl')
+        kept = [path + '.tsidx', path + '.20240101-120000.gz.tmp']
+        for name in kept:
+            with open(name, 'wb') as f:
+                f.write(b'not a segment')
+        sink = AppendFile(path, rotation=RotationPolicy(max_bytes=100, max_files=1))
+        for batch in range(3):
+            sink.write_batch(f'batch {batch} '.ljust(79, '.') + '\n')
+            compressor.wait()
+            time.sleep(0.02)
+        sink.close()
+
+        assert all(os.path.exists(name) for name in kept)
+        rotated = [name for name in os.listdir(tmp) if is_rotated_segment(name, 'events.jsonl')]
+        assert len(rotated) == 1
+
+
+def test_interval_rotation_follows_clock_boundaries():
+    from filepulse.rotation import RotationPolicy
+
+    policy = RotationPolicy(interval=3600)
+    assert not policy.should_rotate(10, started=7200.0, now=10799.0)
+    assert policy.should_rotate(10, started=7200.0, now=10800.0)
+    assert not policy.should_rotate(0, started=7200.0, now=10800.0)
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Tests for startup reconciliation
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, '.')
+
+from filepulse.binlog import MAGIC, SegmentEncoder
+from filepulse.config import Config
+from filepulse.events import EventBatch, FileSystemEvent
+from filepulse.logreader import LogReader
+from filepulse.monitor import FileSystemMonitor
+from filepulse.reconcile import Reconciler, ScanCancelled, ScanThrottle
+from filepulse.serialization import EventSerializer
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return predicate()
+
+
+def write(path, data='x'):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(data)
+
+
+def reconcile_config(root, state_dir):
+    config = Config()
+    config.set('monitoring.paths', [root])
+    config.set('monitoring.reconcile.state_dir', state_dir)
+    config.set('monitoring.reconcile.max_entries_per_second', None)
+    return config
+
+
+def test_reconciler_reports_offline_changes():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(os.path.realpath(tmp), 'tree')
+        for name in ('a/one.txt', 'a/two.txt', 'b/three.txt', 'node_modules/dep.js'):
+            write(os.path.join(root, name))
+        config = reconcile_config(root, os.path.join(tmp, 'state'))
+        os.makedirs(os.path.join(tmp, 'state'))
+
+        emitted = []
+        reconciler = Reconciler(config, emitted.extend, prune=lambda name: name == 'node_modules')
+        assert reconciler.reconcile(root) == 0  # baseline
+        assert os.path.exists(reconciler.state_path(root))
+
+        # Changes made while the monitor was down
+        write(os.path.join(root, 'a', 'one.txt'), 'changed')
+        os.remove(os.path.join(root, 'a', 'two.txt'))
+        write(os.path.join(root, 'c', 'new.txt'))
+        write(os.path.join(root, 'node_modules', 'other.js'))
+
+        restarted = Reconciler(config, emitted.extend, prune=lambda name: name == 'node_modules')
+        assert restarted.reconcile(root) == 4
+        assert all(event.reconciled for event in emitted)
+        assert sorted((event.event_type, event.src_path) for event in emitted) == [
+            ('created', os.path.join(root, 'c')),
+            ('created', os.path.join(root, 'c', 'new.txt')),
+            ('deleted', os.path.join(root, 'a', 'two.txt')),
+            ('modified', os.path.join(root, 'a', 'one.txt')),
+        ]
+        assert restarted.reconcile(root) == 0  # nothing new since the saved state
+
+
+def test_state_dir_inside_the_root_is_not_reported(monkeypatch):
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.realpath(tmp)
+        write(os.path.join(root, 'a', 'file.txt'))
+        monkeypatch.chdir(root)
+        config = Config()
+        config.set('monitoring.paths', ['.'])  # default state_dir lands inside the root
+        config.set('monitoring.reconcile.max_entries_per_second', None)
+
+        emitted = []
+        reconciler = Reconciler(config, emitted.extend)
+        os.makedirs(reconciler.state_dir)
+        assert reconciler.state_path(root).startswith(os.path.join(root, 'filepulse_state'))
+        for _ in range(3):
+            assert reconciler.reconcile(root) == 0
+        assert emitted == []
+
+
+def test_state_is_kept_until_reconciled():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(os.path.realpath(tmp), 'tree')
+        write(os.path.join(root, 'file.txt'))
+        config = reconcile_config(root, os.path.join(tmp, 'state'))
+        os.makedirs(os.path.join(tmp, 'state'))
+        emitted = []
+        Reconciler(config, emitted.extend).reconcile(root)
+
+        write(os.path.join(root, 'offline.txt'))
+        stopped_early = Reconciler(config, emitted.extend)
+        stopped_early.stop()  # before its rescan: the saved state must not move on
+        assert Reconciler(config, emitted.extend).reconcile(root) == 1
+        assert emitted[0].src_path == os.path.join(root, 'offline.txt')
+
+
+def test_scan_throttle():
+    throttle = ScanThrottle(2000)
+    started = time.monotonic()
+    for _ in range(400):
+        throttle()
+    assert time.monotonic() - started >= 0.15
+
+    stopping = threading.Event()
+    throttle = ScanThrottle(100, stopping)
+    throttle()
+    stopping.set()
+    with pytest.raises(ScanCancelled):
+        throttle()
+
+
+def test_reconciled_flag_survives_batches_and_formats():
+    event = FileSystemEvent('created', '/data/file.txt', timestamp=1700000000.5)
+    event._src_path = event.raw_src_path
+    event.reconciled = True
+    plain = FileSystemEvent('deleted', '/data/other.txt', timestamp=1700000001.0)
+    plain._src_path = plain.raw_src_path
+
+    batch = EventBatch([event, plain])
+    assert [e.reconciled for e in batch] == [True, False]
+    assert event.to_dict()['reconciled'] is True
+    assert 'reconciled' not in plain.to_dict()
+    assert FileSystemEvent.from_dict(event.to_dict()).reconciled
+
+    for use_orjson in (False, True):
+        lines = EventSerializer(use_orjson=use_orjson).serialize_batch(batch).splitlines()
+        assert '"reconciled":true' in lines[0] and 'reconciled' not in lines[1]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'events.fplog')
+        with open(path, 'wb') as f:
+            f.write(MAGIC + SegmentEncoder().encode(batch))
+        with LogReader(path) as reader:
+            assert [e.reconciled for e in reader.events()] == [True, False]
+
+
+def test_monitor_reconciles_on_start():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(os.path.realpath(tmp), 'tree')
+        write(os.path.join(root, 'kept.txt'))
+
+        def make_monitor():
+            config = reconcile_config(root, os.path.join(tmp, 'state'))
+            config.set('monitoring.reconcile.enabled', True)
+            config.set('output.console', False)
+            config.set('performance.batch_events', False)
+            monitor = FileSystemMonitor(config)
+            events = []
+            monitor.event_handler.add_output_handler(events.extend)
+            return monitor, events
+
+        monitor, _ = make_monitor()
+        monitor.start()
+        assert _wait_for(lambda: not monitor.reconciler.get_status()['pending'])
+        monitor.stop()
+
+        write(os.path.join(root, 'while-down.txt'))
+
+        monitor, events = make_monitor()
+        monitor.start()
+        try:
+            assert _wait_for(lambda: any(e.reconciled for e in events))
+        finally:
+            monitor.stop()
+        reconciled = [e for e in events if e.reconciled]
+        assert [(e.event_type, e.src_path) for e in reconciled] == \
+            [('created', os.path.join(root, 'while-down.txt'))]
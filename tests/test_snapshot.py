@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Tests for directory snapshots and snapshot diffs
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, '.')
+
+from filepulse.snapshot import (ExternalSorter, SnapshotReader, diff_snapshots, key_to_path,
+                                take_snapshot)
+
+
+def write(path, data='x'):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(data)
+
+
+def make_tree(root):
+    for name in ('a/one.txt', 'a/two.txt', 'a/sub/deep.txt', 'a.txt', 'b/keep.txt',
+                 'b/edit.txt', 'c/moved.txt', 'd/x/y.txt', 'e/gone.txt', 'top.txt'):
+        write(os.path.join(root, name), name)
+
+
+def changes(old, new, max_items=500000):
+    return sorted((event.event_type, event.src_path, event.dest_path, event.is_directory)
+                  for event in diff_snapshots(old, new, max_items))
+
+
+def test_snapshot_is_sorted_and_complete():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(os.path.realpath(tmp), 'tree')
+        make_tree(root)
+        output = os.path.join(tmp, 'tree.fpsnap')
+        header = take_snapshot(root, output, workers=3)
+
+        with SnapshotReader(output) as reader:
+            entries = list(reader)
+            assert reader.root == root
+        keys = [entry.key for entry in entries]
+        assert keys == sorted(keys)
+        assert header['entries'] == len(entries)
+
+        walked = set()
+        for directory, dirs, files in os.walk(root):
+            walked.update(os.path.join(directory, name) for name in dirs + files)
+        assert {key_to_path(root, key) for key in keys} == walked
+        by_path = {key_to_path(root, entry.key): entry for entry in entries}
+        stat = os.stat(os.path.join(root, 'a', 'sub', 'deep.txt'))
+        entry = by_path[os.path.join(root, 'a', 'sub', 'deep.txt')]
+        assert (entry.inode, entry.size, entry.mtime_ns) == (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        assert by_path[os.path.join(root, 'a', 'sub')].is_directory
+
+
+def test_diff_reports_changes_and_moves():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(os.path.realpath(tmp), 'tree')
+        make_tree(root)
+        old = os.path.join(tmp, 'old.fpsnap')
+        new = os.path.join(tmp, 'new.fpsnap')
+        take_snapshot(root, old)
+
+        write(os.path.join(root, 'b', 'edit.txt'), 'changed contents')
+        write(os.path.join(root, 'new', 'file.txt'))
+        os.remove(os.path.join(root, 'e', 'gone.txt'))
+        os.rename(os.path.join(root, 'c', 'moved.txt'), os.path.join(root, 'b', 'moved.txt'))
+        os.rename(os.path.join(root, 'd'), os.path.join(root, 'renamed'))
+        os.remove(os.path.join(root, 'top.txt'))
+        os.makedirs(os.path.join(root, 'top.txt'))  # a file replaced by a directory
+        take_snapshot(root, new)
+
+        def path(*parts):
+            return os.path.join(root, *parts)
+
+        expected = sorted([
+            ('modified', path('b', 'edit.txt'), None, False),
+            ('created', path('new'), None, True),
+            ('created', path('new', 'file.txt'), None, False),
+            ('deleted', path('e', 'gone.txt'), None, False),
+            ('moved', path('c', 'moved.txt'), path('b', 'moved.txt'), False),
+            ('moved', path('d'), path('renamed'), True),
+            ('moved', path('d', 'x'), path('renamed', 'x'), True),
+            ('moved', path('d', 'x', 'y.txt'), path('renamed', 'x', 'y.txt'), False),
+            ('deleted', path('top.txt'), None, False),
+            ('created', path('top.txt'), None, True),
+        ])
+        assert changes(old, new) == expected
+        assert changes(old, new, max_items=2) == expected  # spilling to disk
+        assert changes(new, new) == []
+
+        events = list(diff_snapshots(old, new))
+        assert [event.src_path for event in events] == sorted(event.src_path for event in events)
+        record = next(event for event in events if event.event_type == 'modified').to_dict()
+        assert record['size'] == len('changed contents')
+
+
+def test_hashes_ignore_touched_files():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(os.path.realpath(tmp), 'tree')
+        make_tree(root)
+        old = os.path.join(tmp, 'old.fpsnap')
+        new = os.path.join(tmp, 'new.fpsnap')
+        take_snapshot(root, old, hashing=True)
+        touched = os.path.join(root, 'a', 'one.txt')
+        os.utime(touched, ns=(1, 1))
+        take_snapshot(root, new, hashing=True)
+        assert changes(old, new) == []
+
+        take_snapshot(root, new)  # without hashes the new mtime counts
+        assert changes(old, new) == [('modified', touched, None, False)]
+
+
+def test_external_sorter_merges_spilled_runs():
+    sorter = ExternalSorter(max_items=7)
+    values = [(n * 7919 % 101, str(n)) for n in range(100)]
+    for value in values:
+        sorter.add(value)
+    try:
+        assert len(sorter._runs) == 14
+        assert list(sorter) == sorted(values)
+    finally:
+        sorter.close()